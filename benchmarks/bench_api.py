@@ -0,0 +1,415 @@
+"""
+Замеры публичных методов APIBotDb на синтетическом складе
+
+Каждый сценарий вызывает один метод api заданное число раз на базе из
+benchmarks.data_generator, результат с p50/p95/p99 и ops/s пишется в json.
+Сравнение с прошлым запуском показывает, какие методы стали медленнее.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_api --stock 100000 --iterations 200 --output bench.json
+    python -m benchmarks.bench_api --compare bench.json --output new.json
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import logging
+import math
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from benchmarks.data_generator import WarehouseSize, clean_date, generate
+from src.bot_api import APIBotDb, Marker, PageCallback
+from src.connection_pool import close_pools
+from src.reference_cache import close_reference_caches
+
+
+class BenchState:
+    """Данные для аргументов сценариев: случайные, но повторяемые при одном seed"""
+
+    def __init__(self, db_name: str, size: WarehouseSize, seed: int) -> None:
+        self.size = size
+        self.rng = random.Random(seed)
+        self.counter = 0
+        self.today = datetime.date(2025, 6, 1)
+
+        conn = sqlite3.connect(db_name)
+        ids = self.rng.sample(range(1, size.stock + 1), min(size.stock, 1000))
+        self.stock = conn.execute(
+            f"""SELECT sd.stock_device_id, d.device_name FROM stock_device AS sd
+            JOIN device AS d ON d.device_id = sd.device_id
+            WHERE sd.stock_device_id IN ({", ".join("?" * len(ids))})
+            ORDER BY sd.stock_device_id""",
+            ids,
+        ).fetchall()
+        conn.close()
+
+    def next_id(self) -> int:
+        self.counter += 1
+        return self.counter
+
+    def device_name(self) -> str:
+        return f"Device {self.rng.randint(1, self.size.devices)}"
+
+    def company_name(self) -> str:
+        return f"Company {self.rng.randint(1, self.size.companies)}"
+
+    def type_title(self) -> str:
+        return f"Type {self.rng.randint(1, self.size.types)}"
+
+    def stock_item(self) -> Dict[str, str]:
+        stock_device_id, device_name = self.rng.choice(self.stock)
+        return {"stock_device_id": str(stock_device_id), "device_name": device_name}
+
+    def date(self) -> Dict[str, str]:
+        days = self.rng.randrange(max(1, 365 * self.size.years))
+        return {"at_clean_date": clean_date(self.today - datetime.timedelta(days=days))}
+
+
+Scenario = Callable[[APIBotDb, BenchState], Any]
+
+# сценарии чтения идут первыми, записи в конце, чтобы не менять данные
+# для чтения посреди замера
+SCENARIOS: Dict[str, Scenario] = {
+    "bot_device": lambda api, st: api.bot_device(st.device_name()),
+    "bot_company": lambda api, st: api.bot_company(st.company_name()),
+    "bot_device_type": lambda api, st: api.bot_device_type(st.type_title()),
+    "bot_device_id": lambda api, st: api.bot_device_id(st.device_name()),
+    "bot_company_id": lambda api, st: api.bot_company_id(st.company_name()),
+    "bot_type_id": lambda api, st: api.bot_type_id(st.type_title()),
+    "bot_device_name": lambda api, st: api.bot_device_name(
+        st.rng.randint(1, st.size.devices)
+    ),
+    "bot_company_name": lambda api, st: api.bot_company_name(
+        st.rng.randint(1, st.size.companies)
+    ),
+    "bot_type_title": lambda api, st: api.bot_type_title(
+        st.rng.randint(1, st.size.types)
+    ),
+    "is_availability_device": lambda api, st: api.is_availability_device(
+        st.device_name()
+    ),
+    "is_availability_company": lambda api, st: api.is_availability_company(
+        st.company_name()
+    ),
+    "is_availability_type": lambda api, st: api.is_availability_type(st.type_title()),
+    "is_availability_device_from_stockpile": lambda api, st: (
+        api.is_availability_device_from_stockpile(st.stock_item())
+    ),
+    "is_LED_lamp_type_by_device_name": lambda api, st: (
+        api.is_LED_lamp_type_by_device_name(st.device_name())
+    ),
+    "bot_device_from_stockpile": lambda api, st: api.bot_device_from_stockpile(
+        st.stock_item()
+    ),
+    "bot_lamp_hour_calculate": lambda api, st: api.bot_lamp_hour_calculate(
+        {**st.stock_item(), "current_hours": str(st.rng.randint(0, 1000))}
+    ),
+    "bot_get_devices_at_date": lambda api, st: api.bot_get_devices_at_date(st.date()),
+    "bot_lst_broken_device_from_stockpile": lambda api, st: (
+        api.bot_lst_broken_device_from_stockpile(st.date())
+    ),
+    "bot_iter_devices_at_date": lambda api, st: sum(
+        len(batch) for batch in api.bot_iter_devices_at_date(st.date())
+    ),
+    "bot_lst_device": lambda api, st: api.bot_lst_device(),
+    "bot_iter_devices": lambda api, st: sum(
+        len(batch) for batch in api.bot_iter_devices()
+    ),
+    "bot_lst_company": lambda api, st: api.bot_lst_company(),
+    "bot_lst_device_type": lambda api, st: api.bot_lst_device_type(),
+    "bot_lst_device_by_type_lamp_fil": lambda api, st: (
+        api.bot_lst_device_by_type_lamp_fil()
+    ),
+    "bot_keyboard_company_name_lst": lambda api, st: (
+        api.bot_keyboard_company_name_lst()
+    ),
+    "bot_keyboard_device_type_lst": lambda api, st: api.bot_keyboard_device_type_lst(),
+    "bot_keyboard_device_lst": lambda api, st: api.bot_keyboard_device_lst(),
+    "bot_keyboard_device_lst_from_fil": lambda api, st: (
+        api.bot_keyboard_device_lst_from_fil()
+    ),
+    "bot_device_page": lambda api, st: api.bot_device_page(
+        Marker.GET_DEVICE, after=st.rng.randint(0, st.size.devices)
+    ),
+    "device_callback": lambda api, st: api.device_callback(
+        Marker.MARKING_DEVICES, st.rng.randint(1, st.size.devices)
+    ),
+    "bot_inline_kb": lambda api, st: api.bot_inline_kb(
+        Marker.GET_DEVICE,
+        PageCallback(marker=Marker.GET_DEVICE, after=st.rng.randint(0, 3) * 24),
+    ),
+    "build_inline_kb": lambda api, st: api.build_inline_kb(
+        Marker.GET_DEVICE, after=st.rng.randint(0, st.size.devices)
+    ),
+    "bot_options_to_add_or_update": lambda api, st: api.bot_options_to_add_or_update(
+        st.stock_item()
+        if st.rng.random() < 0.5
+        else {
+            "stock_device_id": str(st.size.stock + st.next_id()),
+            "device_name": st.device_name(),
+        }
+    ),
+    "bot_set_device_from_stockpile_by_name_and_id_to_db": lambda api, st: (
+        api.bot_set_device_from_stockpile_by_name_and_id_to_db(
+            {
+                "stock_device_id": str(st.size.stock + st.next_id()),
+                "device_name": st.device_name(),
+            }
+        )
+    ),
+    "bot_register_stock_devices": lambda api, st: api.bot_register_stock_devices(
+        {
+            "stock_device_ids": [st.size.stock + st.next_id() for _ in range(20)],
+            "device_name": st.device_name(),
+            "max_lamp_hours": "1000",
+        }
+    ),
+    "bot_replacement_lamp": lambda api, st: api.bot_replacement_lamp(
+        {**st.stock_item(), "max_lamp_hours": "1000"}
+    ),
+    "bot_change_device_status": lambda api, st: api.bot_change_device_status(
+        {**st.stock_item(), "mark": st.rng.choice(("0", "1"))}
+    ),
+    "bot_update_devices_stock_clearence_date": lambda api, st: (
+        api.bot_update_devices_stock_clearence_date(
+            st.stock_item(), st.date()["at_clean_date"]
+        )
+    ),
+    "bot_set_device_company": lambda api, st: api.bot_set_device_company(
+        {
+            "company_name": f"Bench company {st.next_id()}",
+            "producer_country": "Italy",
+            "description_company": "https://bench.example",
+        }
+    ),
+    "bot_set_device_type": lambda api, st: api.bot_set_device_type(
+        {
+            "type_title": f"Bench type {st.next_id()}",
+            "type_description": "bench",
+            "lamp_type": "LED",
+        }
+    ),
+    "bot_set_device": lambda api, st: api.bot_set_device(
+        {
+            "device_name": f"Bench device {st.next_id()}",
+            "company_name": st.company_name(),
+            "type_title": st.type_title(),
+        }
+    ),
+}
+
+
+def public_methods() -> List[str]:
+    """список публичных методов APIBotDb, которые должны быть в сценариях"""
+
+    return sorted(
+        name
+        for name in vars(APIBotDb)
+        if not name.startswith("_") and callable(getattr(APIBotDb, name))
+    )
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """перцентиль по ближайшему рангу, samples отсортированы"""
+
+    return samples[max(0, math.ceil(q * len(samples)) - 1)]
+
+
+def summarize(samples: List[float], errors: int) -> Dict[str, float]:
+    samples = sorted(samples)
+    total = sum(samples)
+
+    return {
+        "count": len(samples),
+        "errors": errors,
+        "mean_ms": round(total / len(samples) * 1000, 4),
+        "p50_ms": round(percentile(samples, 0.5) * 1000, 4),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 4),
+        "ops_per_s": round(len(samples) / total, 1) if total else 0.0,
+    }
+
+
+def run_scenario(
+    api: APIBotDb, state: BenchState, scenario: Scenario, iterations: int, warmup: int
+) -> Dict[str, float]:
+    samples = []
+    errors = 0
+
+    for step in range(warmup + iterations):
+        started = time.perf_counter()
+
+        try:
+            scenario(api, state)
+
+        except Exception:
+            errors += 1
+
+        elapsed = time.perf_counter() - started
+
+        if step >= warmup:
+            samples.append(elapsed)
+
+    return summarize(samples, errors)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(
+    size: WarehouseSize,
+    iterations: int = 200,
+    warmup: int = 10,
+    seed: int = 0,
+    db_name: str | None = None,
+    only: List[str] | None = None,
+) -> dict:
+    """функция генерирует склад, прогоняет сценарии и возвращает отчет"""
+
+    tmp_dir = None
+
+    if db_name is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        db_name = os.path.join(tmp_dir.name, "bench.db")
+
+    started = time.perf_counter()
+    data = generate(db_name, size, seed=seed)
+    generated = time.perf_counter() - started
+    api = APIBotDb(db_name)
+    state = BenchState(db_name, size, seed)
+    scenarios = {}
+
+    try:
+        for name, scenario in SCENARIOS.items():
+            if only and name not in only:
+                continue
+
+            scenarios[name] = run_scenario(api, state, scenario, iterations, warmup)
+
+    finally:
+        close_pools()
+        close_reference_caches()
+
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "db_profile": os.environ.get("DB_PROFILE", "performance"),
+            "iterations": iterations,
+            "warmup": warmup,
+            "generate_seconds": round(generated, 3),
+            "data": data,
+            "missing": sorted(set(public_methods()) - set(SCENARIOS)),
+        },
+        "scenarios": scenarios,
+    }
+
+
+def compare(baseline: dict, report: dict, threshold: float = 0.2) -> List[dict]:
+    """функция сравнивает p95 сценариев с прошлым отчетом, регрессия это
+    рост p95 больше чем на threshold"""
+
+    rows = []
+
+    for name, current in report["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+
+        if previous is None or not previous["p95_ms"]:
+            continue
+
+        ratio = current["p95_ms"] / previous["p95_ms"]
+        rows.append(
+            {
+                "scenario": name,
+                "old_p95_ms": previous["p95_ms"],
+                "new_p95_ms": current["p95_ms"],
+                "ratio": round(ratio, 3),
+                "regression": ratio > 1 + threshold,
+            }
+        )
+
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--companies", type=int, default=50)
+    parser.add_argument("--types", type=int, default=30)
+    parser.add_argument("--devices", type=int, default=2000)
+    parser.add_argument("--stock", type=int, default=100000)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", help="файл базы, по умолчанию временный")
+    parser.add_argument("--only", nargs="*", help="запустить только эти сценарии")
+    parser.add_argument("--output", help="файл для json отчета")
+    parser.add_argument("--compare", help="json отчет прошлого запуска")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    # предупреждения логгеров и отладочные print api не должны попасть в отчет
+    logging.disable(logging.CRITICAL)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        report = run(
+            WarehouseSize(
+                companies=args.companies,
+                types=args.types,
+                devices=args.devices,
+                stock=args.stock,
+                years=args.years,
+            ),
+            iterations=args.iterations,
+            warmup=args.warmup,
+            seed=args.seed,
+            db_name=args.db,
+            only=args.only,
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+    else:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            rows = compare(json.load(file), report, args.threshold)
+
+        for row in rows:
+            mark = "РЕГРЕССИЯ" if row["regression"] else ""
+            print(
+                f"{row['scenario']:<52} {row['old_p95_ms']:>10} {row['new_p95_ms']:>10} {row['ratio']:>7} {mark}",
+                file=sys.stderr,
+            )
+
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
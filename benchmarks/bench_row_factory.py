@@ -0,0 +1,83 @@
+"""
+Сравнение фабрик строк: строгая валидация pydantic и чтение без валидации,
+кортежи без фабрики показывают стоимость самого запроса
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_row_factory --rows 20000 --repeat 5
+"""
+
+import argparse
+import sqlite3
+import time
+
+from src.migrations import migrate
+from src.query_scheme import QuerySchemeForStockDevice, set_trusted_reads
+from src.scheme_for_validation import DataForQuery, RowValue, TableRow
+
+
+def fill_database(conn: sqlite3.Connection, rows: int):
+    """функция заполняет базу в памяти синтетическими приборами на складе"""
+
+    migrate(conn)
+    conn.execute(
+        "INSERT INTO device_company (company_name, producer_country) VALUES ('Bench', 'RU')"
+    )
+    conn.execute("INSERT INTO device_type (type_title) VALUES ('Bench')")
+    conn.execute(
+        "INSERT INTO device (device_name, company_id, type_device_id) VALUES ('Bench device', 1, 1)"
+    )
+    conn.executemany(
+        "INSERT INTO stock_device (stock_device_id, device_id, at_clean_date, stock_device_status) VALUES (?, 1, '1-6-2025', 1)",
+        ((idx,) for idx in range(1, rows + 1)),
+    )
+    conn.commit()
+
+
+def fetch(conn: sqlite3.Connection, raw: bool = False) -> float:
+    where_data = [
+        DataForQuery(
+            prefix="sd",
+            table_row=TableRow("stock_device_status"),
+            row_value=RowValue("1"),
+        ),
+        DataForQuery(
+            prefix="sd",
+            table_row=TableRow("at_clean_iso"),
+            row_value=RowValue("2025-06-01"),
+        ),
+    ]
+    query = QuerySchemeForStockDevice().query_get_search_with_device(
+        where_data=where_data
+    )
+    conn.row_factory = None if raw else query[1]
+    started = time.perf_counter()
+    conn.execute(query[0], query[2]).fetchall()
+    return time.perf_counter() - started
+
+
+def run(rows: int, repeat: int) -> dict:
+    conn = sqlite3.connect(":memory:")
+    fill_database(conn, rows)
+    result = {}
+    best = min(fetch(conn, raw=True) for _ in range(repeat))
+    result["tuple"] = {"seconds": round(best, 6), "rows_per_s": round(rows / best)}
+
+    for mode, trusted in (("validated", False), ("trusted", True)):
+        set_trusted_reads(trusted)
+        best = min(fetch(conn) for _ in range(repeat))
+        result[mode] = {"seconds": round(best, 6), "rows_per_s": round(rows / best)}
+
+    set_trusted_reads(False)
+    result["speedup"] = round(
+        result["validated"]["seconds"] / result["trusted"]["seconds"], 2
+    )
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(run(args.rows, args.repeat))
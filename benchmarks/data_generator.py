@@ -0,0 +1,143 @@
+"""
+Генератор синтетического склада для замеров производительности
+
+Запуск из корня проекта:
+    python -m benchmarks.data_generator bench.db --devices 2000 --stock 100000 --years 3
+"""
+
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+
+from src.migrations import migrate
+
+
+COUNTRIES = ("Italy", "Germany", "China", "Canada", "France", "Russia")
+
+
+class WarehouseSize:
+    """Размер синтетического склада"""
+
+    def __init__(
+        self,
+        companies: int = 50,
+        types: int = 30,
+        devices: int = 2000,
+        stock: int = 100000,
+        years: int = 3,
+        broken_share: float = 0.1,
+        fil_share: float = 0.25,
+    ) -> None:
+        self.companies = companies
+        self.types = types
+        self.devices = devices
+        self.stock = stock
+        self.years = years
+        self.broken_share = broken_share
+        self.fil_share = fil_share
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+
+def clean_date(day: datetime.date) -> str:
+    """дата в формате базы d-m-yyyy без ведущих нулей"""
+
+    return f"{day.day}-{day.month}-{day.year}"
+
+
+def generate(
+    db_name: str,
+    size: WarehouseSize,
+    seed: int = 0,
+    today: datetime.date | None = None,
+) -> dict:
+    """функция создает базу с нуля и заполняет ее справочниками и складом,
+    при одном seed данные совпадают между запусками"""
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_name + suffix):
+            os.remove(db_name + suffix)
+
+    rng = random.Random(seed)
+    today = today or datetime.date(2025, 6, 1)
+    days = max(1, 365 * size.years)
+    conn = sqlite3.connect(db_name)
+    migrate(conn)
+
+    conn.executemany(
+        "INSERT INTO device_company (company_name, producer_country, description_company) VALUES (?, ?, ?)",
+        (
+            (f"Company {idx}", rng.choice(COUNTRIES), f"https://company{idx}.example")
+            for idx in range(1, size.companies + 1)
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO device_type (type_title, type_description, lamp_type) VALUES (?, ?, ?)",
+        (
+            (
+                f"Type {idx}",
+                f"Описание типа {idx} " * 5,
+                # первый тип всегда с лампой накаливания, чтобы были сценарии FIL
+                "FIL" if idx == 1 or rng.random() < size.fil_share else "LED",
+            )
+            for idx in range(1, size.types + 1)
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO device (device_name, company_id, type_device_id) VALUES (?, ?, ?)",
+        (
+            (
+                f"Device {idx}",
+                rng.randint(1, size.companies),
+                rng.randint(1, size.types),
+            )
+            for idx in range(1, size.devices + 1)
+        ),
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO stock_device (stock_device_id, device_id, at_clean_date, max_lamp_hours, stock_device_status) VALUES (?, ?, ?, ?, ?)",
+        (
+            (
+                idx,
+                rng.randint(1, size.devices),
+                clean_date(today - datetime.timedelta(days=rng.randrange(days))),
+                rng.choice((0, 500, 750, 1000)),
+                0 if rng.random() < size.broken_share else 1,
+            )
+            for idx in range(1, size.stock + 1)
+        ),
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+    return {"seed": seed, "today": clean_date(today), **size.to_dict()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("db_name")
+    parser.add_argument("--companies", type=int, default=50)
+    parser.add_argument("--types", type=int, default=30)
+    parser.add_argument("--devices", type=int, default=2000)
+    parser.add_argument("--stock", type=int, default=100000)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(
+        generate(
+            args.db_name,
+            WarehouseSize(
+                companies=args.companies,
+                types=args.types,
+                devices=args.devices,
+                stock=args.stock,
+                years=args.years,
+            ),
+            seed=args.seed,
+        )
+    )
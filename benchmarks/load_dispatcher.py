@@ -0,0 +1,524 @@
+"""
+Нагрузочный прогон диспетчера бота синтетическими обновлениями telegram
+
+Каждый пользователь по очереди проходит сценарии /add_stock_device с
+одним номером или диапазоном номеров и /mark_device, обновления подаются
+в dp.feed_update со всеми роутерами бота, а запросы бота к telegram
+перехватывает сессия-заглушка. Отчет содержит пропускную способность,
+задержки по шагам и обработчикам, запросы бота и блокировки цикла событий.
+
+Запуск из корня проекта:
+    python -m benchmarks.load_dispatcher --users 50 --flows 20 --output load.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import datetime
+import io
+import json
+import logging
+import os
+import platform
+import random
+import sqlite3
+import tempfile
+import time
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.base import BaseSession
+from aiogram.enums import ParseMode
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.methods import TelegramMethod
+from aiogram.types import Message, Update
+
+from benchmarks.bench_api import git_commit, percentile, summarize
+from benchmarks.data_generator import WarehouseSize, generate
+from src.async_bot_api import run_async_api
+from src.bot.handlers import routers
+from src.bot.states import StockDeviceState
+from src.bot.storage import SQLiteStorage
+from src.bot_api import Action, APIBotDb, DeviceCallback, dp
+from src.connection_pool import close_pools
+from src.database_interface import add_query_hook, remove_query_hook
+from src.metrics import metrics, record_query, setup_metrics
+from src.reference_cache import close_reference_caches
+
+
+# токен только задает id бота, в сеть сессия-заглушка не ходит
+LOAD_TOKEN = "123456:ABCdefGhIJKlmnoPQRstuvWXyz"
+FIRST_USER_ID = 10_000
+
+
+class RecordingSession(BaseSession):
+    """Сессия бота без сети: считает вызовы методов telegram и отвечает
+    заглушками, latency имитирует время ответа сервера"""
+
+    def __init__(self, latency: float = 0.0) -> None:
+        super().__init__()
+        self.latency = latency
+        self.calls: Dict[str, int] = {}
+        self.last_text: Dict[int | str, str] = {}
+        self._message_id = 0
+
+    async def make_request(
+        self, bot: Bot, method: TelegramMethod[Any], timeout: int | None = None
+    ) -> Any:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        name = type(method).__name__
+        self.calls[name] = self.calls.get(name, 0) + 1
+        chat_id = getattr(method, "chat_id", None) or 0
+        text = getattr(method, "text", None)
+
+        if text is not None:
+            self.last_text[chat_id] = text
+
+        if method.__returning__ is not Message:
+            return True
+
+        self._message_id += 1
+        return Message.model_validate(
+            {
+                "message_id": self._message_id,
+                "date": 0,
+                "chat": {"id": chat_id, "type": "private"},
+                "text": text,
+            },
+            context={"bot": bot},
+        )
+
+    async def stream_content(
+        self,
+        url: str,
+        headers: Dict[str, Any] | None = None,
+        timeout: int = 30,
+        chunk_size: int = 65536,
+        raise_for_status: bool = True,
+    ) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+class UpdateFactory:
+    """Обновления telegram от лица пользователей в личных чатах"""
+
+    def __init__(self, bot: Bot) -> None:
+        self.bot = bot
+        self.update_id = 0
+
+    def _next_id(self) -> int:
+        self.update_id += 1
+        return self.update_id
+
+    def _message(self, user_id: int, text: str, from_bot: bool = False) -> dict:
+        author = (
+            {"id": self.bot.id, "is_bot": True, "first_name": "bot"}
+            if from_bot
+            else {"id": user_id, "is_bot": False, "first_name": f"user {user_id}"}
+        )
+        return {
+            "message_id": self.update_id,
+            "date": 0,
+            "chat": {"id": user_id, "type": "private"},
+            "from": author,
+            "text": text,
+        }
+
+    def message(self, user_id: int, text: str) -> Update:
+        update_id = self._next_id()
+        return Update.model_validate(
+            {"update_id": update_id, "message": self._message(user_id, text)},
+            context={"bot": self.bot},
+        )
+
+    def callback(self, user_id: int, data: str) -> Update:
+        update_id = self._next_id()
+        return Update.model_validate(
+            {
+                "update_id": update_id,
+                "callback_query": {
+                    "id": str(update_id),
+                    "from": {
+                        "id": user_id,
+                        "is_bot": False,
+                        "first_name": f"user {user_id}",
+                    },
+                    "chat_instance": str(user_id),
+                    "data": data,
+                    "message": self._message(user_id, "клавиатура", from_bot=True),
+                },
+            },
+            context={"bot": self.bot},
+        )
+
+
+class LoadData:
+    """Приборы и складские номера из базы для аргументов сценариев"""
+
+    def __init__(self, db_name: str, seed: int = 0, sample: int = 1000) -> None:
+        self.rng = random.Random(seed)
+
+        conn = sqlite3.connect(db_name)
+        self.devices = [
+            row[0] for row in conn.execute("SELECT device_id FROM device").fetchall()
+        ]
+        stock = conn.execute(
+            "SELECT stock_device_id, device_id FROM stock_device"
+        ).fetchall()
+        self.next_stock_id = max((row[0] for row in stock), default=0)
+        conn.close()
+
+        self.stock = self.rng.sample(stock, min(len(stock), sample))
+
+    def stock_item(self) -> tuple[int, int]:
+        return self.rng.choice(self.stock)
+
+    def new_stock_item(self) -> tuple[int, int]:
+        self.next_stock_id += 1
+        return self.next_stock_id, self.rng.choice(self.devices)
+
+
+class LoadRun:
+    """Один нагрузочный прогон: подача обновлений и замер каждого шага"""
+
+    def __init__(self, dp: Dispatcher, bot: Bot, data: LoadData) -> None:
+        self.dp = dp
+        self.bot = bot
+        self.data = data
+        self.updates = UpdateFactory(bot)
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.flows: Dict[str, int] = {}
+        self.failed_flows = 0
+
+    async def feed(self, step: str, update: Update):
+        """метод подает обновление в диспетчер, ошибка обработчика
+        прерывает сценарий пользователя"""
+
+        started = time.perf_counter()
+
+        try:
+            await self.dp.feed_update(self.bot, update)
+
+        except Exception:
+            self.errors[step] = self.errors.get(step, 0) + 1
+            raise
+
+        finally:
+            self.samples.setdefault(step, []).append(time.perf_counter() - started)
+
+    async def message(self, step: str, user_id: int, text: str):
+        await self.feed(step, self.updates.message(user_id, text))
+
+    async def callback(self, step: str, user_id: int, data: str):
+        await self.feed(step, self.updates.callback(user_id, data))
+
+    async def state(self, user_id: int) -> str | None:
+        return await self.dp.fsm.get_context(self.bot, user_id, user_id).get_state()
+
+    async def clear(self, user_id: int):
+        await self.dp.fsm.get_context(self.bot, user_id, user_id).clear()
+
+
+async def add_stock_device_flow(load: LoadRun, user_id: int):
+    """сценарий /add_stock_device: новый или уже известный складской номер,
+    для приборов с лампой накаливания еще и часы лампы"""
+
+    if load.data.rng.random() < 0.5:
+        stock_device_id, device_id = load.data.new_stock_item()
+    else:
+        stock_device_id, device_id = load.data.stock_item()
+
+    await load.message("add_stock_device/start", user_id, "/add_stock_device")
+    await load.message("add_stock_device/stock_id", user_id, str(stock_device_id))
+    await load.callback(
+        "add_stock_device/device",
+        user_id,
+        DeviceCallback(action=Action.ADD, device_id=device_id).pack(),
+    )
+
+    if await load.state(user_id) == StockDeviceState.max_lamp_hours.state:
+        await load.message("add_stock_device/lamp_hours", user_id, "1000")
+
+
+async def add_stock_devices_flow(load: LoadRun, user_id: int, count: int = 10):
+    """сценарий /add_stock_device с диапазоном новых номеров одного прибора"""
+
+    stock_device_id, device_id = load.data.new_stock_item()
+    load.data.next_stock_id += count - 1
+
+    await load.message("add_stock_devices/start", user_id, "/add_stock_device")
+    await load.message(
+        "add_stock_devices/stock_ids",
+        user_id,
+        f"{stock_device_id}-{stock_device_id + count - 1}",
+    )
+    await load.callback(
+        "add_stock_devices/device",
+        user_id,
+        DeviceCallback(action=Action.ADD, device_id=device_id).pack(),
+    )
+
+    if await load.state(user_id) == StockDeviceState.max_lamp_hours.state:
+        await load.message("add_stock_devices/lamp_hours", user_id, "1000")
+
+
+async def mark_device_flow(load: LoadRun, user_id: int):
+    """сценарий /mark_device: прибор со склада в ремонт или из ремонта"""
+
+    stock_device_id, device_id = load.data.stock_item()
+
+    await load.message("mark_device/start", user_id, "/mark_device")
+    await load.message("mark_device/stock_id", user_id, str(stock_device_id))
+    await load.message("mark_device/mark", user_id, load.data.rng.choice(("0", "1")))
+    await load.callback(
+        "mark_device/device",
+        user_id,
+        DeviceCallback(action=Action.MARK, device_id=device_id).pack(),
+    )
+
+
+Flow = Callable[[LoadRun, int], Awaitable[None]]
+
+FLOWS: Dict[str, Flow] = {
+    "add_stock_device": add_stock_device_flow,
+    "add_stock_devices": add_stock_devices_flow,
+    "mark_device": mark_device_flow,
+}
+
+
+async def simulate_user(
+    load: LoadRun, user_id: int, flows: int, names: List[str], think: float
+):
+    for _ in range(flows):
+        name = load.data.rng.choice(names)
+
+        try:
+            await FLOWS[name](load, user_id)
+            load.flows[name] = load.flows.get(name, 0) + 1
+
+        except Exception:
+            load.failed_flows += 1
+            await load.clear(user_id)
+
+        if think:
+            await asyncio.sleep(think)
+
+
+class LoopMonitor:
+    """Замер блокировок цикла событий: задача засыпает на interval и
+    считает, насколько позже она проснулась"""
+
+    def __init__(self, interval: float = 0.005, stall: float = 0.05) -> None:
+        self.interval = interval
+        self.stall = stall
+        self.lags: List[float] = []
+        self._task: asyncio.Task | None = None
+
+    async def _watch(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, time.perf_counter() - started - self.interval))
+
+    def start(self):
+        self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+    def to_dict(self) -> Dict[str, float]:
+        lags = sorted(self.lags)
+        stalls = [lag for lag in lags if lag > self.stall]
+
+        return {
+            "samples": len(lags),
+            "p50_lag_ms": round(percentile(lags, 0.5) * 1000, 4) if lags else 0.0,
+            "p99_lag_ms": round(percentile(lags, 0.99) * 1000, 4) if lags else 0.0,
+            "max_lag_ms": round(lags[-1] * 1000, 4) if lags else 0.0,
+            "stalls": len(stalls),
+            "stalled_ms": round(sum(stalls) * 1000, 4),
+        }
+
+
+def prepare_dispatcher() -> Dispatcher:
+    """функция подключает роутеры и метрики к диспетчеру бота один раз
+    на процесс, как это делает main"""
+
+    if routers[0].parent_router is None:
+        [dp.include_router(router) for router in routers]
+        setup_metrics(dp, routers)
+
+    return dp
+
+
+async def run_load(
+    db_name: str,
+    users: int = 10,
+    flows: int = 10,
+    names: List[str] | None = None,
+    storage: BaseStorage | None = None,
+    latency: float = 0.0,
+    think: float = 0.0,
+    seed: int = 0,
+) -> dict:
+    """функция прогоняет users пользователей параллельно, каждый проходит
+    flows сценариев подряд, и возвращает отчет"""
+
+    names = names or list(FLOWS)
+    dispatcher = prepare_dispatcher()
+    storage = storage or MemoryStorage()
+    session = RecordingSession(latency)
+    bot = Bot(
+        LOAD_TOKEN,
+        session=session,
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    )
+    load = LoadRun(dispatcher, bot, LoadData(db_name, seed))
+
+    # обработчики берут общий фасад api, на время прогона он смотрит
+    # в базу нагрузки, а диспетчер хранит состояния в storage
+    facade = run_async_api()
+    previous_api, previous_storage = facade.api, dispatcher.fsm.storage
+    facade.api = APIBotDb(db_name)
+    dispatcher.fsm.storage = storage
+    add_query_hook(record_query)
+    metrics.reset()
+    monitor = LoopMonitor()
+    monitor.start()
+    started = time.perf_counter()
+
+    try:
+        await asyncio.gather(
+            *(
+                simulate_user(load, user_id, flows, names, think)
+                for user_id in range(FIRST_USER_ID, FIRST_USER_ID + users)
+            )
+        )
+        duration = time.perf_counter() - started
+
+    finally:
+        await monitor.stop()
+        await storage.close()
+        remove_query_hook(record_query)
+        facade.api = previous_api
+        dispatcher.fsm.storage = previous_storage
+
+    updates = sum(len(samples) for samples in load.samples.values())
+    all_samples = [sample for samples in load.samples.values() for sample in samples]
+    latency_report = {
+        step: summarize(samples, load.errors.get(step, 0))
+        for step, samples in sorted(load.samples.items())
+    }
+
+    if all_samples:
+        latency_report["all"] = summarize(all_samples, sum(load.errors.values()))
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "users": users,
+            "flows_per_user": flows,
+            "flow_names": names,
+            "storage": type(storage).__name__,
+            "session_latency_ms": latency * 1000,
+            "think_ms": think * 1000,
+        },
+        "updates": updates,
+        "errors": sum(load.errors.values()),
+        "flows": load.flows,
+        "failed_flows": load.failed_flows,
+        "duration_s": round(duration, 3),
+        "updates_per_s": round(updates / duration, 1) if duration else 0.0,
+        "flows_per_s": round(sum(load.flows.values()) / duration, 1)
+        if duration
+        else 0.0,
+        "latency": latency_report,
+        "loop": monitor.to_dict(),
+        "outgoing": dict(sorted(session.calls.items())),
+        "handlers": metrics.to_dict()["handlers"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--companies", type=int, default=50)
+    parser.add_argument("--types", type=int, default=30)
+    parser.add_argument("--devices", type=int, default=2000)
+    parser.add_argument("--stock", type=int, default=100000)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", help="файл базы, по умолчанию временный")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument(
+        "--flows", type=int, default=10, help="сценариев на пользователя"
+    )
+    parser.add_argument("--flow", nargs="*", choices=list(FLOWS), dest="names")
+    parser.add_argument("--storage", choices=("memory", "sqlite"), default="sqlite")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--think-ms", type=float, default=0.0)
+    parser.add_argument("--output", help="файл для json отчета")
+    args = parser.parse_args()
+
+    # предупреждения логгеров и отладочные print api не должны попасть в отчет
+    logging.disable(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_name = args.db or os.path.join(tmp_dir, "load.db")
+        storage = (
+            SQLiteStorage(os.path.join(tmp_dir, "fsm.db"))
+            if args.storage == "sqlite"
+            else MemoryStorage()
+        )
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate(
+                db_name,
+                WarehouseSize(
+                    companies=args.companies,
+                    types=args.types,
+                    devices=args.devices,
+                    stock=args.stock,
+                    years=args.years,
+                ),
+                seed=args.seed,
+            )
+
+            try:
+                report = asyncio.run(
+                    run_load(
+                        db_name,
+                        users=args.users,
+                        flows=args.flows,
+                        names=args.names,
+                        storage=storage,
+                        latency=args.latency_ms / 1000,
+                        think=args.think_ms / 1000,
+                        seed=args.seed,
+                    )
+                )
+
+            finally:
+                run_async_api().shutdown()
+                close_pools()
+                close_reference_caches()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+    else:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
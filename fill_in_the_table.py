@@ -1,14 +1,10 @@
+import argparse
 import os
-import sqlite3
 import logging
 
-from src.query_scheme import (
-    CREATE_TABLE_DEVICE,
-    CREATE_TABLE_DEVICE_COMPANY,
-    CREATE_TABLE_DEVICE_TYPE,
-    CREATE_TABLE_STOCK_DEVICE,
-    DBSqlite,
-)
+from src.bulk_loader import BulkLoadException, LoadResult, seed
+from src.migrations import migrate
+from src.query_scheme import DBSqlite
 from src.secret import secrets
 
 logging.basicConfig(
@@ -20,20 +16,19 @@ logger = logging.getLogger(__name__)
 logger.addHandler(logging.StreamHandler())
 
 
-def set_full_data():
-    fp_lst = [
-        "data_cache/stock_device.sql",
-        "data_cache/device.sql",
-        "data_cache/device_company.sql",
-        "data_cache/device_type.sql",
-    ]
+FP_LST = [
+    "data_cache/stock_device.sql",
+    "data_cache/device.sql",
+    "data_cache/device_company.sql",
+    "data_cache/device_type.sql",
+]
+
 
-    create_table_list = [
-        CREATE_TABLE_STOCK_DEVICE,
-        CREATE_TABLE_DEVICE,
-        CREATE_TABLE_DEVICE_COMPANY,
-        CREATE_TABLE_DEVICE_TYPE,
-    ]
+def set_full_data(
+    fp_lst: list[str] = FP_LST, table: str | None = None
+) -> list[LoadResult]:
+    """функция загружает дампы sql, csv или jsonl в базу одной транзакцией,
+    файлы без изменений с прошлого запуска пропускаются целиком"""
 
     try:
         if os.environ.get("DB_NAME"):
@@ -43,16 +38,21 @@ def set_full_data():
 
         if isinstance(db_name, str):
             with DBSqlite(db_name) as conn:
-                [conn.execute(item) for item in create_table_list]
-                conn.commit()
+                migrate(conn)
 
-                for fp in fp_lst:
-                    with open(fp, "r") as file:
-                        conn.executescript(file.read())
+                return seed(conn, fp_lst, table=table)
 
-    except sqlite3.IntegrityError:
-        logger.warning("Данные уже есть в дб")
+    except BulkLoadException as err:
+        logger.warning(err)
+
+    return []
 
 
 if __name__ == "__main__":
-    set_full_data()
+    parser = argparse.ArgumentParser(description="загрузка данных в бд")
+    parser.add_argument("fp_lst", nargs="*", default=FP_LST)
+    parser.add_argument("--table", help="таблица для csv и jsonl")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.INFO)
+    set_full_data(args.fp_lst, args.table)
@@ -2,19 +2,54 @@ import asyncio
 import logging
 import sys
 
+from src.async_bot_api import run_async_api
 from src.bot_api import bot, dp
 from src.bot.handlers import routers
+from src.bot.handlers.stats_handler import db_stats
+from src.connection_pool import check_pragmas
+from src.metrics import metrics_port_from_env, setup_metrics, start_metrics_server
+from src.reference_cache import close_reference_caches, get_reference_cache
+from src.webhook import bot_mode_from_env, run_webhook, webhook_config_from_env
+
+
+# корневой логгер уже настроен модулями на WARNING, отчет о старте
+# выводится логгером main на уровне INFO
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
 
 
 async def main():
     [dp.include_router(router) for router in routers]
+    setup_metrics(dp, routers)
+    db_name = run_async_api().api.db_name
+    logger.info(f"{db_name}: настройки соединения {check_pragmas(db_name)}")
+    get_reference_cache(db_name).load()
+    metrics_port = metrics_port_from_env()
+    metrics_runner = None
 
     try:
-        await bot.delete_webhook(drop_pending_updates=True)
-        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        webhook = (
+            webhook_config_from_env() if bot_mode_from_env() == "webhook" else None
+        )
+
+        # сервер webhook отдает метрики только при WEBHOOK_METRICS=1
+        if metrics_port and (webhook is None or not webhook.metrics):
+            metrics_runner = await start_metrics_server(metrics_port, extra=db_stats)
+
+        if webhook is not None:
+            await run_webhook(dp, bot, webhook, metrics_extra=db_stats)
+
+        else:
+            await bot.delete_webhook(drop_pending_updates=True)
+            await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
 
     finally:
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+
         await bot.session.close()
+        run_async_api().shutdown()
+        close_reference_caches()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,158 @@
+"""
+Модуль асинхронного доступа бота к базе данных
+"""
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict
+
+from src.bot_api import APIBotDb, run_api
+from src.metrics import record_queue_wait
+
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.StreamHandler())
+
+
+class AsyncAPIBotDb:
+    """Асинхронный фасад над APIBotDb
+
+    Каждый вызов метода APIBotDb выполняется в выделенном пуле потоков,
+    поэтому обработчики не блокируют цикл событий на время запроса к базе.
+    Количество одновременно выполняемых запросов ограничено max_workers,
+    остальные ждут в очереди.
+    """
+
+    def __init__(self, api: APIBotDb, max_workers: int = 4) -> None:
+        self.api = api
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="db_worker"
+        )
+        self._slots = asyncio.Semaphore(max_workers)
+
+        self.queued = 0
+        self.in_flight = 0
+        self.max_queue_depth = 0
+        self.calls = 0
+        self.errors = 0
+        self.wait_time = 0.0
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """метод выполняет синхронную функцию в пуле потоков"""
+
+        started = time.monotonic()
+        self.queued += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queued)
+
+        try:
+            await self._slots.acquire()
+
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        waited = time.monotonic() - started
+        self.wait_time += waited
+        record_queue_wait(waited)
+        ctx = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+
+        try:
+            return await loop.run_in_executor(
+                self.executor,
+                functools.partial(ctx.run, func, *args, **kwargs),
+            )
+
+        except Exception:
+            self.errors += 1
+            raise
+
+        finally:
+            self.in_flight -= 1
+            self.calls += 1
+            self._slots.release()
+
+    async def iterate(self, func: Callable, *args, **kwargs) -> AsyncIterator:
+        """метод перебирает синхронный генератор в пуле потоков,
+        каждый следующий элемент запрашивается отдельной задачей, поэтому
+        первые пачки доступны до завершения запроса целиком"""
+
+        gen = await self.run(func, *args, **kwargs)
+        done = object()
+
+        try:
+            while True:
+                item = await self.run(next, gen, done)
+
+                if item is done:
+                    break
+
+                yield item
+
+        finally:
+            await self.run(gen.close)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.api, name)
+
+        if not callable(attr):
+            return attr
+
+        if inspect.isgeneratorfunction(attr):
+
+            @functools.wraps(attr)
+            def iterator(*args, **kwargs):
+                return self.iterate(attr, *args, **kwargs)
+
+            return iterator
+
+        @functools.wraps(attr)
+        async def wrapper(*args, **kwargs):
+            return await self.run(attr, *args, **kwargs)
+
+        return wrapper
+
+    def stats(self) -> Dict[str, int | float]:
+        return {
+            "max_workers": self.max_workers,
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            "max_queue_depth": self.max_queue_depth,
+            "calls": self.calls,
+            "errors": self.errors,
+            "wait_time": round(self.wait_time, 6),
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+_async_api: AsyncAPIBotDb | None = None
+
+
+def run_async_api() -> AsyncAPIBotDb:
+    """функция возвращает общий для всех обработчиков асинхронный api"""
+
+    global _async_api
+
+    if _async_api is None:
+        if os.environ.get("DB_WORKERS"):
+            max_workers = int(os.environ["DB_WORKERS"])
+        else:
+            max_workers = 4
+
+        _async_api = AsyncAPIBotDb(run_api(), max_workers=max_workers)
+
+    return _async_api
@@ -7,6 +7,8 @@ from src.bot.handlers import (
     get_stock_device_handler,
     other_components_handler,
     lamp_handler,
+    pagination_handler,
+    stats_handler,
 )
 
 routers = [
@@ -18,4 +20,6 @@ routers = [
     get_stock_device_handler.get_stock_device_router,
     other_components_handler.other_components_router,
     lamp_handler.lamp_router,
+    pagination_handler.pagination_router,
+    stats_handler.stats_router,
 ]
@@ -6,7 +6,7 @@ from aiogram.types import ReplyKeyboardRemove
 
 from src.bot.keyboard.keyboard_start import kb_start
 from src.bot.states import AddDeviceCompany
-from src.bot_api import run_api
+from src.async_bot_api import run_async_api
 from src.data_handler import BotHandlerException
 from src.message_handler import MessageDescription
 
@@ -22,7 +22,7 @@ logger.addHandler(logging.StreamHandler())
 device_company_router = Router()
 
 
-db_bot_api = run_api()
+db_bot_api = run_async_api()
 
 
 @device_company_router.message(F.text == "/add_device_company")
@@ -55,7 +55,7 @@ async def add_device_company(message: Message, state: FSMContext):
     mes_des = MessageDescription("add_device_company")
 
     try:
-        result_job = db_bot_api.bot_set_device_company(data)
+        result_job = await db_bot_api.bot_set_device_company(data)
         mes_des.message_data = result_job
         await message.reply(text=mes_des.description(), reply_markup=kb_start)
 
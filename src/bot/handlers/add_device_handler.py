@@ -6,10 +6,10 @@ from aiogram.types import ReplyKeyboardRemove
 
 from src.bot.keyboard.keyboard_start import kb_start, kb_add
 from src.bot.states import AddDevice
+from src.async_bot_api import run_async_api
 from src.bot_api import (
     DeviceTypeCallback,
     DeviceCompanyCallback,
-    run_api,
     Marker,
 )
 from src.data_handler import BotHandlerException
@@ -26,11 +26,7 @@ logger.addHandler(logging.StreamHandler())
 
 device_router = Router()
 
-bot_api_db = run_api()
-
-
-companys_cache = set()
-device_types_cache = set()
+bot_api_db = run_async_api()
 
 
 @device_router.message(F.text == "/add_device")
@@ -38,8 +34,6 @@ async def device(message: Message, state: FSMContext):
     mes_des = MessageDescription(message.text)
     await message.answer(text=mes_des.description(), reply_markup=ReplyKeyboardRemove())
     await state.set_state(AddDevice.device_name)
-    companys_cache.update(bot_api_db.bot_keyboard_company_name_lst())
-    device_types_cache.update(bot_api_db.bot_keyboard_device_type_lst())
 
 
 @device_router.message(AddDevice.device_name)
@@ -48,43 +42,51 @@ async def device_name(message: Message, state: FSMContext):
     mes_des = MessageDescription("device_name")
     await message.reply(
         text=mes_des.description(),
-        reply_markup=bot_api_db.bot_inline_kb(Marker.DCOMPANY),
+        reply_markup=await bot_api_db.bot_inline_kb(Marker.DCOMPANY),
     )
 
 
-@device_router.callback_query(
-    DeviceCompanyCallback.filter(F.text_search.in_(companys_cache))
-)
+@device_router.callback_query(DeviceCompanyCallback.filter())
 async def company_for_device(
     callback: CallbackQuery, callback_data: DeviceCompanyCallback, state: FSMContext
 ):
+    company_name = await bot_api_db.bot_company_name(callback_data.company_id)
+
+    if company_name is None:
+        await callback.answer(text="Компания не найдена, откройте список заново")
+        return
+
     await callback.answer()
     device_data = await state.get_data()
-    device_data["company_name"] = callback_data.company_name
+    device_data["company_name"] = company_name
     await state.set_data(device_data)
     mes_des = MessageDescription("company_for_device")
 
     if callback.message:
         await callback.message.answer(
             text=mes_des.description(),
-            reply_markup=bot_api_db.bot_inline_kb(Marker.DTYPE),
+            reply_markup=await bot_api_db.bot_inline_kb(Marker.DTYPE),
         )
 
 
-@device_router.callback_query(
-    DeviceTypeCallback.filter(F.text_search.in_(device_types_cache))
-)
+@device_router.callback_query(DeviceTypeCallback.filter())
 async def type_for_device(
     callback: CallbackQuery, callback_data: DeviceTypeCallback, state: FSMContext
 ):
+    type_title = await bot_api_db.bot_type_title(callback_data.type_id)
+
+    if type_title is None:
+        await callback.answer(text="Тип прибора не найден, откройте список заново")
+        return
+
     await callback.answer()
     device_data = await state.get_data()
-    device_data["type_title"] = callback_data.type_title
+    device_data["type_title"] = type_title
     mes_des = MessageDescription("type_for_device")
 
     if callback.message:
         try:
-            result_job = bot_api_db.bot_set_device(device_data)
+            result_job = await bot_api_db.bot_set_device(device_data)
             mes_des.message_data = result_job
             await callback.message.answer(
                 text=mes_des.description(),
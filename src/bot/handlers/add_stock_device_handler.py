@@ -6,13 +6,15 @@ from aiogram.types import ReplyKeyboardRemove
 
 from src.bot.keyboard.keyboard_start import kb_start
 from src.bot.states import StockDeviceState
+from src.async_bot_api import run_async_api
 from src.bot_api import (
-    run_api,
+    Action,
     DeviceCallback,
     Marker,
 )
 from src.data_handler import BotHandlerException
 from src.message_handler import MessageDescription
+from src.utils import MAX_STOCK_IDS, parse_stock_ids
 
 logging.basicConfig(
     level=logging.WARNING,
@@ -26,9 +28,7 @@ logger.addHandler(logging.StreamHandler())
 stock_device_router = Router()
 
 
-bot_api_db = run_api()
-
-devices_cache = set()
+bot_api_db = run_async_api()
 
 
 @stock_device_router.message(F.text == "/add_stock_device")
@@ -39,50 +39,87 @@ async def add_stock_device_id(message: Message, state: FSMContext):
         reply_markup=ReplyKeyboardRemove(),
     )
     await state.set_state(StockDeviceState.stock_device_id)
-    devices_cache.update(bot_api_db.bot_keyboard_device_lst())
 
 
 @stock_device_router.message(StockDeviceState.stock_device_id)
 async def add_device_id_for_stock_device(message: Message, state: FSMContext):
-    await state.update_data(stock_device_id=message.text)
+    stock_device_ids = parse_stock_ids(message.text or "")
+
+    if stock_device_ids is None:
+        mes_des = MessageDescription("stock_ids_error")
+        mes_des.message_data = MAX_STOCK_IDS
+        await message.answer(text=mes_des.description())
+        return
+
+    # несколько номеров одного прибора записываются на склад одной пачкой
+    await state.update_data(
+        stock_device_id=str(stock_device_ids[0]),
+        stock_device_ids=stock_device_ids if len(stock_device_ids) > 1 else None,
+    )
     mes_des = MessageDescription("add_device_id_for_stock_device")
     await message.answer(
         text=mes_des.description(),
-        reply_markup=bot_api_db.bot_inline_kb(Marker.DEVICE),
+        reply_markup=await bot_api_db.bot_inline_kb(Marker.DEVICE),
     )
 
 
-@stock_device_router.callback_query(
-    DeviceCallback.filter(F.text_search.in_(devices_cache))
-)
+@stock_device_router.callback_query(DeviceCallback.filter(F.action == Action.ADD))
 async def add_stock_device(
     callback: CallbackQuery, callback_data: DeviceCallback, state: FSMContext
 ):
+    device_name = await bot_api_db.bot_device_name(callback_data.device_id)
+
+    if device_name is None:
+        await callback.answer(text="Прибор не найден, откройте список заново")
+        return
+
     await callback.answer()
     stock_device_data = await state.get_data()
-    stock_device_data["device_name"] = callback_data.device_name
+    stock_device_data["device_name"] = device_name
 
     if callback.message:
         try:
-            result_job = bot_api_db.bot_options_to_add_or_update(stock_device_data)
-            mes_des = MessageDescription(result_job[0])
-            mes_des.message_data = result_job[1]
+            if stock_device_data.get("stock_device_ids"):
+                result_job = await bot_api_db.bot_register_stock_devices(
+                    stock_device_data
+                )
+
+            else:
+                result_job = await bot_api_db.bot_options_to_add_or_update(
+                    stock_device_data
+                )
 
-            if result_job[0] == "update":
+            # api возвращает строку ошибки, если прибор не найден
+            if isinstance(result_job, str) or result_job[0] not in (
+                "update",
+                "bulk",
+                "LED",
+                "FIL",
+            ):
+                kind = "lamp_error"
+                mes_des = MessageDescription(kind)
+                mes_des.message_data = (result_job, stock_device_data)
+
+            else:
+                kind = result_job[0]
+                mes_des = MessageDescription(kind)
+                mes_des.message_data = result_job[1]
+
+            if kind in ("update", "bulk"):
                 await callback.message.answer(
                     text=mes_des.description(),
                     reply_markup=kb_start,
                 )
                 await state.clear()
 
-            elif result_job[0] == "LED":
+            elif kind == "LED":
                 await callback.message.answer(
                     text=mes_des.description(),
                     reply_markup=kb_start,
                 )
                 await state.clear()
 
-            elif result_job[0] == "FIL":
+            elif kind == "FIL":
                 await state.set_data(stock_device_data)
 
                 if callback.message:
@@ -92,9 +129,6 @@ async def add_stock_device(
                 await state.set_state(StockDeviceState.max_lamp_hours)
 
             else:
-                mes_des = MessageDescription("lamp_error")
-                mes_des.message_data = (result_job, stock_device_data)
-
                 await callback.message.answer(
                     text=mes_des.description(),
                     reply_markup=kb_start,
@@ -114,7 +148,19 @@ async def add_lamp_hours_from_stock_device(message: Message, state: FSMContext):
     mes_des = MessageDescription("add_lamp_hours_from_stock_device")
 
     try:
-        result_job = bot_api_db.bot_set_device_from_stockpile_by_name_and_id_to_db(data)
+        if data.get("stock_device_ids"):
+            result_job = await bot_api_db.bot_register_stock_devices(data)
+
+            if isinstance(result_job, tuple):
+                result_job = result_job[1]
+
+        else:
+            result_job = (
+                await bot_api_db.bot_set_device_from_stockpile_by_name_and_id_to_db(
+                    data
+                )
+            )
+
         mes_des.message_data = result_job
 
         if result_job:
@@ -6,7 +6,8 @@ from aiogram.types import ReplyKeyboardRemove
 
 from src.bot.keyboard.keyboard_start import kb_start
 from src.bot.states import AddDeviceType
-from src.bot_api import LampTypeCallback, Marker, run_api
+from src.async_bot_api import run_async_api
+from src.bot_api import LampTypeCallback, Marker
 from src.data_handler import BotHandlerException
 from src.message_handler import MessageDescription
 
@@ -22,7 +23,7 @@ logger.addHandler(logging.StreamHandler())
 device_type_router = Router()
 
 
-db_bot_api = run_api()
+db_bot_api = run_async_api()
 
 
 @device_type_router.message(F.text == "/add_device_type")
@@ -45,13 +46,12 @@ async def add_device_type(message: Message, state: FSMContext):
     await state.update_data(type_description=message.text)
     mes_des = MessageDescription("add_device_type")
     await message.reply(
-        text=mes_des.description(), reply_markup=db_bot_api.bot_inline_kb(Marker.LAMP)
+        text=mes_des.description(),
+        reply_markup=await db_bot_api.bot_inline_kb(Marker.LAMP),
     )
 
 
-@device_type_router.callback_query(
-    LampTypeCallback.filter(F.text_search.in_(["LED", "FIL"]))
-)
+@device_type_router.callback_query(LampTypeCallback.filter())
 async def add_lamp_type(
     callback: CallbackQuery, callback_data: LampTypeCallback, state: FSMContext
 ):
@@ -62,7 +62,7 @@ async def add_lamp_type(
 
     if callback.message:
         try:
-            result_job = db_bot_api.bot_set_device_type(data)
+            result_job = await db_bot_api.bot_set_device_type(data)
             mes_des.message_data = result_job
 
             await callback.message.answer(
@@ -4,10 +4,13 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
 
 from src.bot.states import BrokenDevices, CleanDevices, GetStockDevice, MarkDeviceState
-from src.bot_api import DeviceCallback, Marker, run_api
+from src.async_bot_api import run_async_api
+from src.bot_api import Action, DeviceCallback, Marker
 from src.bot.keyboard.keyboard_start import kb_start, kb_get
+from src.bot.report import send_report
 from src.message_handler import MessageDescription
 from src.scheme_for_validation import StockDeviceData
+from src.utils import modificate_date_to_str, validate_date
 
 logging.basicConfig(
     level=logging.WARNING,
@@ -20,7 +23,7 @@ logger.addHandler(logging.StreamHandler())
 
 get_stock_device_router = Router()
 
-bot_api_db = run_api()
+bot_api_db = run_async_api()
 
 
 @get_stock_device_router.message(F.text == "/stock_device_at_date")
@@ -34,14 +37,16 @@ async def start_get_stock_device_at_date(message: Message, state: FSMContext):
 async def get_stock_device_at_date(message: Message, state: FSMContext):
     await state.update_data(at_clean_date=message.text)
     data = await state.get_data()
-    lst_devices = bot_api_db.bot_get_devices_at_date(data)
     mes_des = MessageDescription("get_stock_device_at_date")
-    mes_des.message_data = lst_devices
-
-    if isinstance(lst_devices, list):
-        await message.answer(text=mes_des.description(), reply_markup=kb_start)
+    rows = await send_report(
+        message,
+        mes_des,
+        bot_api_db.bot_iter_devices_at_date(data, status="1"),
+        reply_markup=kb_start,
+    )
 
-    else:
+    if not rows:
+        mes_des.message_data = "Нет приборов в эту дату"
         await message.answer(text=mes_des.description(), reply_markup=kb_get)
 
     await state.clear()
@@ -58,17 +63,22 @@ async def start_get_broken_device(message: Message, state: FSMContext):
 async def get_broken_device(message: Message, state: FSMContext):
     await state.update_data(at_clean_date=message.text)
     data = await state.get_data()
-    devices = bot_api_db.bot_lst_broken_device_from_stockpile(data)
     mes_des = MessageDescription("get_broken_device")
-    mes_des.message_data = devices
+    rows = await send_report(
+        message,
+        mes_des,
+        bot_api_db.bot_iter_devices_at_date(data, status="0"),
+        reply_markup=kb_start,
+    )
 
-    if isinstance(devices, list):
-        await message.answer(
-            text=mes_des.description(),
-            reply_markup=kb_start,
-        )
+    if not rows:
+        date = data["at_clean_date"]
+        if not validate_date(date):
+            date = modificate_date_to_str()
 
-    else:
+        mes_des.message_data = (
+            f"Не найдено не одного прибора в ремонте за эту дату {date}"
+        )
         await message.answer(text=mes_des.description(), reply_markup=kb_get)
 
     await state.clear()
@@ -100,7 +110,7 @@ async def mark_for_stock_device(message: Message, state: FSMContext):
         await state.update_data(mark=mark)
         await message.reply(
             text=mes_des.description(),
-            reply_markup=bot_api_db.bot_inline_kb(Marker.MARKING_DEVICES),
+            reply_markup=await bot_api_db.bot_inline_kb(Marker.MARKING_DEVICES),
         )
 
     else:
@@ -109,16 +119,20 @@ async def mark_for_stock_device(message: Message, state: FSMContext):
         )
 
 
-@get_stock_device_router.callback_query(
-    DeviceCallback.filter(F.text_search.contains("mark_"))
-)
+@get_stock_device_router.callback_query(DeviceCallback.filter(F.action == Action.MARK))
 async def mark_device(
     callback: CallbackQuery, callback_data: DeviceCallback, state: FSMContext
 ):
+    device_name = await bot_api_db.bot_device_name(callback_data.device_id)
+
+    if device_name is None:
+        await callback.answer(text="Прибор не найден, откройте список заново")
+        return
+
     await callback.answer()
     device_data = await state.get_data()
-    device_data["device_name"] = callback_data.device_name
-    result_job = bot_api_db.bot_change_device_status(device_data)
+    device_data["device_name"] = device_name
+    result_job = await bot_api_db.bot_change_device_status(device_data)
     mes_des = MessageDescription(device_data["mark"])
 
     if callback.message:
@@ -153,20 +167,24 @@ async def choice_stock_device_name(message: Message, state: FSMContext):
     mes_des = MessageDescription("choice_stock_device_name")
     await message.answer(
         text=mes_des.description(),
-        reply_markup=bot_api_db.bot_inline_kb(Marker.GET_DEVICE),
+        reply_markup=await bot_api_db.bot_inline_kb(Marker.GET_DEVICE),
     )
 
 
-@get_stock_device_router.callback_query(
-    DeviceCallback.filter(F.text_search.contains("get_"))
-)
+@get_stock_device_router.callback_query(DeviceCallback.filter(F.action == Action.GET))
 async def show_the_devices_found(
     callback: CallbackQuery, callback_data: DeviceCallback, state: FSMContext
 ):
+    device_name = await bot_api_db.bot_device_name(callback_data.device_id)
+
+    if device_name is None:
+        await callback.answer(text="Прибор не найден, откройте список заново")
+        return
+
     await callback.answer()
     device_data = await state.get_data()
-    device_data["device_name"] = callback_data.device_name
-    stock_device = bot_api_db.bot_device_from_stockpile(device_data)
+    device_data["device_name"] = device_name
+    stock_device = await bot_api_db.bot_device_from_stockpile(device_data)
     mes_des = MessageDescription("show_the_devices_found")
     mes_des.message_data = stock_device
 
@@ -5,9 +5,10 @@ from aiogram.types import CallbackQuery, Message
 from aiogram.types import ReplyKeyboardRemove
 
 from src.bot.keyboard.keyboard_start import kb_start, kb_add, kb_get
+from src.async_bot_api import run_async_api
 from src.bot_api import (
+    Action,
     DeviceFILCallback,
-    run_api,
     Marker,
 )
 from src.bot.states import SourceLampState, ReplacementLamp
@@ -23,7 +24,7 @@ logger = logging.getLogger(__name__)
 logger.addHandler(logging.StreamHandler())
 
 
-bot_api_db = run_api()
+bot_api_db = run_async_api()
 
 lamp_router = Router()
 
@@ -41,23 +42,27 @@ async def stock_device_id_from_lamp(message: Message, state: FSMContext):
     mes_des = MessageDescription("stock_device_id_from_lamp")
     await message.reply(
         text=mes_des.description(),
-        reply_markup=bot_api_db.bot_inline_kb(Marker.REPLACEMENT_LAMP),
+        reply_markup=await bot_api_db.bot_inline_kb(Marker.REPLACEMENT_LAMP),
     )
 
 
-@lamp_router.callback_query(
-    DeviceFILCallback.filter(F.text_search.contains("replace_"))
-)
+@lamp_router.callback_query(DeviceFILCallback.filter(F.action == Action.REPLACE))
 async def device_name_from_lamp(
     callback: CallbackQuery, callback_data: DeviceFILCallback, state: FSMContext
 ):
+    device_name = await bot_api_db.bot_device_name(callback_data.device_id)
+
+    if device_name is None:
+        await callback.answer(text="Прибор не найден, откройте список заново")
+        return
+
     await callback.answer()
     data = await state.get_data()
-    data["device_name"] = callback_data.fil_device
+    data["device_name"] = device_name
     mes_des = MessageDescription("device_name_from_lamp")
 
     if callback.message:
-        if bot_api_db.is_availability_device_from_stockpile(data):
+        if await bot_api_db.is_availability_device_from_stockpile(data):
             await callback.message.answer(text=mes_des.description())
             await state.set_data(data)
             await state.set_state(ReplacementLamp.max_lamp_hours)
@@ -77,7 +82,7 @@ async def max_lamp_hours(message: Message, state: FSMContext):
     mes_des = MessageDescription("max_lamp_hours")
 
     try:
-        message_result = bot_api_db.bot_replacement_lamp(data)
+        message_result = await bot_api_db.bot_replacement_lamp(data)
         mes_des.message_data = message_result
         await message.answer(text=mes_des.description(), reply_markup=kb_add)
 
@@ -102,20 +107,26 @@ async def check_device_name(message: Message, state: FSMContext):
     mes_des = MessageDescription("check_device_name")
     await message.reply(
         text=mes_des.description(),
-        reply_markup=bot_api_db.bot_inline_kb(Marker.DEVICE_FIL),
+        reply_markup=await bot_api_db.bot_inline_kb(Marker.DEVICE_FIL),
     )
 
 
-@lamp_router.callback_query(DeviceFILCallback.filter(F.text_search.contains("fil_")))
+@lamp_router.callback_query(DeviceFILCallback.filter(F.action == Action.FIL))
 async def check_device_FIL(
     callback: CallbackQuery, callback_data: DeviceFILCallback, state: FSMContext
 ):
+    device_name = await bot_api_db.bot_device_name(callback_data.device_id)
+
+    if device_name is None:
+        await callback.answer(text="Прибор не найден, откройте список заново")
+        return
+
     await callback.answer()
     data = await state.get_data()
-    data["device_name"] = callback_data.fil_device
+    data["device_name"] = device_name
     mes_des = MessageDescription("check_device_FIL")
     if callback.message:
-        if bot_api_db.is_availability_device_from_stockpile(data):
+        if await bot_api_db.is_availability_device_from_stockpile(data):
             await state.set_data(data)
             await callback.message.answer(text=mes_des.description())
             await state.set_state(SourceLampState.current_lamp_hours)
@@ -134,7 +145,7 @@ async def check_device_FIL(
 async def check_lamp_hours(message: Message, state: FSMContext):
     await state.update_data(current_hours=message.text)
     data = await state.get_data()
-    result = bot_api_db.bot_lamp_hour_calculate(data)
+    result = await bot_api_db.bot_lamp_hour_calculate(data)
     mes_des = MessageDescription("check_lamp_hours")
     mes_des.message_data = result[0]
 
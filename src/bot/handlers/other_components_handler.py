@@ -2,8 +2,9 @@ import logging
 from aiogram import Router, F
 from aiogram.types import Message
 
-from src.bot_api import run_api
+from src.async_bot_api import run_async_api
 from src.bot.keyboard.keyboard_start import kb_start
+from src.bot.report import send_report
 from src.message_handler import MessageDescription
 
 logging.basicConfig(
@@ -18,28 +19,23 @@ logger.addHandler(logging.StreamHandler())
 other_components_router = Router()
 
 
-bot_api_db = run_api()
+bot_api_db = run_async_api()
 
 
 @other_components_router.message(F.text == "/get_devices")
 async def get_devices(message: Message):
-    devices = bot_api_db.bot_lst_device()
     mes_des = MessageDescription(message.text)
-    mes_des.message_data = devices
+    rows = await send_report(
+        message, mes_des, bot_api_db.bot_iter_devices(), reply_markup=kb_start
+    )
 
-    if devices:
-        await message.answer(
-            text=mes_des.description(),
-            reply_markup=kb_start,
-        )
-
-    else:
-        await message.answer(text=f"<b>{devices}</b>", reply_markup=kb_start)
+    if not rows:
+        await message.answer(text="<b>Приборы не найдены</b>", reply_markup=kb_start)
 
 
 @other_components_router.message(F.text == "/get_companies")
 async def get_companies(message: Message):
-    companies = bot_api_db.bot_lst_company()
+    companies = await bot_api_db.bot_lst_company()
     mes_des = MessageDescription(message.text)
     mes_des.message_data = companies
 
@@ -54,7 +50,7 @@ async def get_companies(message: Message):
 
 @other_components_router.message(F.text == "/get_types")
 async def get_device_types(message: Message):
-    device_types = bot_api_db.bot_lst_device_type()
+    device_types = await bot_api_db.bot_lst_device_type()
     mes_des = MessageDescription(message.text)
     mes_des.message_data = device_types
 
@@ -0,0 +1,33 @@
+import logging
+from aiogram import Router
+from aiogram.types import CallbackQuery
+
+from src.async_bot_api import run_async_api
+from src.bot_api import PageCallback
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.StreamHandler())
+
+
+bot_api_db = run_async_api()
+
+pagination_router = Router()
+
+
+@pagination_router.callback_query(PageCallback.filter())
+async def change_page(callback: CallbackQuery, callback_data: PageCallback):
+    """переключение страницы клавиатуры без смены состояния диалога"""
+
+    await callback.answer()
+
+    if callback.message:
+        await callback.message.edit_reply_markup(
+            reply_markup=await bot_api_db.bot_inline_kb(
+                callback_data.marker, page=callback_data
+            )
+        )
@@ -0,0 +1,55 @@
+import logging
+import os
+from typing import Set
+
+from aiogram import F, Router
+from aiogram.types import Message
+
+from src.async_bot_api import run_async_api
+from src.bot.keyboard.keyboard_start import kb_start
+from src.connection_pool import get_pool
+from src.message_handler import MessageDescription
+from src.metrics import metrics
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.StreamHandler())
+
+
+stats_router = Router()
+
+bot_api_db = run_async_api()
+
+
+def admin_ids_from_env() -> Set[int]:
+    return {
+        int(item) for item in os.environ.get("ADMIN_IDS", "").split(",") if item.strip()
+    }
+
+
+def db_stats() -> dict:
+    """статистика пула потоков и пула соединений для метрик"""
+
+    return {
+        "db_workers": bot_api_db.stats(),
+        "db_pool": get_pool(bot_api_db.api.db_name).stats(),
+    }
+
+
+@stats_router.message(F.text == "/stats")
+async def show_stats(message: Message):
+    if message.from_user is None or message.from_user.id not in admin_ids_from_env():
+        await message.answer(
+            text="<i>Команда доступна только администратору</i>", reply_markup=kb_start
+        )
+        return
+
+    data = metrics.to_dict(limit=10)
+    data["extra"] = db_stats()
+    mes_des = MessageDescription(message.text)
+    mes_des.message_data = data
+    await message.answer(text=mes_des.description(), reply_markup=kb_start)
@@ -0,0 +1,138 @@
+"""
+Модуль отправки длинных отчетов бота частями
+"""
+
+import asyncio
+import html
+import io
+import logging
+import os
+import re
+import weakref
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, List, MutableMapping
+
+from aiogram.types import BufferedInputFile, Message, ReplyKeyboardMarkup
+
+from src.connection_pool import pool_size_from_env
+from src.message_handler import (
+    MESSAGE_LIMIT,
+    REPORT_SEPARATOR,
+    MessageChunks,
+    MessageDescription,
+)
+
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.StreamHandler())
+
+
+def report_max_messages_from_env() -> int:
+    if os.environ.get("REPORT_MAX_MESSAGES"):
+        return int(os.environ["REPORT_MAX_MESSAGES"])
+
+    return 5
+
+
+def report_concurrency_from_env() -> int:
+    if os.environ.get("REPORT_CONCURRENCY"):
+        return int(os.environ["REPORT_CONCURRENCY"])
+
+    return max(1, pool_size_from_env() // 2)
+
+
+# отчет держит соединение пула до конца перебора, поэтому одновременно
+# идет не больше отчетов, чем половина пула
+_report_slots: MutableMapping[asyncio.AbstractEventLoop, asyncio.Semaphore] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def report_slots() -> asyncio.Semaphore:
+    """функция возвращает ограничение отчетов для текущего цикла событий"""
+
+    loop = asyncio.get_running_loop()
+    slots = _report_slots.get(loop)
+
+    if slots is None:
+        slots = asyncio.Semaphore(report_concurrency_from_env())
+        _report_slots[loop] = slots
+
+    return slots
+
+
+def html_to_text(text: str) -> str:
+    """функция убирает html разметку для текстового файла отчета"""
+
+    return html.unescape(re.sub(r"<[^>]+>", "", text))
+
+
+async def send_report(
+    message: Message,
+    mes_des: MessageDescription,
+    batches: AsyncGenerator[List[Any], None],
+    reply_markup: ReplyKeyboardMarkup | None = None,
+    max_messages: int | None = None,
+    limit: int = MESSAGE_LIMIT,
+) -> int:
+    """функция отправляет отчет по мере чтения пачек из базы
+
+    Каждое сообщение уходит, как только набирается limit символов,
+    поэтому первая часть отчета приходит до окончания запроса. После
+    max_messages сообщений остаток отчета собирается в памяти и
+    отправляется документом. Соединение с базой занято, пока идет отчет,
+    поэтому число одновременных отчетов ограничено REPORT_CONCURRENCY.
+    Возвращает количество строк отчета, при пустом результате ничего не
+    отправляет.
+    """
+
+    if max_messages is None:
+        max_messages = report_max_messages_from_env()
+
+    chunker = MessageChunks(limit)
+    document: io.StringIO | None = None
+    sent = 0
+    rows = 0
+
+    async with report_slots(), aclosing(batches) as stream:
+        async for batch in stream:
+            for text in mes_des.render_items(batch):
+                rows += 1
+
+                if document is None and sent >= max_messages:
+                    document = io.StringIO()
+                    rest = chunker.flush()
+
+                    if rest is not None:
+                        document.write(html_to_text(rest) + REPORT_SEPARATOR)
+
+                if document is not None:
+                    document.write(html_to_text(text) + REPORT_SEPARATOR)
+                    continue
+
+                for chunk in chunker.add(text):
+                    await message.answer(text=chunk, reply_markup=reply_markup)
+                    sent += 1
+
+    if document is None:
+        last = chunker.flush()
+
+        if last is not None:
+            await message.answer(text=last, reply_markup=reply_markup)
+
+    else:
+        name = (mes_des.message_input or "report").strip("/")
+        await message.answer_document(
+            document=BufferedInputFile(
+                document.getvalue().encode("utf-8"), filename=f"{name}.txt"
+            ),
+            caption=f"<i>Продолжение отчета в файле</i>, всего строк: <b>{rows}</b>",
+            reply_markup=reply_markup,
+        )
+
+    return rows
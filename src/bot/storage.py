@@ -0,0 +1,223 @@
+"""
+Модуль хранилища состояний fsm бота в sqlite
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from src.connection_pool import apply_pragmas, pragma_profile_from_env
+
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.StreamHandler())
+
+
+CREATE_TABLE_FSM_STATE = """CREATE TABLE IF NOT EXISTS fsm_state
+    (storage_key text primary key,
+    state text,
+    data text not null default '{}',
+    updated_at real not null)
+"""
+
+UPSERT_FSM_STATE = """INSERT INTO fsm_state (storage_key, state, data, updated_at)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(storage_key) DO UPDATE SET
+    state = excluded.state, data = excluded.data, updated_at = excluded.updated_at
+"""
+
+
+class StorageException(Exception):
+    def __init__(self, *args):
+        if args:
+            self.message = args[0]
+            self.value = args[1] if len(args) > 1 else None
+        else:
+            self.message = None
+            self.value = None
+
+    def __str__(self):
+        logger.warning(StorageException)
+
+        if self.message:
+            return "StorageException, {0} {1}".format(self.message, self.value)
+
+        else:
+            return "StorageException вызвана для хранилища состояний"
+
+
+# запись хранилища: (состояние, данные, время изменения)
+Record = Tuple[str | None, Dict[str, Any], float]
+
+
+class SQLiteStorage(BaseStorage):
+    """Хранилище состояний fsm в таблице sqlite
+
+    Каждое изменение сразу пишется в базу, поэтому несколько процессов с
+    одной базой, например webhook за балансировщиком, видят одно и то же
+    состояние, а падение процесса не теряет переходы. Пустое состояние без
+    данных удаляет строку, записи старше ttl секунд считаются пустыми и
+    удаляются при записи не чаще раза в cleanup_interval секунд. Запросы к
+    базе выполняются в потоке, цикл событий не блокируется.
+    """
+
+    def __init__(
+        self,
+        db_name: str,
+        ttl: float = 86400,
+        cleanup_interval: float = 60,
+    ) -> None:
+        self.db_name = db_name
+        self.ttl = ttl
+        self.cleanup_interval = cleanup_interval
+        self._conn: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()
+        self._cleaned_at = 0.0
+
+        self.written = 0
+        self.expired = 0
+
+    @staticmethod
+    def key_to_str(key: StorageKey) -> str:
+        return ":".join(
+            str(item)
+            for item in (
+                key.bot_id,
+                key.chat_id,
+                key.user_id,
+                key.thread_id,
+                key.business_connection_id,
+                key.destiny,
+            )
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_name, check_same_thread=False)
+            apply_pragmas(self._conn, pragma_profile_from_env())
+            self._conn.execute(CREATE_TABLE_FSM_STATE)
+            self._conn.commit()
+
+        return self._conn
+
+    def _read(self, storage_key: str) -> Record | None:
+        with self._db_lock:
+            row = (
+                self._connection()
+                .execute(
+                    "SELECT state, data, updated_at FROM fsm_state WHERE storage_key = ?",
+                    (storage_key,),
+                )
+                .fetchone()
+            )
+
+        if row is None or row[2] < time.time() - self.ttl:
+            return None
+
+        return row[0], json.loads(row[1]), row[2]
+
+    def _write(self, storage_key: str, state: str | None, data: Dict[str, Any]):
+        """метод сохраняет запись и при необходимости удаляет устаревшие"""
+
+        now = time.time()
+
+        with self._db_lock:
+            conn = self._connection()
+
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+
+                if state is None and not data:
+                    conn.execute(
+                        "DELETE FROM fsm_state WHERE storage_key = ?", (storage_key,)
+                    )
+                else:
+                    conn.execute(
+                        UPSERT_FSM_STATE, (storage_key, state, json.dumps(data), now)
+                    )
+
+                if now - self._cleaned_at >= min(self.ttl, self.cleanup_interval):
+                    self.expired += conn.execute(
+                        "DELETE FROM fsm_state WHERE updated_at < ?",
+                        (now - self.ttl,),
+                    ).rowcount
+                    self._cleaned_at = now
+
+                conn.commit()
+
+            except sqlite3.Error as err:
+                conn.rollback()
+                raise StorageException("Состояние fsm не сохранено", err)
+
+            self.written += 1
+
+    async def _get(self, key: StorageKey) -> Record | None:
+        return await asyncio.to_thread(self._read, self.key_to_str(key))
+
+    async def _put(self, key: StorageKey, state: str | None, data: Dict[str, Any]):
+        await asyncio.to_thread(self._write, self.key_to_str(key), state, data)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._get(key)
+        data = record[1] if record else {}
+        await self._put(key, state.state if isinstance(state, State) else state, data)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        record = await self._get(key)
+        return record[0] if record else None
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise StorageException("Данные fsm должны быть словарем", type(data))
+
+        record = await self._get(key)
+        state = record[0] if record else None
+        await self._put(key, state, data.copy())
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = await self._get(key)
+        return record[1].copy() if record else {}
+
+    async def close(self) -> None:
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "written": self.written,
+            "expired": self.expired,
+        }
+
+
+def fsm_storage_from_env() -> BaseStorage:
+    """функция выбирает хранилище fsm по FSM_STORAGE: memory или sqlite,
+    по умолчанию состояния хранятся в памяти"""
+
+    kind = os.environ.get("FSM_STORAGE", "memory")
+
+    if kind == "memory":
+        return MemoryStorage()
+
+    if kind == "sqlite":
+        return SQLiteStorage(
+            os.environ.get("FSM_DB", "fsm_storage.db"),
+            ttl=float(os.environ.get("FSM_TTL", 86400)),
+        )
+
+    raise StorageException("Неизвестное хранилище fsm", kind)
@@ -5,17 +5,18 @@
 import logging
 import os
 from enum import StrEnum
-from typing import Dict, Generic, List, Tuple
+from typing import Any, Dict, Generator, Generic, List, Tuple
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.enums import ParseMode
-from aiogram.types import InlineKeyboardMarkup
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.filters.callback_data import CallbackData
 
+from src.bot.storage import fsm_storage_from_env
 from src.data_handler import DatabaseQueryHandler, BotHandlerException
 from src.scheme_for_validation import (
+    DeviceKeyData,
     Lamp,
     MessageInput,
     OutputDeviceCompanyTable,
@@ -25,8 +26,14 @@ from src.scheme_for_validation import (
     StockDeviceData,
 )
 from src.secret import secrets
-from src.utils import modificate_date_to_str, validate_date
+from src.utils import (
+    date_to_iso,
+    format_stock_ids,
+    modificate_date_to_str,
+    validate_date,
+)
 from src.database_interface import Table
+from src.reference_cache import get_reference_cache
 from src.query_scheme import (
     QuerySchemeForDeviceType,
     QuerySchemeForDevice,
@@ -82,40 +89,72 @@ if token:
         token=token,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML),
     )
-    dp = Dispatcher(storage=MemoryStorage())
+    dp = Dispatcher(storage=fsm_storage_from_env())
 
 else:
     raise TokenError("Ошибка подключения бота. Неверный токен")
 
 
-class DeviceFILCallback(CallbackData, prefix="device_fill"):
-    text_search: str
-    fil_device: str
+class Action(StrEnum):
+    """однобуквенные коды действий для callback_data"""
+
+    ADD = "a"
+    GET = "g"
+    MARK = "m"
+    FIL = "f"
+    REPLACE = "r"
+
+
+class DeviceFILCallback(CallbackData, prefix="df"):
+    action: Action
+    device_id: int
+
 
+class DeviceTypeCallback(CallbackData, prefix="dt"):
+    type_id: int
 
-class DeviceTypeCallback(CallbackData, prefix="device_type"):
-    text_search: str
-    type_title: str
 
+class DeviceCompanyCallback(CallbackData, prefix="dc"):
+    company_id: int
 
-class DeviceCompanyCallback(CallbackData, prefix="device_company"):
-    text_search: str
-    company_name: str
 
+class DeviceCallback(CallbackData, prefix="d"):
+    action: Action
+    device_id: int
 
-class DeviceCallback(CallbackData, prefix="device"):
-    text_search: str
-    device_name: str
 
+class LampTypeCallback(CallbackData, prefix="lt"):
+    lamp_type: Lamp
+
+
+class PageCallback(CallbackData, prefix="page"):
+    marker: Marker
+    after: int = 0
+    before: int = 0
+
+
+# клавиатуры с приборами, которые выводятся постранично
+DEVICE_MARKERS = (
+    Marker.DEVICE,
+    Marker.GET_DEVICE,
+    Marker.MARKING_DEVICES,
+    Marker.DEVICE_FIL,
+    Marker.REPLACEMENT_LAMP,
+)
+FIL_MARKERS = (Marker.DEVICE_FIL, Marker.REPLACEMENT_LAMP)
 
-class LampTypeCallback(CallbackData, prefix="lamp_type"):
-    text_search: str
-    lamp_type: str
+
+def kb_page_size() -> int:
+    if os.environ.get("KB_PAGE_SIZE"):
+        return int(os.environ["KB_PAGE_SIZE"])
+
+    return 24
 
 
 class APIBotDb(Generic[Table, TableScheme]):
     def __init__(self, db_name: str) -> None:
         self.db_name = db_name
+        self.page_size = kb_page_size()
 
     def bot_device_from_stockpile(
         self, where_data: Dict[str, str]
@@ -210,8 +249,8 @@ class APIBotDb(Generic[Table, TableScheme]):
         if where_data and validate_date(where_data["at_clean_date"]):
             row_where = MessageInput(
                 {
-                    ("sd", "at_clean_date"): where_data["at_clean_date"],
                     ("sd", "stock_device_status"): "0",
+                    ("sd", "at_clean_iso"): date_to_iso(where_data["at_clean_date"]),
                 }
             )
             stock_devices = api.database_get_search_by_row(extra_where_data=row_where)
@@ -226,8 +265,8 @@ class APIBotDb(Generic[Table, TableScheme]):
             date = modificate_date_to_str()
             row_where = MessageInput(
                 {
-                    ("sd", "at_clean_date"): date,
                     ("sd", "stock_device_status"): "0",
+                    ("sd", "at_clean_iso"): date_to_iso(date),
                 }
             )
             stock_devices = api.database_get_search_by_row(extra_where_data=row_where)
@@ -248,8 +287,8 @@ class APIBotDb(Generic[Table, TableScheme]):
         if validate_date(where_data["at_clean_date"]):
             row_where = MessageInput(
                 {
-                    ("sd", "at_clean_date"): where_data["at_clean_date"],
                     ("sd", "stock_device_status"): "1",
+                    ("sd", "at_clean_iso"): date_to_iso(where_data["at_clean_date"]),
                 }
             )
             stock_devices = api.database_get_search_by_row(row_where)
@@ -264,8 +303,8 @@ class APIBotDb(Generic[Table, TableScheme]):
             date = modificate_date_to_str()
             row_where = MessageInput(
                 {
-                    ("sd", "at_clean_date"): date,
                     ("sd", "stock_device_status"): "1",
+                    ("sd", "at_clean_iso"): date_to_iso(date),
                 }
             )
             stock_devices = api.database_get_search_by_row(extra_where_data=row_where)
@@ -278,6 +317,26 @@ class APIBotDb(Generic[Table, TableScheme]):
             else:
                 return "Нет приборов в эту дату"
 
+    def bot_iter_devices_at_date(
+        self, where_data: Dict[str, str], status: str = "1", size: int | None = None
+    ) -> Generator[List[StockBrokenDeviceData]]:
+        """метод отдает приборы со статусом за дату пачками по size строк,
+        при неверной дате берется текущая"""
+
+        api = DatabaseQueryHandler(self.db_name, QuerySchemeForStockDevice())
+        date = where_data.get("at_clean_date") or ""
+
+        if not validate_date(date):
+            date = modificate_date_to_str()
+
+        row_where = MessageInput(
+            {
+                ("sd", "stock_device_status"): status,
+                ("sd", "at_clean_iso"): date_to_iso(date),
+            }
+        )
+        yield from api.database_iter_search_by_row(row_where, size=size)
+
     def bot_lst_device(self) -> List[OutputDeviceTable] | str:
         """метод для получения всего списка приборов"""
 
@@ -290,6 +349,16 @@ class APIBotDb(Generic[Table, TableScheme]):
         else:
             return "Приборы не найдены"
 
+    def bot_iter_devices(
+        self, size: int | None = None
+    ) -> Generator[List[OutputDeviceTable]]:
+        """метод отдает список приборов пачками по size строк"""
+
+        api = DatabaseQueryHandler(self.db_name, QuerySchemeForDevice())
+
+        for batch in api.database_iter_items(size=size):
+            yield [item for item in batch if isinstance(item, OutputDeviceTable)]
+
     def bot_lst_company(self) -> List[OutputDeviceCompanyTable] | str:
         """метод для получения всех компаний производителей"""
 
@@ -323,16 +392,13 @@ class APIBotDb(Generic[Table, TableScheme]):
             return "Типы приборов не найдены"
 
     def bot_device_id(self, device_name: str | None) -> str:
-        """метод для получения id прибора"""
-
-        api = DatabaseQueryHandler(self.db_name, QuerySchemeForDevice())
+        """метод для получения id прибора из кэша справочников"""
 
         if device_name:
-            row_where = MessageInput({("d", "device_name"): device_name})
-            device = api.database_get_item(extra_where_data=row_where)
+            device_id = get_reference_cache(self.db_name).device_id(device_name)
 
-            if isinstance(device, OutputDeviceTable):
-                return str(device.device_id)
+            if device_id is not None:
+                return str(device_id)
 
             else:
                 return f"В списке приборов по имени {device_name} не чего не нашлось"
@@ -341,16 +407,13 @@ class APIBotDb(Generic[Table, TableScheme]):
             raise APIBotDbException("Не переданы аргументы")
 
     def bot_company_id(self, company_name: str | None) -> str:
-        """метод для получения id компании производителя"""
-
-        api = DatabaseQueryHandler(self.db_name, QuerySchemeForDeviceCompany())
+        """метод для получения id компании производителя из кэша справочников"""
 
         if company_name:
-            row_where = MessageInput({("dc", "company_name"): company_name})
-            company = api.database_get_item(extra_where_data=row_where)
+            company_id = get_reference_cache(self.db_name).company_id(company_name)
 
-            if isinstance(company, OutputDeviceCompanyTable):
-                return str(company.company_id)
+            if company_id is not None:
+                return str(company_id)
 
             else:
                 return f"В списке компаний по имени {company_name} не чего не найдено"
@@ -359,16 +422,13 @@ class APIBotDb(Generic[Table, TableScheme]):
             raise APIBotDbException("Не переданы аргументы")
 
     def bot_type_id(self, type_title: str | None) -> str:
-        """метод для получения всех типов приборов по названию типа"""
-
-        api = DatabaseQueryHandler(self.db_name, QuerySchemeForDeviceType())
+        """метод для получения id типа прибора по названию из кэша справочников"""
 
         if type_title:
-            row_where = MessageInput({("dt", "type_title"): type_title})
-            device_type = api.database_get_item(extra_where_data=row_where)
+            type_id = get_reference_cache(self.db_name).type_id(type_title)
 
-            if isinstance(device_type, OutputDeviceTypeTable):
-                return str(device_type.type_device_id)
+            if type_id is not None:
+                return str(type_id)
 
             else:
                 return f"В списке типов по названию {type_title} не чего не найдено"
@@ -460,36 +520,95 @@ class APIBotDb(Generic[Table, TableScheme]):
     def bot_options_to_add_or_update(
         self, where_data: Dict[str, str]
     ) -> str | Tuple[Lamp | str, str]:
+        """метод добавления прибора на склад или обновления даты его очистки
+        одним запросом поиска и одной записью в общей транзакции"""
+
+        api = DatabaseQueryHandler(self.db_name, QuerySchemeForStockDevice())
+
         match where_data:
             case {
-                "stock_device_id": str(),
+                "stock_device_id": str(stock_device_id),
                 "device_name": str(device_name),
             }:
-                if self.is_availability_device_from_stockpile(where_data):
-                    result_job = self.bot_update_devices_stock_clearence_date(
-                        where_data
-                    )
+                max_lamp_hours = where_data.get("max_lamp_hours")
+                registration = api.database_stock_registration(
+                    stock_device_id=stock_device_id,
+                    device_name=device_name,
+                    max_lamp_hours=max_lamp_hours or "0",
+                    at_clean_date=modificate_date_to_str(),
+                )
+
+                if registration is None:
+                    return f"В базе отсутсвуют записи о приборе {device_name}"
+
+                elif registration.in_stock:
+                    result_job = f"Данные прибора - {device_name} обновлены"
                     logger.warning(result_job)
                     return "update", result_job
 
-                elif self.is_availability_device(device_name=device_name):
-                    lamp_type = self.is_LED_lamp_type_by_device_name(device_name)
-
-                    if lamp_type:
-                        result_job = (
-                            self.bot_set_device_from_stockpile_by_name_and_id_to_db(
-                                where_data
-                            )
-                        )
-                        logger.warning(result_job)
-                        return "LED", result_job
+                elif registration.lamp_type == "LED":
+                    if max_lamp_hours:
+                        result_job = f"Прибор с именем {device_name} с id {stock_device_id} и часами лампы {max_lamp_hours} добавлен в базу данных"
 
                     else:
-                        return "FIL", str(where_data)
+                        result_job = f"Прибор с именем {device_name} с id {stock_device_id} добавлен в базу данных"
+
+                    logger.warning(result_job)
+                    return "LED", result_job
 
                 else:
+                    return "FIL", str(where_data)
+
+            case _:
+                return "Данные не прошли валидацию"
+
+    def bot_register_stock_devices(
+        self, where_data: Dict[str, Any]
+    ) -> str | Tuple[str, str]:
+        """метод записи на склад сразу нескольких номеров одного прибора
+        одной транзакцией, возвращает сводку по добавленным и обновленным"""
+
+        api = DatabaseQueryHandler(self.db_name, QuerySchemeForStockDevice())
+
+        match where_data:
+            case {
+                "stock_device_ids": list(stock_device_ids),
+                "device_name": str(device_name),
+            } if stock_device_ids:
+                max_lamp_hours = where_data.get("max_lamp_hours")
+
+                if max_lamp_hours is not None and not str(max_lamp_hours).isdigit():
+                    return "Часы лампы должны быть числом"
+
+                result = api.database_stock_bulk_registration(
+                    stock_device_ids=stock_device_ids,
+                    device_name=device_name,
+                    max_lamp_hours=max_lamp_hours,
+                    at_clean_date=modificate_date_to_str(),
+                )
+
+                if result is None:
                     return f"В базе отсутсвуют записи о приборе {device_name}"
 
+                if not result.written:
+                    return "FIL", f"Новых номеров: {len(result.added)}."
+
+                summary = [f"Прибор {device_name}"]
+
+                if result.added:
+                    summary.append(
+                        f"добавлено {len(result.added)}: {format_stock_ids(result.added)}"
+                    )
+
+                if result.updated:
+                    summary.append(
+                        f"обновлена дата очистки {len(result.updated)}: {format_stock_ids(result.updated)}"
+                    )
+
+                result_job = ", ".join(summary)
+                logger.warning(result_job)
+                return "bulk", result_job
+
             case _:
                 return "Данные не прошли валидацию"
 
@@ -506,7 +625,6 @@ class APIBotDb(Generic[Table, TableScheme]):
                 isinstance(device_type, OutputDeviceTypeTable)
                 and device_type.lamp_type == "LED"
             ):
-                print(device_type.lamp_type)
                 led = True
 
         return led
@@ -573,6 +691,7 @@ class APIBotDb(Generic[Table, TableScheme]):
             }:
                 item = (type_title, type_description, lamp_type)
                 api.database_set_item(extra_set_data=item)
+                get_reference_cache(self.db_name).invalidate()
                 return f"Тип прибора с названием {type_title} добавлен в бд"
 
             case _:
@@ -591,6 +710,7 @@ class APIBotDb(Generic[Table, TableScheme]):
             }:
                 item = (company_name, producer_coutry, description_company)
                 api.database_set_item(extra_set_data=item)
+                get_reference_cache(self.db_name).invalidate()
                 return f"Компания с названием {company_name} добавлена в базу"
 
             case _:
@@ -611,6 +731,7 @@ class APIBotDb(Generic[Table, TableScheme]):
                 type_device_id = self.bot_type_id(type_title)
                 item = (device_name, company_id, type_device_id)
                 api.database_set_item(extra_set_data=item)
+                get_reference_cache(self.db_name).invalidate()
                 return f"Прибор с именем {device_name} добавлен в базу"
 
             case _:
@@ -805,29 +926,43 @@ class APIBotDb(Generic[Table, TableScheme]):
                 return f"Данные - {where_data} не прошли валидацию"
 
     def bot_keyboard_company_name_lst(self) -> List[str]:
-        companys = self.bot_lst_company()
+        def build() -> Tuple[str, ...]:
+            companys = self.bot_lst_company()
 
-        return [
-            item.company_name
-            for item in companys
-            if isinstance(item, OutputDeviceCompanyTable)
-        ]
+            return tuple(
+                item.company_name
+                for item in companys
+                if isinstance(item, OutputDeviceCompanyTable)
+            )
+
+        cache = get_reference_cache(self.db_name)
+        return list(cache.derived(("names", Marker.DCOMPANY), build))
 
     def bot_keyboard_device_type_lst(self) -> List[str]:
-        device_type = self.bot_lst_device_type()
+        def build() -> Tuple[str, ...]:
+            device_type = self.bot_lst_device_type()
+
+            return tuple(
+                item.type_title
+                for item in device_type
+                if isinstance(item, OutputDeviceTypeTable)
+            )
 
-        return [
-            item.type_title
-            for item in device_type
-            if isinstance(item, OutputDeviceTypeTable)
-        ]
+        cache = get_reference_cache(self.db_name)
+        return list(cache.derived(("names", Marker.DTYPE), build))
 
     def bot_keyboard_device_lst(self) -> List[str]:
-        device = self.bot_lst_device()
+        def build() -> Tuple[str, ...]:
+            device = self.bot_lst_device()
 
-        return [
-            item.device_name for item in device if isinstance(item, OutputDeviceTable)
-        ]
+            return tuple(
+                item.device_name
+                for item in device
+                if isinstance(item, OutputDeviceTable)
+            )
+
+        cache = get_reference_cache(self.db_name)
+        return list(cache.derived(("names", Marker.DEVICE), build))
 
     def bot_lst_device_by_type_lamp_fil(self) -> List[OutputDeviceTable]:
         """возвращаем приборы по типу лампа накаливания"""
@@ -855,97 +990,153 @@ class APIBotDb(Generic[Table, TableScheme]):
         else:
             raise BotHandlerException("Нет данных для клавиатуры")
 
-    def bot_inline_kb(self, marker: Marker) -> InlineKeyboardMarkup:
+    def bot_device_page(
+        self, marker: Marker, after: int = 0, before: int = 0
+    ) -> Tuple[List[DeviceKeyData], bool, bool]:
+        """метод возвращает страницу приборов для клавиатуры
+        и признаки наличия предыдущей и следующей страниц"""
+
+        api = DatabaseQueryHandler(self.db_name, QuerySchemeForDevice())
+        lamp_type = "FIL" if marker in FIL_MARKERS else None
+        devices = api.database_get_device_page(
+            after=after, before=before, lamp_type=lamp_type, limit=self.page_size + 1
+        )
+
+        if before:
+            has_prev = len(devices) > self.page_size
+            has_next = True
+            devices = devices[-self.page_size :]
+
+        else:
+            has_prev = after > 0
+            has_next = len(devices) > self.page_size
+            devices = devices[: self.page_size]
+
+        if not devices and lamp_type and not (after or before):
+            raise BotHandlerException("Не найдены приборы с лампой накаливания")
+
+        return devices, has_prev, has_next
+
+    @staticmethod
+    def device_callback(marker: Marker, device_id: int) -> CallbackData:
+        match marker:
+            case Marker.DEVICE_FIL:
+                return DeviceFILCallback(action=Action.FIL, device_id=device_id)
+
+            case Marker.REPLACEMENT_LAMP:
+                return DeviceFILCallback(action=Action.REPLACE, device_id=device_id)
+
+            case Marker.GET_DEVICE:
+                return DeviceCallback(action=Action.GET, device_id=device_id)
+
+            case Marker.MARKING_DEVICES:
+                return DeviceCallback(action=Action.MARK, device_id=device_id)
+
+            case _:
+                return DeviceCallback(action=Action.ADD, device_id=device_id)
+
+    def bot_device_name(self, device_id: int) -> str | None:
+        """метод для получения названия прибора по id из кэша справочников"""
+
+        return get_reference_cache(self.db_name).device_name(device_id)
+
+    def bot_company_name(self, company_id: int) -> str | None:
+        """метод для получения названия компании по id из кэша справочников"""
+
+        return get_reference_cache(self.db_name).company_name(company_id)
+
+    def bot_type_title(self, type_id: int) -> str | None:
+        """метод для получения названия типа прибора по id из кэша справочников"""
+
+        return get_reference_cache(self.db_name).type_title(type_id)
+
+    def bot_inline_kb(
+        self, marker: Marker, page: PageCallback | None = None
+    ) -> InlineKeyboardMarkup:
+        """метод возвращает клавиатуру из кэша, клавиатура строится заново
+        только после изменения справочников"""
+
+        after = page.after if page else 0
+        before = page.before if page else 0
+        cache = get_reference_cache(self.db_name)
+        return cache.derived(
+            ("kb", marker, after, before, self.page_size),
+            lambda: self.build_inline_kb(marker, after, before),
+        )
+
+    def build_inline_kb(
+        self, marker: Marker, after: int = 0, before: int = 0
+    ) -> InlineKeyboardMarkup:
         kb_builder = InlineKeyboardBuilder()
         kb_builder.button(text="/cancel", callback_data="/cancel")
+        cache = get_reference_cache(self.db_name)
+        navigation = []
 
         match marker:
-            case Marker.DEVICE_FIL:
+            case _ if marker in DEVICE_MARKERS:
+                devices, has_prev, has_next = self.bot_device_page(
+                    marker, after=after, before=before
+                )
                 [
                     kb_builder.button(
-                        text=item,
-                        callback_data=DeviceFILCallback(
-                            text_search="fil_" + item, fil_device=item
-                        ),
+                        text=item.device_name,
+                        callback_data=self.device_callback(marker, item.device_id),
                     )
-                    for item in self.bot_keyboard_device_lst_from_fil()
+                    for item in devices
                 ]
 
-            case Marker.DCOMPANY:
-                [
-                    kb_builder.button(
-                        text=item,
-                        callback_data=DeviceCompanyCallback(
-                            text_search=item, company_name=item
-                        ),
+                if devices and has_prev:
+                    navigation.append(
+                        InlineKeyboardButton(
+                            text="«",
+                            callback_data=PageCallback(
+                                marker=marker, before=devices[0].device_id
+                            ).pack(),
+                        )
                     )
-                    for item in self.bot_keyboard_company_name_lst()
-                ]
 
-            case Marker.DTYPE:
-                [
-                    kb_builder.button(
-                        text=item,
-                        callback_data=DeviceTypeCallback(
-                            text_search=item, type_title=item
-                        ),
-                    )
-                    for item in self.bot_keyboard_device_type_lst()
-                ]
-            case Marker.DEVICE:
-                [
-                    kb_builder.button(
-                        text=item,
-                        callback_data=DeviceCallback(
-                            text_search=item, device_name=item
-                        ),
+                if devices and has_next:
+                    navigation.append(
+                        InlineKeyboardButton(
+                            text="»",
+                            callback_data=PageCallback(
+                                marker=marker, after=devices[-1].device_id
+                            ).pack(),
+                        )
                     )
-                    for item in self.bot_keyboard_device_lst()
-                ]
-            case Marker.GET_DEVICE:
+
+            case Marker.DCOMPANY:
                 [
                     kb_builder.button(
-                        text=item,
-                        callback_data=DeviceCallback(
-                            text_search=f"get_{item}", device_name=item
-                        ),
+                        text=name,
+                        callback_data=DeviceCompanyCallback(company_id=company_id),
                     )
-                    for item in self.bot_keyboard_device_lst()
+                    for company_id, name in cache.items("device_company")
                 ]
-            case Marker.MARKING_DEVICES:
+
+            case Marker.DTYPE:
                 [
                     kb_builder.button(
-                        text=item,
-                        callback_data=DeviceCallback(
-                            text_search=f"mark_{item}", device_name=item
-                        ),
+                        text=name,
+                        callback_data=DeviceTypeCallback(type_id=type_id),
                     )
-                    for item in self.bot_keyboard_device_lst()
+                    for type_id, name in cache.items("device_type")
                 ]
 
             case Marker.LAMP:
                 [
                     kb_builder.button(
                         text=item,
-                        callback_data=LampTypeCallback(
-                            text_search=item, lamp_type=item
-                        ),
+                        callback_data=LampTypeCallback(lamp_type=item),
                     )
                     for item in ["LED", "FIL"]
                 ]
 
-            case Marker.REPLACEMENT_LAMP:
-                [
-                    kb_builder.button(
-                        text=item,
-                        callback_data=DeviceFILCallback(
-                            text_search="replace_" + item, fil_device=item
-                        ),
-                    )
-                    for item in self.bot_keyboard_device_lst_from_fil()
-                ]
-
         kb_builder.adjust(3)
+
+        if navigation:
+            kb_builder.row(*navigation)
+
         return kb_builder.as_markup()
 
 
@@ -0,0 +1,494 @@
+"""
+Модуль быстрой загрузки данных в базу
+
+Строки читаются построчно из csv, jsonl или sql дампов с многострочными
+INSERT и вставляются executemany пачками в одной транзакции. На время
+загрузки индексы таблиц удаляются и строятся заново перед фиксацией, а
+строки с уже занятым ключом пропускаются через INSERT OR IGNORE. Строки
+таблиц, где ключа в данных нет, например приборы без device_id,
+вставляются только если такой же строки еще нет, поэтому повторная
+загрузка тех же файлов не создает дубликатов.
+
+Загрузка при старте запоминает sha256 каждого файла в таблице seed_file и
+пропускает файлы, которые не менялись, а строки справочников в измененных
+файлах с уже занятым ключом обновляет. Строки склада, которые ведет бот,
+повторная загрузка не перезаписывает.
+"""
+
+import csv
+import datetime
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from itertools import groupby, islice
+from typing import Any, Callable, Collection, Dict, Iterator, List, Tuple
+
+from src.reference_cache import REFERENCE_TABLES
+
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.StreamHandler())
+
+
+SQL_INSERT = re.compile(
+    r"INSERT\s+(?:OR\s+\w+\s+)?INTO\s+[`\"']?(\w+)[`\"']?\s*\(([^)]*)\)\s*VALUES",
+    re.IGNORECASE,
+)
+SQL_TOKEN = re.compile(r"'(?:[^']|'')*'|[(),;]|[^\s(),;']+")
+
+# строка файла: (таблица, столбцы, значения)
+Row = Tuple[str, Tuple[str, ...], Tuple[Any, ...]]
+
+UPSERT_SEED_FILE = """INSERT INTO seed_file (fp, sha256, rows, loaded_at)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(fp) DO UPDATE SET
+    sha256 = excluded.sha256, rows = excluded.rows, loaded_at = excluded.loaded_at
+"""
+
+
+class BulkLoadException(Exception):
+    def __init__(self, *args):
+        if args:
+            self.message = args[0]
+            self.value = args[1] if len(args) > 1 else None
+        else:
+            self.message = None
+            self.value = None
+
+    def __str__(self):
+        logger.warning(BulkLoadException)
+
+        if self.message:
+            return "BulkLoadException, {0} {1}".format(self.message, self.value)
+
+        else:
+            return "BulkLoadException вызвана для загрузки данных"
+
+
+class LoadResult:
+    """Итог загрузки одного файла"""
+
+    def __init__(self, fp: str) -> None:
+        self.fp = fp
+        self.rows = 0
+        self.inserted = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_s(self) -> float:
+        return round(self.rows / self.seconds, 1) if self.seconds else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "fp": self.fp,
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "seconds": round(self.seconds, 4),
+            "rows_per_s": self.rows_per_s,
+        }
+
+
+def sql_literal(token: str) -> Any:
+    if token.startswith("'"):
+        return token[1:-1].replace("''", "'")
+
+    if token.upper() == "NULL":
+        return None
+
+    try:
+        return int(token)
+
+    except ValueError:
+        pass
+
+    try:
+        return float(token)
+
+    except ValueError:
+        raise BulkLoadException("Неизвестное значение в sql дампе", token)
+
+
+def sql_tokens(fp: str) -> Iterator[str]:
+    """функция читает дамп построчно и отдает токены sql, строка в
+    кавычках, продолжающаяся на следующих строках файла, собирается целиком"""
+
+    with open(fp, "r", encoding="utf-8") as file:
+        text = ""
+
+        for line in file:
+            text += line
+
+            # нечетное число кавычек значит, что строковое значение не закрыто
+            if text.count("'") % 2:
+                continue
+
+            for token in SQL_TOKEN.finditer(text):
+                yield token[0]
+
+            text = ""
+
+    if text:
+        raise BulkLoadException("Незакрытая строка в sql дампе", fp)
+
+
+def read_sql(fp: str) -> Iterator[Row]:
+    """функция разбирает значения многострочных INSERT из дампа без
+    выполнения sql, остальные выражения дампа пропускаются. Файл читается
+    построчно, поэтому в памяти держится только текущая строка значений"""
+
+    head: List[str] = []
+    table = ""
+    columns: Tuple[str, ...] = ()
+    row: List[Any] | None = None
+    in_values = False
+
+    for value in sql_tokens(fp):
+        if not in_values:
+            if value == ";":
+                head = []
+
+            elif value.upper() == "VALUES":
+                header = SQL_INSERT.search(" ".join(head + [value]))
+                head = []
+
+                if header is not None:
+                    table = header[1]
+                    columns = tuple(
+                        item.strip(" \t\n`\"'") for item in header[2].split(",")
+                    )
+                    in_values = True
+
+            else:
+                head.append(value)
+
+        elif value == "(":
+            row = []
+
+        elif value == ")" and row is not None:
+            yield table, columns, tuple(row)
+            row = None
+
+        elif value == ";":
+            in_values = False
+
+        elif value != ",":
+            if row is None:
+                raise BulkLoadException("Ошибка разбора sql дампа", fp)
+
+            row.append(sql_literal(value))
+
+
+def read_csv(fp: str, table: str) -> Iterator[Row]:
+    """функция читает csv с заголовком, пустое поле читается как NULL"""
+
+    with open(fp, "r", encoding="utf-8", newline="") as file:
+        reader = csv.reader(file)
+        columns = tuple(next(reader, ()))
+
+        for values in reader:
+            if values:
+                yield table, columns, tuple(value or None for value in values)
+
+
+def read_jsonl(fp: str, table: str) -> Iterator[Row]:
+    """функция читает по одному json объекту на строку"""
+
+    with open(fp, "r", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                item = json.loads(line)
+                yield table, tuple(item), tuple(item.values())
+
+
+def read_rows(fp: str, table: str | None = None) -> Iterator[Row]:
+    """функция выбирает чтение по расширению файла, для csv и jsonl
+    таблица по умолчанию берется из имени файла"""
+
+    name, ext = os.path.splitext(os.path.basename(fp))
+
+    if ext == ".sql":
+        return read_sql(fp)
+
+    if ext == ".csv":
+        return read_csv(fp, table or name)
+
+    if ext in (".jsonl", ".ndjson"):
+        return read_jsonl(fp, table or name)
+
+    raise BulkLoadException("Неизвестный формат файла", fp)
+
+
+def table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [
+        row[0]
+        for row in conn.execute("SELECT name FROM pragma_table_info(?)", (table,))
+    ]
+
+
+def default_columns(conn: sqlite3.Connection, table: str) -> frozenset:
+    return frozenset(
+        row[0]
+        for row in conn.execute(
+            "SELECT name FROM pragma_table_info(?) WHERE dflt_value IS NOT NULL",
+            (table,),
+        )
+    )
+
+
+def without_nulls(conn: sqlite3.Connection, rows: Iterator[Row]) -> Iterator[Row]:
+    """функция убирает из строк пустые значения столбцов со значением по
+    умолчанию, чтобы sqlite подставил DEFAULT вместо явного NULL"""
+
+    defaults: Dict[str, frozenset] = {}
+
+    for name, columns, values in rows:
+        if None in values:
+            if name not in defaults:
+                defaults[name] = default_columns(conn, name)
+
+            pairs = [
+                (column, value)
+                for column, value in zip(columns, values)
+                if value is not None or column not in defaults[name]
+            ]
+            columns = tuple(column for column, _ in pairs)
+            values = tuple(value for _, value in pairs)
+
+        yield name, columns, values
+
+
+def key_columns(
+    conn: sqlite3.Connection, table: str, columns: Tuple[str, ...]
+) -> Tuple[str, ...] | None:
+    """функция возвращает первичный ключ или столбцы уникального индекса
+    таблицы, если они входят в столбцы вставки"""
+
+    pk = tuple(
+        row[0]
+        for row in conn.execute(
+            "SELECT name FROM pragma_table_info(?) WHERE pk > 0 ORDER BY pk", (table,)
+        )
+    )
+
+    if pk and set(pk) <= set(columns):
+        return pk
+
+    for (index,) in conn.execute(
+        'SELECT name FROM pragma_index_list(?) WHERE "unique" = 1', (table,)
+    ).fetchall():
+        index_columns = tuple(
+            row[0]
+            for row in conn.execute(
+                "SELECT name FROM pragma_index_info(?) ORDER BY seqno", (index,)
+            )
+        )
+
+        if set(index_columns) <= set(columns):
+            return index_columns
+
+    return None
+
+
+def insert_query(
+    table: str,
+    columns: Tuple[str, ...],
+    key: Tuple[str, ...] | None,
+    upsert: bool = False,
+) -> str:
+    """функция строит вставку строки: по ключу строка пропускается или при
+    upsert обновляется, без ключа вставляется только если такой же строки нет"""
+
+    names = ", ".join(f'"{column}"' for column in columns)
+    params = ", ".join(f"?{index}" for index in range(1, len(columns) + 1))
+
+    if key and upsert:
+        rest = [column for column in columns if column not in key]
+        target = ", ".join(f'"{column}"' for column in key)
+
+        if not rest:
+            return f"INSERT INTO {table} ({names}) VALUES ({params}) ON CONFLICT({target}) DO NOTHING"
+
+        update = ", ".join(f'"{column}" = excluded."{column}"' for column in rest)
+        old = ", ".join(f'{table}."{column}"' for column in rest)
+        new = ", ".join(f'excluded."{column}"' for column in rest)
+        # строки без изменений не переписываются и не считаются записанными
+        return (
+            f"INSERT INTO {table} ({names}) VALUES ({params}) "
+            f"ON CONFLICT({target}) DO UPDATE SET {update} WHERE ({old}) IS NOT ({new})"
+        )
+
+    if key:
+        return f"INSERT OR IGNORE INTO {table} ({names}) VALUES ({params})"
+
+    same = " AND ".join(
+        f'"{column}" IS ?{index}' for index, column in enumerate(columns, 1)
+    )
+    return f"INSERT INTO {table} ({names}) SELECT {params} WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE {same})"
+
+
+def drop_indexes(conn: sqlite3.Connection, table: str) -> List[str]:
+    """функция удаляет индексы таблицы и возвращает sql для их создания,
+    индексы первичного ключа и unique остаются"""
+
+    indexes = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+        (table,),
+    ).fetchall()
+
+    for name, _ in indexes:
+        conn.execute(f'DROP INDEX "{name}"')
+
+    return [sql for _, sql in indexes]
+
+
+def bulk_load(
+    conn: sqlite3.Connection,
+    fp_lst: List[str],
+    table: str | None = None,
+    batch_size: int = 50000,
+    before_commit: Callable[[List[LoadResult]], None] | None = None,
+    upsert_tables: Collection[str] = (),
+) -> List[LoadResult]:
+    """функция загружает файлы в базу одной транзакцией, при ошибке
+    база остается без изменений. Пустые значения столбцов с DEFAULT
+    получают значение по умолчанию. Строки таблиц из upsert_tables с
+    занятым ключом обновляются значениями из файла, остальные
+    пропускаются. before_commit выполняется внутри той же транзакции после
+    загрузки всех файлов"""
+
+    if conn.in_transaction:
+        conn.commit()
+
+    results: List[LoadResult] = []
+    dropped: Dict[str, List[str]] = {}
+    conn.execute("BEGIN IMMEDIATE")
+
+    try:
+        for fp in fp_lst:
+            result = LoadResult(fp)
+            started = time.perf_counter()
+
+            for (name, columns), rows in groupby(
+                without_nulls(conn, read_rows(fp, table)),
+                key=lambda row: (row[0], row[1]),
+            ):
+                known = table_columns(conn, name)
+
+                if not known:
+                    raise BulkLoadException("Таблица не найдена", name)
+
+                if not set(columns) <= set(known):
+                    raise BulkLoadException(
+                        "Столбцы не найдены", set(columns) - set(known)
+                    )
+
+                key = key_columns(conn, name, columns)
+
+                # индексы таблицы без ключа ускоряют поиск дубликатов
+                if key and name not in dropped:
+                    dropped[name] = drop_indexes(conn, name)
+
+                query = insert_query(name, columns, key, name in upsert_tables)
+                values = (row[2] for row in rows)
+
+                while batch := list(islice(values, batch_size)):
+                    changes = conn.total_changes
+                    conn.executemany(query, batch)
+                    result.rows += len(batch)
+                    result.inserted += conn.total_changes - changes
+
+            result.seconds = time.perf_counter() - started
+            results.append(result)
+            logger.info(
+                f"{fp}: {result.rows} строк, записано {result.inserted}, {result.rows_per_s} строк/с"
+            )
+
+        started = time.perf_counter()
+
+        for sql_lst in dropped.values():
+            for sql in sql_lst:
+                conn.execute(sql)
+
+        if before_commit is not None:
+            before_commit(results)
+
+        conn.commit()
+        logger.info(f"Индексы построены за {time.perf_counter() - started:.3f} с")
+
+    except (sqlite3.Error, OSError, ValueError, csv.Error, BulkLoadException) as err:
+        conn.rollback()
+
+        if isinstance(err, BulkLoadException):
+            raise
+
+        raise BulkLoadException("Данные не загружены", err)
+
+    return results
+
+
+def file_sha256(fp: str) -> str:
+    digest = hashlib.sha256()
+
+    with open(fp, "rb") as file:
+        while chunk := file.read(1 << 20):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def seed(
+    conn: sqlite3.Connection,
+    fp_lst: List[str],
+    table: str | None = None,
+    batch_size: int = 50000,
+) -> List[LoadResult]:
+    """функция загружает только новые и измененные с прошлой загрузки
+    файлы, их контрольные суммы сохраняются в той же транзакции. Строки
+    справочников измененного файла с существующим ключом обновляются,
+    если обновление нарушает другое ограничение, загрузка отменяется и
+    сумма не сохраняется. Существующие строки склада не меняются, так как
+    бот ведет их сам. Таблица seed_file создается миграциями"""
+
+    try:
+        checksums = {fp: file_sha256(fp) for fp in fp_lst}
+
+    except OSError as err:
+        raise BulkLoadException("Файл данных не прочитан", err)
+
+    loaded = dict(conn.execute("SELECT fp, sha256 FROM seed_file").fetchall())
+    changed = [fp for fp in fp_lst if loaded.get(fp) != checksums[fp]]
+
+    for fp in fp_lst:
+        if fp not in changed:
+            logger.info(f"{fp}: не изменился, пропущен")
+
+    if not changed:
+        return []
+
+    def record(results: List[LoadResult]):
+        loaded_at = datetime.datetime.now().isoformat(timespec="seconds")
+        conn.executemany(
+            UPSERT_SEED_FILE,
+            [
+                (result.fp, checksums[result.fp], result.rows, loaded_at)
+                for result in results
+            ],
+        )
+
+    return bulk_load(
+        conn,
+        changed,
+        table,
+        batch_size,
+        before_commit=record,
+        upsert_tables=tuple(REFERENCE_TABLES),
+    )
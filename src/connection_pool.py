@@ -0,0 +1,367 @@
+"""
+Модуль пула соединений с базой данных sqlite
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List
+
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.StreamHandler())
+
+
+class ConnectionPoolException(Exception):
+    def __init__(self, *args):
+        if args:
+            self.message = args[0]
+        else:
+            self.message = None
+
+    def __str__(self):
+        return "ConnectionPoolException, {0}".format(self.message)
+
+
+PRAGMA_PROFILES: Dict[str, Dict[str, str]] = {
+    "default": {},
+    "performance": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": "-16000",
+        "mmap_size": "134217728",
+        "temp_store": "MEMORY",
+        "busy_timeout": "5000",
+    },
+    "safe": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": "-8000",
+        "mmap_size": "0",
+        "temp_store": "DEFAULT",
+        "busy_timeout": "10000",
+    },
+}
+PRAGMA_NAMES = (
+    "journal_mode",
+    "synchronous",
+    "cache_size",
+    "mmap_size",
+    "temp_store",
+    "busy_timeout",
+)
+# sqlite возвращает числовые значения для перечислений
+PRAGMA_ENUMS: Dict[str, Dict[str, str]] = {
+    "synchronous": {"0": "OFF", "1": "NORMAL", "2": "FULL", "3": "EXTRA"},
+    "temp_store": {"0": "DEFAULT", "1": "FILE", "2": "MEMORY"},
+}
+
+
+def pragma_profile_from_env() -> Dict[str, str]:
+    """функция собирает набор pragma из профиля DB_PROFILE
+    и переопределений вида DB_PRAGMA_<ИМЯ>"""
+
+    name = os.environ.get("DB_PROFILE") or "performance"
+
+    if name not in PRAGMA_PROFILES:
+        raise ConnectionPoolException(f"Неизвестный профиль базы данных {name}")
+
+    pragmas = dict(PRAGMA_PROFILES[name])
+
+    for pragma in PRAGMA_NAMES:
+        value = os.environ.get(f"DB_PRAGMA_{pragma.upper()}")
+        if value:
+            pragmas[pragma] = value
+
+    return pragmas
+
+
+def apply_pragmas(conn: sqlite3.Connection, pragmas: Dict[str, str]):
+    """функция применяет pragma к соединению"""
+
+    for pragma, value in pragmas.items():
+        if pragma not in PRAGMA_NAMES:
+            raise ConnectionPoolException(f"Неизвестная pragma {pragma}")
+
+        # значения pragma нельзя передать параметром запроса
+        if not str(value).lstrip("-").isalnum():
+            raise ConnectionPoolException(f"Недопустимое значение {pragma}={value}")
+
+        conn.execute(f"PRAGMA {pragma} = {value}").fetchall()
+
+
+def effective_pragmas(conn: sqlite3.Connection) -> Dict[str, str]:
+    """функция возвращает действующие значения pragma соединения"""
+
+    result = {}
+
+    for pragma in PRAGMA_NAMES:
+        row = conn.execute(f"PRAGMA {pragma}").fetchone()
+        value = str(row[0]) if row else ""
+        result[pragma] = PRAGMA_ENUMS.get(pragma, {}).get(value, value)
+
+    return result
+
+
+class PooledConnection:
+    """Обертка над соединением с данными о потоке последнего использования"""
+
+    __slots__ = ("conn", "thread_id", "created_at")
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+        self.thread_id = threading.get_ident()
+        self.created_at = time.monotonic()
+
+
+class ConnectionPool:
+    """Ограниченный пул соединений для одной базы данных
+
+    Соединения создаются с check_same_thread=False, но в каждый момент
+    времени выдаются только одному потоку. При выдаче предпочтение
+    отдается соединению, которое последним использовал текущий поток.
+    Новое соединение открывается и настраивается вне блокировки пула, под
+    блокировкой за ним только резервируется место.
+    """
+
+    def __init__(
+        self,
+        db_name: str,
+        max_size: int = 5,
+        timeout: float = 10.0,
+        pragmas: Dict[str, str] | None = None,
+    ) -> None:
+        if max_size < 1:
+            raise ConnectionPoolException("Размер пула должен быть больше нуля")
+
+        self.db_name = db_name
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pragmas = pragmas or {}
+        self._idle: List[PooledConnection] = []
+        self._busy: Dict[int, PooledConnection] = {}
+        self._connecting = 0
+        self._cond = threading.Condition()
+
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.discarded = 0
+
+    @property
+    def size(self) -> int:
+        return len(self._idle) + len(self._busy) + self._connecting
+
+    def _connect(self) -> PooledConnection:
+        conn = sqlite3.connect(
+            self.db_name, check_same_thread=False, cached_statements=256
+        )
+        apply_pragmas(conn, self.pragmas)
+        return PooledConnection(conn)
+
+    @staticmethod
+    def _is_healthy(item: PooledConnection) -> bool:
+        try:
+            item.conn.execute("SELECT 1").fetchone()
+            return True
+
+        except sqlite3.Error:
+            return False
+
+    def _take_idle(self) -> PooledConnection | None:
+        """метод выбирает свободное соединение с учетом потока"""
+
+        if not self._idle:
+            return None
+
+        thread_id = threading.get_ident()
+        for idx in range(len(self._idle) - 1, -1, -1):
+            if self._idle[idx].thread_id == thread_id:
+                return self._idle.pop(idx)
+
+        return self._idle.pop()
+
+    def acquire(self) -> sqlite3.Connection:
+        """метод выдачи соединения из пула"""
+
+        deadline = None
+        started = time.monotonic()
+
+        with self._cond:
+            while True:
+                item = self._take_idle()
+
+                if item is not None:
+                    if self._is_healthy(item):
+                        self.hits += 1
+                        break
+
+                    self.discarded += 1
+                    self._close(item)
+                    continue
+
+                if self.size < self.max_size:
+                    self.misses += 1
+                    self._connecting += 1
+                    break
+
+                if deadline is None:
+                    self.waits += 1
+                    deadline = started + self.timeout
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    self.wait_time += time.monotonic() - started
+                    raise ConnectionPoolException(
+                        f"Нет свободных соединений с {self.db_name} за {self.timeout} c"
+                    )
+
+            if deadline is not None:
+                self.wait_time += time.monotonic() - started
+
+            if item is not None:
+                return self._lend(item)
+
+        # pragma вроде journal_mode могут ждать занятую базу, поэтому
+        # соединение настраивается без блокировки пула
+        try:
+            item = self._connect()
+
+        except BaseException:
+            with self._cond:
+                self._connecting -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._connecting -= 1
+            return self._lend(item)
+
+    def _lend(self, item: PooledConnection) -> sqlite3.Connection:
+        item.thread_id = threading.get_ident()
+        self._busy[id(item.conn)] = item
+        return item.conn
+
+    def release(self, conn: sqlite3.Connection):
+        """метод возврата соединения в пул"""
+
+        with self._cond:
+            item = self._busy.pop(id(conn), None)
+
+            if item is None:
+                raise ConnectionPoolException("Соединение не принадлежит пулу")
+
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+                conn.row_factory = None
+                self._idle.append(item)
+
+            except sqlite3.Error as err:
+                logger.warning(f"Соединение с {self.db_name} отброшено: {err}")
+                self.discarded += 1
+                self._close(item)
+
+            self._cond.notify()
+
+    @staticmethod
+    def _close(item: PooledConnection):
+        try:
+            item.conn.close()
+
+        except sqlite3.Error:
+            pass
+
+    def close(self):
+        """метод закрывает все свободные соединения пула"""
+
+        with self._cond:
+            for item in self._idle:
+                self._close(item)
+            self._idle.clear()
+
+    def stats(self) -> Dict[str, int | float]:
+        with self._cond:
+            return {
+                "size": self.size,
+                "idle": len(self._idle),
+                "busy": len(self._busy),
+                "connecting": self._connecting,
+                "hits": self.hits,
+                "misses": self.misses,
+                "waits": self.waits,
+                "wait_time": round(self.wait_time, 6),
+                "discarded": self.discarded,
+            }
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def pool_size_from_env() -> int:
+    if os.environ.get("DB_POOL_SIZE"):
+        return int(os.environ["DB_POOL_SIZE"])
+
+    return 5
+
+
+def get_pool(db_name: str) -> ConnectionPool:
+    """функция возвращает пул соединений для базы, создавая его при необходимости"""
+
+    pool = _pools.get(db_name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(db_name)
+            if pool is None:
+                pool = ConnectionPool(
+                    db_name,
+                    max_size=pool_size_from_env(),
+                    pragmas=pragma_profile_from_env(),
+                )
+                _pools[db_name] = pool
+
+    return pool
+
+
+def check_pragmas(db_name: str) -> Dict[str, str]:
+    """функция проверяет действующие настройки соединения при старте,
+    предупреждает о pragma, которые sqlite не применил, и возвращает
+    действующие значения"""
+
+    pool = get_pool(db_name)
+    conn = pool.acquire()
+
+    try:
+        effective = effective_pragmas(conn)
+
+    finally:
+        pool.release(conn)
+
+    for pragma, value in pool.pragmas.items():
+        expected = PRAGMA_ENUMS.get(pragma, {}).get(value, value)
+        if effective[pragma].upper() != expected.upper():
+            logger.warning(
+                f"{db_name}: {pragma} ожидалось {expected}, действует {effective[pragma]}"
+            )
+
+    return effective
+
+
+def pools_stats() -> Dict[str, Dict[str, int | float]]:
+    return {db_name: pool.stats() for db_name, pool in _pools.items()}
+
+
+def close_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
@@ -1,14 +1,22 @@
+import json
 import logging
-from typing import List
+from typing import Generator, List
 
 from src.database_interface import DataBaseInterface
-from src.query_scheme import AbstractTableQueryScheme, QuerySchemeForStockDevice
+from src.query_scheme import (
+    AbstractTableQueryScheme,
+    QuerySchemeForDevice,
+    QuerySchemeForStockDevice,
+    SELECT_STOCK_IDS_IN_STOCK,
+)
 from src.scheme_for_validation import (
     AbstractTable,
     DataForQuery,
+    DeviceKeyData,
     MessageInput,
     RowValue,
     StockBrokenDeviceData,
+    StockRegistrationData,
     TableRow,
 )
 
@@ -32,6 +40,28 @@ class BotHandlerException(Exception):
         return f"BotHandlerException, {0}".format(self.message)
 
 
+class StockBulkRegistration:
+    """Итог записи на склад нескольких номеров одного прибора
+
+    written ложно, если прибору с лампой накаливания нужны часы лампы
+    для новых номеров, тогда в базу ничего не записано.
+    """
+
+    def __init__(
+        self,
+        device_id: int,
+        lamp_type: str | None,
+        added: List[int],
+        updated: List[int],
+        written: bool,
+    ) -> None:
+        self.device_id = device_id
+        self.lamp_type = lamp_type
+        self.added = added
+        self.updated = updated
+        self.written = written
+
+
 class DatabaseQueryHandler:
     def __init__(self, db_name: str, query_handler: AbstractTableQueryScheme) -> None:
         self.db_name = db_name
@@ -68,7 +98,9 @@ class DatabaseQueryHandler:
 
             with DataBaseInterface(db_name=self.db_name) as conn:
                 cursor = conn.row_factory_for_connection(query[1])
-                stock_devices = conn.get_all(query=query[0], cursor=cursor)
+                stock_devices = conn.get_all(
+                    query=query[0], cursor=cursor, params=query[2]
+                )
 
                 if stock_devices and all(
                     isinstance(item, StockBrokenDeviceData) for item in stock_devices
@@ -80,6 +112,25 @@ class DatabaseQueryHandler:
                         f"Не найдено не одного прибора в ремонте за эту дату {extra_where_data}"
                     )
 
+    def database_iter_search_by_row(
+        self, extra_where_data: MessageInput, size: int | None = None
+    ) -> Generator[List[StockBrokenDeviceData]]:
+        """метод отдает приборы со статусом пачками, соединение занято
+        до конца перебора или закрытия генератора"""
+
+        if not isinstance(self.query_handler, QuerySchemeForStockDevice):
+            raise BotHandlerException("Поиск доступен только для склада")
+
+        query = self.query_handler.query_get_search_with_device(
+            where_data=self.transform_dict_from_data_query(extra_where_data)
+        )
+
+        with DataBaseInterface(db_name=self.db_name) as conn:
+            cursor = conn.row_factory_for_connection(query[1])
+            yield from conn.get_many(
+                query=query[0], cursor=cursor, params=query[2], size=size
+            )
+
     def database_update_item(
         self, extra_set_data: MessageInput, extra_where_data: MessageInput
     ):
@@ -94,7 +145,7 @@ class DatabaseQueryHandler:
 
         with DataBaseInterface(db_name=self.db_name) as conn:
             cursor = conn.row_factory_for_connection(query[1])
-            conn.update(query=query[0], cursor=cursor)
+            conn.update(query=query[0], cursor=cursor, params=query[2])
 
     def database_set_item(self, extra_set_data: tuple):
         query = self.query_handler.query_set()
@@ -107,6 +158,151 @@ class DatabaseQueryHandler:
                 cursor=cursor,
             )
 
+    def database_stock_registration(
+        self,
+        stock_device_id: str,
+        device_name: str,
+        max_lamp_hours: str,
+        at_clean_date: str,
+    ) -> StockRegistrationData | None:
+        """метод в одной транзакции находит прибор по названию и записывает его
+        на склад: прибор со склада получает новую дату очистки, новый прибор
+        со светодиодной лампой добавляется, для прибора с лампой накаливания
+        запись не выполняется, так как нужны часы лампы"""
+
+        if not isinstance(self.query_handler, QuerySchemeForStockDevice):
+            raise BotHandlerException("Регистрация доступна только для склада")
+
+        lookup = self.query_handler.query_stock_registration()
+        upsert = self.query_handler.query_upsert_clean_date()
+
+        with DataBaseInterface(db_name=self.db_name) as conn:
+            with conn.transaction():
+                cursor = conn.row_factory_for_connection(lookup[1])
+                registration = conn.get(
+                    query=lookup[0],
+                    cursor=cursor,
+                    params=(stock_device_id, device_name),
+                )
+
+                if registration and (
+                    registration.in_stock or registration.lamp_type == "LED"
+                ):
+                    conn.set(
+                        query=upsert[0],
+                        set_data=(
+                            stock_device_id,
+                            registration.device_id,
+                            max_lamp_hours,
+                            at_clean_date,
+                        ),
+                        cursor=conn.row_factory_for_connection(upsert[1]),
+                    )
+
+                return registration
+
+    def database_stock_bulk_registration(
+        self,
+        stock_device_ids: List[int],
+        device_name: str,
+        max_lamp_hours: str | None,
+        at_clean_date: str,
+    ) -> StockBulkRegistration | None:
+        """метод в одной транзакции записывает на склад несколько номеров
+        одного прибора: номера со склада получают новую дату очистки, новые
+        добавляются одной пачкой. Новые номера прибора с лампой накаливания
+        без часов лампы не записываются"""
+
+        if not isinstance(self.query_handler, QuerySchemeForStockDevice):
+            raise BotHandlerException("Регистрация доступна только для склада")
+
+        lookup = self.query_handler.query_stock_registration()
+        upsert = self.query_handler.query_upsert_clean_date()
+
+        with DataBaseInterface(db_name=self.db_name) as conn:
+            with conn.transaction():
+                cursor = conn.row_factory_for_connection(lookup[1])
+                registration = conn.get(
+                    query=lookup[0],
+                    cursor=cursor,
+                    params=(stock_device_ids[0], device_name),
+                )
+
+                if registration is None:
+                    return None
+
+                in_stock = set(
+                    conn.get_all(
+                        query=SELECT_STOCK_IDS_IN_STOCK,
+                        cursor=conn.row_factory_for_connection(lambda _, row: row[0]),
+                        params=(registration.device_id, json.dumps(stock_device_ids)),
+                    )
+                )
+                result = StockBulkRegistration(
+                    device_id=registration.device_id,
+                    lamp_type=registration.lamp_type,
+                    added=[item for item in stock_device_ids if item not in in_stock],
+                    updated=[item for item in stock_device_ids if item in in_stock],
+                    written=True,
+                )
+
+                if (
+                    result.added
+                    and registration.lamp_type != "LED"
+                    and max_lamp_hours is None
+                ):
+                    result.written = False
+                    return result
+
+                conn.set_many(
+                    query=upsert[0],
+                    set_data=[
+                        (
+                            stock_device_id,
+                            registration.device_id,
+                            max_lamp_hours or "0",
+                            at_clean_date,
+                        )
+                        for stock_device_id in stock_device_ids
+                    ],
+                    cursor=conn.row_factory_for_connection(upsert[1]),
+                )
+
+                return result
+
+    def database_get_device_page(
+        self,
+        after: int = 0,
+        before: int = 0,
+        lamp_type: str | None = None,
+        limit: int = 25,
+    ) -> List[DeviceKeyData]:
+        """метод получения страницы приборов по курсору id: страница после after
+        или, если передан before, страница перед ним в порядке возрастания id"""
+
+        if not isinstance(self.query_handler, QuerySchemeForDevice):
+            raise BotHandlerException("Страницы доступны только для приборов")
+
+        if before:
+            query = self.query_handler.query_get_page_before()
+            cursor_id = before
+        else:
+            query = self.query_handler.query_get_page()
+            cursor_id = after
+
+        with DataBaseInterface(db_name=self.db_name) as conn:
+            cursor = conn.row_factory_for_connection(query[1])
+            devices = conn.get_all(
+                query=query[0],
+                cursor=cursor,
+                params=(cursor_id, lamp_type, lamp_type, limit),
+            )
+
+        if before:
+            devices.reverse()
+
+        return devices
+
     def database_get_items(
         self,
         extra_where_data: MessageInput | None = None,
@@ -121,7 +317,28 @@ class DatabaseQueryHandler:
 
         with DataBaseInterface(db_name=self.db_name) as conn:
             cursor = conn.row_factory_for_connection(query[1])
-            return conn.get_all(query=query[0], cursor=cursor)
+            return conn.get_all(query=query[0], cursor=cursor, params=query[2])
+
+    def database_iter_items(
+        self,
+        extra_where_data: MessageInput | None = None,
+        size: int | None = None,
+    ) -> Generator[List[AbstractTable]]:
+        """метод отдает строки таблицы пачками по size строк"""
+
+        if extra_where_data:
+            query = self.query_handler.query_get(
+                where_data=self.transform_dict_from_data_query(extra_where_data)
+            )
+
+        else:
+            query = self.query_handler.query_get()
+
+        with DataBaseInterface(db_name=self.db_name) as conn:
+            cursor = conn.row_factory_for_connection(query[1])
+            yield from conn.get_many(
+                query=query[0], cursor=cursor, params=query[2], size=size
+            )
 
     def database_get_item(
         self,
@@ -137,4 +354,4 @@ class DatabaseQueryHandler:
 
         with DataBaseInterface(db_name=self.db_name) as conn:
             cursor = conn.row_factory_for_connection(query[1])
-            return conn.get(query=query[0], cursor=cursor)
+            return conn.get(query=query[0], cursor=cursor, params=query[2])
@@ -1,7 +1,13 @@
 import sqlite3
 import logging
+import os
+import time
+from contextlib import contextmanager
 from typing import Callable, Generator, Generic, List, TypeVar
 
+from src.bulk_loader import bulk_load
+from src.connection_pool import get_pool
+from src.migrations import migrate
 from src.scheme_for_validation import AbstractTable
 
 
@@ -36,17 +42,47 @@ class DataBaseInterfaceException(Exception):
 Table = TypeVar("Table", covariant=True, bound=AbstractTable)
 
 
+def fetch_size_from_env() -> int:
+    if os.environ.get("DB_FETCH_SIZE"):
+        return int(os.environ["DB_FETCH_SIZE"])
+
+    return 100
+
+
+# функции (запрос, время выполнения), которые вызываются после каждого запроса
+_query_hooks: List[Callable[[str, float], None]] = []
+
+
+def add_query_hook(hook: Callable[[str, float], None]):
+    if hook not in _query_hooks:
+        _query_hooks.append(hook)
+
+
+def remove_query_hook(hook: Callable[[str, float], None]):
+    if hook in _query_hooks:
+        _query_hooks.remove(hook)
+
+
+def report_query(query: str, started: float):
+    if _query_hooks:
+        elapsed = time.perf_counter() - started
+
+        for hook in _query_hooks:
+            hook(query, elapsed)
+
+
 class DataBaseInterface(Generic[Table]):
     """Класс для работы с базой данных приборов"""
 
-    __slots__ = ("db_name", "conn")
+    __slots__ = ("db_name", "conn", "in_transaction")
 
     def __init__(self, db_name: str):
         self.db_name = db_name
+        self.in_transaction = False
 
     def __enter__(self):
         try:
-            self.conn = sqlite3.connect(self.db_name)
+            self.conn = get_pool(self.db_name).acquire()
             return self
 
         except ConnectionError as err:
@@ -55,7 +91,7 @@ class DataBaseInterface(Generic[Table]):
     def __exit__(self, exc_type, exc_val, exc_tb):
         try:
             if self.conn:
-                self.conn.close()
+                get_pool(self.db_name).release(self.conn)
 
         except DataBaseInterfaceException:
             raise DataBaseInterfaceException(exc_type, exc_val, exc_tb)
@@ -66,9 +102,11 @@ class DataBaseInterface(Generic[Table]):
         return cursor
 
     @staticmethod
-    def get(query: str, cursor: sqlite3.Cursor) -> Table:
+    def get(query: str, cursor: sqlite3.Cursor, params: tuple = ()) -> Table:
+        started = time.perf_counter()
+
         try:
-            cursor.execute(query)
+            cursor.execute(query, params)
             result = cursor.fetchone()
             return result
 
@@ -77,15 +115,27 @@ class DataBaseInterface(Generic[Table]):
 
         finally:
             cursor.close()
+            report_query(query, started)
 
     @staticmethod
-    def get_many(query: str, cursor: sqlite3.Cursor) -> Generator[List[Table]]:
+    def get_many(
+        query: str, cursor: sqlite3.Cursor, params: tuple = (), size: int | None = None
+    ) -> Generator[List[Table]]:
+        """метод отдает результат запроса пачками по size строк,
+        не загружая его в память целиком"""
+
+        size = size or fetch_size_from_env()
+        # время потребителя между пачками в запрос не входит
+        started = time.perf_counter()
+
         try:
-            cursor.execute(query)
+            cursor.execute(query, params)
             while True:
-                result = cursor.fetchmany(5)
+                result = cursor.fetchmany(size)
                 if result:
+                    paused = time.perf_counter()
                     yield result
+                    started += time.perf_counter() - paused
                 else:
                     break
 
@@ -94,11 +144,14 @@ class DataBaseInterface(Generic[Table]):
 
         finally:
             cursor.close()
+            report_query(query, started)
 
     @staticmethod
-    def get_all(query: str, cursor: sqlite3.Cursor) -> List[Table]:
+    def get_all(query: str, cursor: sqlite3.Cursor, params: tuple = ()) -> List[Table]:
+        started = time.perf_counter()
+
         try:
-            cursor.execute(query)
+            cursor.execute(query, params)
             result = cursor.fetchall()
             return result
 
@@ -107,11 +160,15 @@ class DataBaseInterface(Generic[Table]):
 
         finally:
             cursor.close()
+            report_query(query, started)
 
     def set(self, query: str, set_data: tuple, cursor: sqlite3.Cursor):
+        started = time.perf_counter()
+
         try:
             cursor.execute(query, set_data)
-            self.conn.commit()
+            if not self.in_transaction:
+                self.conn.commit()
 
         except DataBaseInterfaceException as err:
             self.conn.rollback()
@@ -119,11 +176,15 @@ class DataBaseInterface(Generic[Table]):
 
         finally:
             cursor.close()
+            report_query(query, started)
+
+    def update(self, query: str, cursor: sqlite3.Cursor, params: tuple = ()):
+        started = time.perf_counter()
 
-    def update(self, query: str, cursor: sqlite3.Cursor):
         try:
-            cursor.execute(query)
-            self.conn.commit()
+            cursor.execute(query, params)
+            if not self.in_transaction:
+                self.conn.commit()
 
         except DataBaseInterfaceException as err:
             self.conn.rollback()
@@ -131,11 +192,35 @@ class DataBaseInterface(Generic[Table]):
 
         finally:
             cursor.close()
+            report_query(query, started)
+
+    @contextmanager
+    def transaction(self) -> Generator["DataBaseInterface"]:
+        """метод открывает транзакцию с блокировкой на запись,
+        фиксирует ее при успехе и откатывает при ошибке. Внутри транзакции
+        set, update и set_many не фиксируют изменения сами"""
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.in_transaction = True
+
+        try:
+            yield self
+            self.conn.commit()
+
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        finally:
+            self.in_transaction = False
 
     def set_many(self, query: str, set_data: List[tuple], cursor: sqlite3.Cursor):
+        started = time.perf_counter()
+
         try:
             cursor.executemany(query, set_data)
-            self.conn.commit()
+            if not self.in_transaction:
+                self.conn.commit()
 
         except DataBaseInterfaceException as err:
             self.conn.rollback()
@@ -143,15 +228,13 @@ class DataBaseInterface(Generic[Table]):
 
         finally:
             cursor.close()
+            report_query(query, started)
 
     def fill_in_the_table(self, fp_lst: List[str], create_table_list: List[str]):
         [self.conn.execute(item) for item in create_table_list]
         self.conn.commit()
-
-        for fp in fp_lst:
-            with open(fp, "r") as file:
-                self.conn.executescript(file.read())
-        self.conn.commit()
+        migrate(self.conn)
+        bulk_load(self.conn, fp_lst)
 
     def clean_table(self, table_list: List[str]):
         for table in table_list:
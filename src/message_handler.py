@@ -1,3 +1,6 @@
+from string import Formatter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
 from src.scheme_for_validation import (
     OutputDeviceCompanyTable,
     OutputDeviceTable,
@@ -7,9 +10,129 @@ from src.scheme_for_validation import (
 )
 
 
+# ограничение telegram на длину текста одного сообщения
+MESSAGE_LIMIT = 4096
+REPORT_SEPARATOR = "\n\n"
+
+
+def render_stock_device(item: StockBrokenDeviceData) -> str:
+    return f"""<i>Id прибора</i>: <code>{item.stock_device_id}</code>
+<i>Название прибора</i>: <code>{item.device_name}</code>
+<i>Дата очистки</i>: <code>{item.at_clean_date}</code>"""
+
+
+def render_broken_device(item: StockBrokenDeviceData) -> str:
+    return f"""<i>ID прибора</i>: <code>{item.stock_device_id}</code>
+<i>Название прибора</i>: <code>{item.device_name}</code>
+<i>Дата очистки</i>: <code>{item.at_clean_date}</code>"""
+
+
+def render_device(item: OutputDeviceTable) -> str:
+    return f"""Название модели прибора: <code>{item.device_name}</code>
+    Название компании производителя: <code>{item.company_name}</code>
+    Название типа прибора: <code>{item.type_title}</code>"""
+
+
+def render_company(item: OutputDeviceCompanyTable) -> str:
+    return f"""Название компании: <code>{item.company_name}</code>
+Страна производитель: <code>{item.producer_country}</code>
+Сайт компании: <code>{item.description_company}</code>"""
+
+
+def render_device_type(item: OutputDeviceTypeTable) -> str:
+    return f"""Название типа прибора: <code>{item.type_title}</code>
+Описание типа прибора: <code>{item.type_description:.150}</code>
+Тип лампы: <code>{item.lamp_type}</code>"""
+
+
+def render_found_device(item: StockDeviceData) -> str:
+    return f"""<i>Id прибора</i>: <code>{item.stock_device_id}</code>
+<i>Название прибора</i>: <code>{item.device_name}</code>
+<i>Компания производитель прибора</i>: <code>{item.company_name}</code>
+<i>Тип прибора</i>: <code>{item.type_title}</code>
+<i>Дата последней очистки</i>: <code>{item.at_clean_date}</code>\n"""
+
+
+# ключ отчета: (модель строки, функция отрисовки одной строки)
+REPORT_RENDERERS: Dict[str, Tuple[type, Callable[[Any], str]]] = {
+    "get_stock_device_at_date": (StockBrokenDeviceData, render_stock_device),
+    "get_broken_device": (StockBrokenDeviceData, render_broken_device),
+    "/get_devices": (OutputDeviceTable, render_device),
+    "/get_companies": (OutputDeviceCompanyTable, render_company),
+    "/get_types": (OutputDeviceTypeTable, render_device_type),
+}
+
+
+class MessageChunks:
+    """Сборщик текста отчета в сообщения не длиннее limit
+
+    Строки отчета добавляются по одной, add возвращает готовые сообщения,
+    как только следующая строка не помещается в текущее. Строка длиннее
+    limit режется на части по limit символов.
+    """
+
+    def __init__(self, limit: int = MESSAGE_LIMIT, separator: str = REPORT_SEPARATOR):
+        self.limit = limit
+        self.separator = separator
+        self._parts: List[str] = []
+        self._size = 0
+
+    def add(self, text: str) -> List[str]:
+        ready = []
+        extra = len(self.separator) if self._parts else 0
+
+        if self._parts and self._size + extra + len(text) > self.limit:
+            ready.append(self.separator.join(self._parts))
+            self._parts = []
+            self._size = 0
+            extra = 0
+
+        while len(text) > self.limit:
+            ready.append(text[: self.limit])
+            text = text[self.limit :]
+
+        self._parts.append(text)
+        self._size += extra + len(text)
+        return ready
+
+    def flush(self) -> str | None:
+        if not self._parts:
+            return None
+
+        chunk = self.separator.join(self._parts)
+        self._parts = []
+        self._size = 0
+        return chunk
+
+
 class MessageDescription:
     def __init__(self, message_input: str | None) -> None:
         self.message_input = message_input
+        self._message_data = None
+
+    def render_items(self, items: Iterable[Any]) -> Iterator[str]:
+        """метод отрисовывает строки отчета по одной"""
+
+        model, render = REPORT_RENDERERS[self.message_input or ""]
+
+        for item in items:
+            if isinstance(item, model):
+                yield render(item)
+
+    def chunks(
+        self, batches: Iterable[Iterable[Any]], limit: int = MESSAGE_LIMIT
+    ) -> Iterator[str]:
+        """метод собирает пачки строк отчета в сообщения не длиннее limit"""
+
+        chunker = MessageChunks(limit)
+
+        for batch in batches:
+            for text in self.render_items(batch):
+                yield from chunker.add(text)
+
+        last = chunker.flush()
+        if last is not None:
+            yield last
 
     @property
     def message_data(self):
@@ -20,182 +143,15 @@ class MessageDescription:
         self._message_data = value
 
     def description(self) -> str:
-        match self.message_input:
-            case "add_lamp_type":
-                if self._message_data:
-                    return BUTTON_DESCRIPTION["add_lamp_type"].format(
-                        lamp_type=self.message_data
-                    )
-                else:
-                    return "Ошибка передачи данных о типе устройства"
-
-            case "add_device_company":
-                if self._message_data:
-                    return BUTTON_DESCRIPTION["add_device_company"].format(
-                        device_company=self.message_data
-                    )
-                else:
-                    return "Ошибка в передаче данных о компании"
-
-            case "type_for_device":
-                if self._message_data:
-                    return BUTTON_DESCRIPTION["type_for_device"].format(
-                        type_for_device=self.message_data
-                    )
-                else:
-                    return "Ошибка в передаче данных о приборе"
-
-            case "update":
-                if self._message_data:
-                    return BUTTON_DESCRIPTION["update"].format(
-                        update_data=self.message_data
-                    )
-                else:
-                    return "Ошибка при обновлении данных прибора на складе"
-
-            case "LED":
-                if self._message_data:
-                    return BUTTON_DESCRIPTION["LED"].format(lamp_led=self.message_data)
-                else:
-                    return "Ошибка добавления данных о приборе на складе c лампой led"
-
-            case "FIL":
-                if self.message_data:
-                    return BUTTON_DESCRIPTION["FIL"].format(lamp_fil=self.message_data)
-                else:
-                    return "Ошибка передачи данных о приборе со складе с лампой накаливания"
-
-            case "lamp_error":
-                if isinstance(self._message_data, tuple):
-                    return BUTTON_DESCRIPTION["lamp_error"].format(
-                        lamp_error=self.message_data[0],
-                        stock_device_data=self.message_data[1],
-                    )
-
-                else:
-                    return "Ошибка передачи данных прибора"
-
-            case "add_lamp_hours_from_stock_device":
-                if self._message_data:
-                    return BUTTON_DESCRIPTION[
-                        "add_lamp_hours_from_stock_device"
-                    ].format(lamp_hours=self.message_data)
-                else:
-                    return "Ошибка передачи данных о ресурсе лампы"
-
-            case "max_lamp_hours":
-                if self._message_data:
-                    return BUTTON_DESCRIPTION["max_lamp_hours"].format(
-                        max_hours=self.message_data
-                    )
-
-                else:
-                    return "Ошибка передачи данных о максимальном ресурсе лампы"
-
-            case "check_lamp_hours":
-                if self._message_data:
-                    return BUTTON_DESCRIPTION["check_lamp_hours"].format(
-                        lamp_hours=self.message_data
-                    )
-
-                else:
-                    return "Ошибка подсчета ресурса лампы"
-
-            case "get_stock_device_at_date":
-                if isinstance(self._message_data, list):
-                    return "\n\n".join(
-                        [
-                            f"""<i>Id прибора</i>: <code>{item.stock_device_id}</code>
-<i>Название прибора</i>: <code>{item.device_name}</code>
-<i>Дата очистки</i>: <code>{item.at_clean_date}</code>"""
-                            for item in self.message_data
-                            if isinstance(item, StockBrokenDeviceData)
-                        ]
-                    )
-
-                else:
-                    return self.message_data
-
-            case "get_broken_device":
-                if isinstance(self._message_data, list):
-                    return "\n\n".join(
-                        [
-                            f"""<i>ID прибора</i>: <code>{item.stock_device_id}</code>
-<i>Название прибора</i>: <code>{item.device_name}</code>
-<i>Дата очистки</i>: <code>{item.at_clean_date}</code>"""
-                            for item in self.message_data
-                            if isinstance(item, StockBrokenDeviceData)
-                        ]
-                    )
-                else:
-                    return f"Данные о приборе не найдены {self.message_data}"
-
-            case "show_the_devices_found":
-                if isinstance(self._message_data, StockDeviceData):
-                    return f"""<i>Id прибора</i>: <code>{self.message_data.stock_device_id}</code>
-<i>Название прибора</i>: <code>{self.message_data.device_name}</code>
-<i>Компания производитель прибора</i>: <code>{self.message_data.company_name}</code>
-<i>Тип прибора</i>: <code>{self.message_data.type_title}</code>
-<i>Дата последней очистки</i>: <code>{self.message_data.at_clean_date}</code>\n"""
-                else:
-                    return "Данные о приборе по ID не найдены"
-
-            case "device_FIL_none":
-                if self._message_data:
-                    return f"<b>Данный прибор</b> <code>{self.message_data}</code> <b>не найден</b>"
-                else:
-                    return "Данные для сообщения отсутствуют"
-
-            case "/get_devices":
-                if isinstance(self._message_data, list):
-                    return "\n\n".join(
-                        [
-                            f"""Название модели прибора: <code>{item.device_name}</code>
-    Название компании производителя: <code>{item.company_name}</code>
-    Название типа прибора: <code>{item.type_title}</code>"""
-                            for item in self.message_data
-                            if isinstance(item, OutputDeviceTable)
-                        ]
-                    )
-
-                else:
-                    return "Данные для сообщения отсутствуют"
-
-            case "/get_companies":
-                if isinstance(self._message_data, list):
-                    return "\n\n".join(
-                        [
-                            f"""Название компании: <code>{item.company_name}</code>
-Страна производитель: <code>{item.producer_country}</code>
-Сайт компании: <code>{item.description_company}</code>"""
-                            for item in self.message_data
-                            if isinstance(item, OutputDeviceCompanyTable)
-                        ]
-                    )
-
-                else:
-                    return "Нет данных для вставки сообщения"
-
-            case "/get_types":
-                if isinstance(self._message_data, list):
-                    return "\n\n".join(
-                        [
-                            f"""Название типа прибора: <code>{item.type_title}</code>
-Описание типа прибора: <code>{item.type_description:.150}</code>
-Тип лампы: <code>{item.lamp_type}</code>"""
-                            for item in self.message_data
-                            if isinstance(item, OutputDeviceTypeTable)
-                        ]
-                    )
+        renderer = RENDERERS.get(self.message_input or "")
 
-                else:
-                    return "Нет данных для вставки сообщения"
+        if renderer is not None:
+            return renderer(self._message_data)
 
-            case str(message):
-                return BUTTON_DESCRIPTION[message]
+        if isinstance(self.message_input, str):
+            return STATIC_MESSAGES[self.message_input]
 
-            case _:
-                return "<b>Переданное сообщение не известно</b>"
+        return "<b>Переданное сообщение не известно</b>"
 
 
 start = """<i>Бот поможет добавлять данные о чистых приборах со склада</i>
@@ -242,7 +198,7 @@ company_for_device = "<i>Выберите тип прибора</i>"
 type_for_device = "<code>{type_for_device}</code>"
 
 # add stock device
-add_stock_device = """<i>Вы в меню добавления или добавления чистого прибора на склад(е). Следуйте инструкциям на экране.</i> <b>Введите ID прибора на складе</b>"""
+add_stock_device = """<i>Вы в меню добавления или добавления чистого прибора на склад(е). Следуйте инструкциям на экране.</i> <b>Введите ID прибора на складе</b> <i>или несколько ID одного прибора, например 11-40, 52, 58</i>"""
 add_device_id_for_stock_device = "<i>Введите название прибора</i>"
 device_stock_update = "Данные обновленны <b>{update_data}</b>"
 device_stock_lamp_led = "Данные добавленны <code>{lamp_led}</code>"
@@ -251,6 +207,8 @@ device_stock_lamp_error = (
     "В базе отсутствет запись {lamp_error} <code>{stock_device_data}</code>"
 )
 add_lamp_hours_from_stock_device = "Данные добавленны <code>{lamp_hours}</code>"
+device_stock_bulk = "Данные добавленны <code>{bulk_data}</code>"
+stock_ids_error = "<i>Неверный ID. Введите число, список через запятую или диапазон, например 11-40, 52, не больше {max_ids} номеров</i>"
 
 # replacement_lamp
 replacement_lamp = """<i>Вы в меню замены лампы. Следуйте инструкциям на экране.</i> <b>Введите ID прибора на складе для которого нужно заменить лампу</b>"""
@@ -316,6 +274,8 @@ BUTTON_DESCRIPTION = {
     "FIL": device_stock_lamp_fil,
     "lamp_error": device_stock_lamp_error,
     "add_lamp_hours_from_stock_device": add_lamp_hours_from_stock_device,
+    "bulk": device_stock_bulk,
+    "stock_ids_error": stock_ids_error,
     # add_device_type
     "/add_device_type": add_type_title,
     "add_description_type": add_description_type,
@@ -337,3 +297,177 @@ BUTTON_DESCRIPTION = {
     "/get": get,
     "/cancel": cancel,
 }
+
+
+def compile_template(template: str, fields: Tuple[str, ...]) -> Callable[..., str]:
+    """функция разбирает шаблон один раз и возвращает функцию подстановки
+    значений в порядке fields"""
+
+    pieces = []
+    for literal, field, spec, conversion in Formatter().parse(template):
+        if conversion:
+            return lambda *values: template.format(**dict(zip(fields, values)))
+
+        pieces.append((literal, None if field is None else fields.index(field), spec))
+
+    indexes = [index for _, index, _ in pieces if index is not None]
+
+    if not indexes:
+        return lambda *values: template
+
+    # один столбец без формата собирается простой конкатенацией
+    if len(indexes) == 1 and not pieces[0][2]:
+        prefix = pieces[0][0]
+        suffix = "".join(literal for literal, _, _ in pieces[1:])
+        return lambda value: prefix + str(value) + suffix
+
+    def render(*values) -> str:
+        return "".join(
+            literal + ("" if index is None else format(values[index], spec))
+            for literal, index, spec in pieces
+        )
+
+    return render
+
+
+def value_renderer(
+    key: str, fields: Tuple[str, ...], fallback: str
+) -> Callable[[Any], str]:
+    """функция строит отрисовку шаблона BUTTON_DESCRIPTION по данным сообщения,
+    несколько полей передаются кортежем"""
+
+    render = compile_template(BUTTON_DESCRIPTION[key], fields)
+
+    if len(fields) > 1:
+        return lambda data: (
+            render(*data)
+            if isinstance(data, tuple) and len(data) == len(fields)
+            else fallback
+        )
+
+    return lambda data: render(data) if data else fallback
+
+
+def list_renderer(key: str, fallback: Callable[[Any], str]) -> Callable[[Any], str]:
+    """функция строит отрисовку списка строк отчета одним сообщением"""
+
+    model, render = REPORT_RENDERERS[key]
+
+    def renderer(data) -> str:
+        if isinstance(data, list):
+            return REPORT_SEPARATOR.join(
+                [render(item) for item in data if isinstance(item, model)]
+            )
+
+        return fallback(data)
+
+    return renderer
+
+
+def render_stats(data: Any) -> str:
+    """отрисовка метрик обработчиков, data это словарь Metrics.to_dict
+    с обработчиками, отсортированными по убыванию p95"""
+
+    if not isinstance(data, dict) or not data.get("handlers"):
+        return "<i>Метрики еще не собраны</i>"
+
+    lines = [f"<b>Метрики за {data['uptime']:.0f} с</b>"]
+
+    for name, stats in data["handlers"].items():
+        latency = stats["latency"]
+        lines.append(
+            f"""<code>{name}</code>: {latency["count"]} шт, p50 {latency["p50"] * 1000:g} мс, p95 {latency["p95"] * 1000:g} мс, max {latency["max"] * 1000:.1f} мс
+    база {stats["db_time"]["avg"] * 1000:.1f} мс/обн, запросов {stats["db_queries"]}, очередь {stats["queue_wait"] * 1000:.1f} мс, ошибок {stats["errors"]}"""
+        )
+
+    for title, values in data.get("extra", {}).items():
+        lines.append(
+            f"<i>{title}</i>: "
+            + ", ".join(f"{key} {value}" for key, value in values.items())
+        )
+
+    return "\n".join(lines)
+
+
+# сообщения без подстановки данных отдаются как есть
+STATIC_MESSAGES: Dict[str, str] = {
+    key: template
+    for key, template in BUTTON_DESCRIPTION.items()
+    if all(field is None for _, field, _, _ in Formatter().parse(template))
+}
+
+# ключ сообщения: функция отрисовки по message_data, собирается при импорте
+RENDERERS: Dict[str, Callable[[Any], str]] = {
+    "add_lamp_type": value_renderer(
+        "add_lamp_type", ("lamp_type",), "Ошибка передачи данных о типе устройства"
+    ),
+    "add_device_company": value_renderer(
+        "add_device_company",
+        ("device_company",),
+        "Ошибка в передаче данных о компании",
+    ),
+    "type_for_device": value_renderer(
+        "type_for_device", ("type_for_device",), "Ошибка в передаче данных о приборе"
+    ),
+    "update": value_renderer(
+        "update", ("update_data",), "Ошибка при обновлении данных прибора на складе"
+    ),
+    "LED": value_renderer(
+        "LED",
+        ("lamp_led",),
+        "Ошибка добавления данных о приборе на складе c лампой led",
+    ),
+    "FIL": value_renderer(
+        "FIL",
+        ("lamp_fil",),
+        "Ошибка передачи данных о приборе со складе с лампой накаливания",
+    ),
+    "lamp_error": value_renderer(
+        "lamp_error",
+        ("lamp_error", "stock_device_data"),
+        "Ошибка передачи данных прибора",
+    ),
+    "add_lamp_hours_from_stock_device": value_renderer(
+        "add_lamp_hours_from_stock_device",
+        ("lamp_hours",),
+        "Ошибка передачи данных о ресурсе лампы",
+    ),
+    "bulk": value_renderer("bulk", ("bulk_data",), "Ошибка записи приборов на склад"),
+    "stock_ids_error": value_renderer(
+        "stock_ids_error", ("max_ids",), "Неверный ID прибора на складе"
+    ),
+    "max_lamp_hours": value_renderer(
+        "max_lamp_hours",
+        ("max_hours",),
+        "Ошибка передачи данных о максимальном ресурсе лампы",
+    ),
+    "check_lamp_hours": value_renderer(
+        "check_lamp_hours", ("lamp_hours",), "Ошибка подсчета ресурса лампы"
+    ),
+    "get_stock_device_at_date": list_renderer(
+        "get_stock_device_at_date", lambda data: data
+    ),
+    "get_broken_device": list_renderer(
+        "get_broken_device", lambda data: f"Данные о приборе не найдены {data}"
+    ),
+    "show_the_devices_found": lambda data: (
+        render_found_device(data)
+        if isinstance(data, StockDeviceData)
+        else "Данные о приборе по ID не найдены"
+    ),
+    "device_FIL_none": lambda data: (
+        f"<b>Данный прибор</b> <code>{data}</code> <b>не найден</b>"
+        if data
+        else "Данные для сообщения отсутствуют"
+    ),
+    "/get_devices": list_renderer(
+        "/get_devices", lambda data: "Данные для сообщения отсутствуют"
+    ),
+    "/get_companies": list_renderer(
+        "/get_companies", lambda data: "Нет данных для вставки сообщения"
+    ),
+    "/stats": render_stats,
+    "/get_types": list_renderer(
+        "/get_types", lambda data: "Нет данных для вставки сообщения"
+    ),
+}
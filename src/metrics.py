@@ -0,0 +1,299 @@
+"""
+Модуль метрик времени обработки обновлений бота
+"""
+
+import bisect
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterable, Tuple
+
+from aiogram import BaseMiddleware, Dispatcher, Router
+from aiogram.types import TelegramObject, Update
+from aiohttp import web
+
+from src.database_interface import add_query_hook
+
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.StreamHandler())
+
+
+# верхние границы корзин гистограммы в секундах
+BUCKETS: Tuple[float, ...] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами, квантили оцениваются
+    по верхней границе корзины"""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return BUCKETS[index] if index < len(BUCKETS) else self.max
+
+        return self.max
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 6) if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": round(self.max, 6),
+        }
+
+
+class UpdateTiming:
+    """Время одного обновления, которое набирают запросы к базе и очередь
+    пула потоков. Объект общий для копий контекста в потоках пула"""
+
+    __slots__ = ("handler", "db_time", "db_queries", "queue_wait")
+
+    def __init__(self) -> None:
+        self.handler: str | None = None
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.queue_wait = 0.0
+
+
+class HandlerStats:
+    __slots__ = ("latency", "db_time", "db_queries", "queue_wait", "errors")
+
+    def __init__(self) -> None:
+        self.latency = Histogram()
+        self.db_time = Histogram()
+        self.db_queries = 0
+        self.queue_wait = 0.0
+        self.errors = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "latency": self.latency.to_dict(),
+            "db_time": self.db_time.to_dict(),
+            "db_queries": self.db_queries,
+            "queue_wait": round(self.queue_wait, 6),
+            "errors": self.errors,
+        }
+
+
+_current_timing: ContextVar[UpdateTiming | None] = ContextVar(
+    "current_timing", default=None
+)
+
+
+class Metrics:
+    """Метрики обработчиков по имени функции обработчика"""
+
+    def __init__(self) -> None:
+        self.handlers: Dict[str, HandlerStats] = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def record(self, timing: UpdateTiming, latency: float, error: bool):
+        with self._lock:
+            stats = self.handlers.get(timing.handler or "unhandled")
+
+            if stats is None:
+                stats = self.handlers[timing.handler or "unhandled"] = HandlerStats()
+
+            stats.latency.observe(latency)
+            stats.db_time.observe(timing.db_time)
+            stats.db_queries += timing.db_queries
+            stats.queue_wait += timing.queue_wait
+
+            if error:
+                stats.errors += 1
+
+    def to_dict(self, limit: int | None = None) -> Dict[str, Any]:
+        """метод возвращает метрики, обработчики идут по убыванию p95"""
+
+        with self._lock:
+            items = sorted(
+                self.handlers.items(),
+                key=lambda item: item[1].latency.quantile(0.95),
+                reverse=True,
+            )
+            return {
+                "uptime": round(time.time() - self.started, 3),
+                "handlers": {name: stats.to_dict() for name, stats in items[:limit]},
+            }
+
+    def reset(self):
+        with self._lock:
+            self.handlers.clear()
+            self.started = time.time()
+
+
+metrics = Metrics()
+
+
+def record_query(query: str, elapsed: float):
+    """хук интерфейса базы: время запроса идет в текущее обновление"""
+
+    timing = _current_timing.get()
+
+    if timing is not None:
+        timing.db_time += elapsed
+        timing.db_queries += 1
+
+
+def record_queue_wait(elapsed: float):
+    """время ожидания свободного потока пула идет в текущее обновление"""
+
+    timing = _current_timing.get()
+
+    if timing is not None:
+        timing.queue_wait += elapsed
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Внешний middleware диспетчера, который измеряет полное время
+    обработки обновления, включая фильтры и чтение состояния fsm"""
+
+    def __init__(self, registry: Metrics = metrics) -> None:
+        self.registry = registry
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        timing = UpdateTiming()
+        token = _current_timing.set(timing)
+        started = time.perf_counter()
+        error = False
+
+        try:
+            return await handler(event, data)
+
+        except Exception:
+            error = True
+            raise
+
+        finally:
+            _current_timing.reset(token)
+
+            if timing.handler is None and isinstance(event, Update):
+                timing.handler = f"unhandled_{event.event_type}"
+
+            self.registry.record(timing, time.perf_counter() - started, error)
+
+
+class HandlerLabelMiddleware(BaseMiddleware):
+    """Внутренний middleware, который подписывает обновление именем
+    выбранного обработчика"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        timing = _current_timing.get()
+        handler_object = data.get("handler")
+
+        if timing is not None and handler_object is not None:
+            timing.handler = getattr(
+                handler_object.callback, "__name__", repr(handler_object.callback)
+            )
+
+        return await handler(event, data)
+
+
+def setup_metrics(
+    dp: Dispatcher, routers: Iterable[Router], registry: Metrics = metrics
+):
+    """функция подключает сбор метрик ко всем роутерам бота"""
+
+    add_query_hook(record_query)
+    dp.update.outer_middleware(UpdateMetricsMiddleware(registry))
+    label = HandlerLabelMiddleware()
+
+    for router in routers:
+        for observer in router.observers.values():
+            if observer.event_name != "error":
+                observer.middleware(label)
+
+
+def metrics_port_from_env() -> int | None:
+    if os.environ.get("METRICS_PORT"):
+        return int(os.environ["METRICS_PORT"])
+
+    return None
+
+
+def add_metrics_route(
+    app: web.Application, extra: Callable[[], Dict[str, Any]] | None = None
+):
+    """функция добавляет в приложение aiohttp маршрут /metrics с json"""
+
+    async def handle(request: web.Request) -> web.Response:
+        data = metrics.to_dict()
+
+        if extra is not None:
+            data.update(extra())
+
+        return web.json_response(data)
+
+    app.router.add_get("/metrics", handle)
+
+
+async def start_metrics_server(
+    port: int,
+    host: str = "127.0.0.1",
+    extra: Callable[[], Dict[str, Any]] | None = None,
+) -> web.AppRunner:
+    """функция запускает отдельный локальный сервер метрик для режима
+    polling или webhook без маршрута /metrics"""
+
+    app = web.Application()
+    add_metrics_route(app, extra)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host=host, port=port).start()
+    return runner
@@ -0,0 +1,297 @@
+"""
+Модуль версионных миграций схемы базы данных
+
+Текущая версия схемы хранится в PRAGMA user_version. Каждый шаг миграции
+выполняется в отдельной транзакции и повышает версию только после успешного
+завершения, поэтому прерванная миграция продолжается с того же шага.
+Шаги с пакетным заполнением данных коммитят каждую пачку отдельно и
+сохраняют прогресс в таблице schema_migration_progress.
+"""
+
+import logging
+import sqlite3
+import time
+from typing import Callable, List, Sequence
+
+from src.query_scheme import (
+    ALTER_TABLE_STOCK_DEVICE_ADD_ISO_DATE,
+    CREATE_INDEX_DEVICE_NAME,
+    CREATE_INDEX_STOCK_DEVICE_STATUS_DATE,
+    CREATE_TABLE_DEVICE,
+    CREATE_TABLE_DEVICE_COMPANY,
+    CREATE_TABLE_DEVICE_TYPE,
+    CREATE_TABLE_SEED_FILE,
+    CREATE_TABLE_STOCK_DEVICE,
+    UPDATE_STOCK_DEVICE_DEFAULTS,
+)
+
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.StreamHandler())
+
+
+CREATE_TABLE_MIGRATION_PROGRESS = """CREATE TABLE IF NOT EXISTS schema_migration_progress
+    (version integer primary key,
+    last_rowid integer not null default 0)
+"""
+
+
+class MigrationException(Exception):
+    def __init__(self, *args):
+        if args:
+            self.message = args[0]
+            self.value = args[1] if len(args) > 1 else None
+        else:
+            self.message = None
+            self.value = None
+
+    def __str__(self):
+        logger.warning(MigrationException)
+
+        if self.message:
+            return "MigrationException, {0} {1}".format(self.message, self.value)
+
+        else:
+            return "MigrationException вызвана для миграции схемы"
+
+
+class BatchedBackfill:
+    """Пакетное заполнение таблицы по диапазонам rowid
+
+    update_query получает именованные параметры :start и :end и
+    обновляет строки с start < rowid <= end. Каждая пачка выполняется
+    в своей короткой транзакции, между пачками делается пауза, чтобы
+    не держать блокировку записи долго. Граница таблицы перечитывается
+    перед каждой пачкой, поэтому строки, добавленные во время заполнения,
+    тоже обрабатываются.
+    """
+
+    def __init__(
+        self,
+        table: str,
+        update_query: str,
+        batch_size: int = 1000,
+        pause: float = 0.0,
+    ) -> None:
+        self.table = table
+        self.update_query = update_query
+        self.batch_size = batch_size
+        self.pause = pause
+
+    def run(self, conn: sqlite3.Connection, version: int) -> int:
+        """метод заполняет таблицу начиная с сохраненного прогресса
+        и возвращает количество обработанных пачек"""
+
+        row = conn.execute(
+            "SELECT last_rowid FROM schema_migration_progress WHERE version = ?",
+            (version,),
+        ).fetchone()
+        last_rowid = row[0] if row else 0
+        batches = 0
+
+        while True:
+            max_rowid = conn.execute(f"SELECT max(rowid) FROM {self.table}").fetchone()[
+                0
+            ]
+
+            if max_rowid is None or last_rowid >= max_rowid:
+                break
+
+            end = last_rowid + self.batch_size
+
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(self.update_query, {"start": last_rowid, "end": end})
+                conn.execute(
+                    "UPDATE schema_migration_progress SET last_rowid = ? WHERE version = ?",
+                    (end, version),
+                )
+                conn.commit()
+
+            except sqlite3.Error as err:
+                conn.rollback()
+                raise MigrationException("Ошибка пакетного заполнения", err)
+
+            last_rowid = end
+            batches += 1
+
+            if self.pause:
+                time.sleep(self.pause)
+
+        return batches
+
+
+class Migration:
+    """Шаг миграции схемы
+
+    statements выполняются как есть, apply получает соединение для
+    изменений, которые нужно проверить перед выполнением. Без backfill
+    шаг целиком выполняется в одной транзакции.
+    """
+
+    def __init__(
+        self,
+        version: int,
+        description: str,
+        statements: Sequence[str] = (),
+        apply: Callable[[sqlite3.Connection], None] | None = None,
+        backfill: BatchedBackfill | None = None,
+    ) -> None:
+        self.version = version
+        self.description = description
+        self.statements = statements
+        self.apply = apply
+        self.backfill = backfill
+
+    def apply_schema(self, conn: sqlite3.Connection):
+        for statement in self.statements:
+            conn.execute(statement)
+
+        if self.apply:
+            self.apply(conn)
+
+
+def add_stock_device_iso_date(conn: sqlite3.Connection):
+    """добавляет вычисляемую iso дату, если ее еще нет в таблице"""
+
+    columns = [row[1] for row in conn.execute("PRAGMA table_xinfo(stock_device)")]
+
+    if "at_clean_iso" not in columns:
+        conn.execute(ALTER_TABLE_STOCK_DEVICE_ADD_ISO_DATE)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        version=1,
+        description="таблицы приборов, компаний, типов и склада",
+        statements=(
+            CREATE_TABLE_DEVICE_COMPANY,
+            CREATE_TABLE_DEVICE_TYPE,
+            CREATE_TABLE_DEVICE,
+            CREATE_TABLE_STOCK_DEVICE,
+        ),
+    ),
+    Migration(
+        version=2,
+        description="вычисляемая iso дата очистки прибора на складе",
+        apply=add_stock_device_iso_date,
+    ),
+    Migration(
+        version=3,
+        description="индексы для выборок склада по статусу, дате и названию прибора",
+        statements=(
+            CREATE_INDEX_STOCK_DEVICE_STATUS_DATE,
+            CREATE_INDEX_DEVICE_NAME,
+        ),
+    ),
+    Migration(
+        version=4,
+        description="контрольные суммы загруженных файлов данных",
+        statements=(CREATE_TABLE_SEED_FILE,),
+    ),
+    # загрузчик данных подставляет DEFAULT вместо пустых значений, миграция
+    # исправляет строки баз, заполненных до этого, на новой базе склад пуст
+    Migration(
+        version=5,
+        description="часы лампы и статус без значения на складе по умолчанию",
+        backfill=BatchedBackfill(
+            table="stock_device",
+            update_query=UPDATE_STOCK_DEVICE_DEFAULTS,
+            batch_size=5000,
+        ),
+    ),
+]
+
+
+class MigrationEngine:
+    """Класс применения миграций к базе данных"""
+
+    def __init__(
+        self, conn: sqlite3.Connection, migrations: List[Migration] = MIGRATIONS
+    ) -> None:
+        versions = [item.version for item in migrations]
+
+        if versions != sorted(set(versions)):
+            raise MigrationException("Версии миграций должны возрастать", versions)
+
+        self.conn = conn
+        self.migrations = migrations
+
+    def current_version(self) -> int:
+        return self.conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def pending(self) -> List[Migration]:
+        version = self.current_version()
+        return [item for item in self.migrations if item.version > version]
+
+    def _set_version(self, version: int):
+        # PRAGMA не принимает параметры, версия всегда целое число из списка
+        self.conn.execute(f"PRAGMA user_version = {int(version)}")
+
+    def _in_progress(self, version: int) -> bool:
+        row = self.conn.execute(
+            "SELECT 1 FROM schema_migration_progress WHERE version = ?", (version,)
+        ).fetchone()
+        return row is not None
+
+    def _apply(self, migration: Migration):
+        if migration.backfill is None:
+            self.conn.execute("BEGIN IMMEDIATE")
+            migration.apply_schema(self.conn)
+            self._set_version(migration.version)
+            self.conn.commit()
+            return
+
+        if not self._in_progress(migration.version):
+            self.conn.execute("BEGIN IMMEDIATE")
+            migration.apply_schema(self.conn)
+            self.conn.execute(
+                "INSERT INTO schema_migration_progress (version) VALUES (?)",
+                (migration.version,),
+            )
+            self.conn.commit()
+
+        migration.backfill.run(self.conn, migration.version)
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.execute(
+            "DELETE FROM schema_migration_progress WHERE version = ?",
+            (migration.version,),
+        )
+        self._set_version(migration.version)
+        self.conn.commit()
+
+    def migrate(self, target: int | None = None) -> List[int]:
+        """метод применяет ожидающие миграции до target
+        и возвращает список примененных версий"""
+
+        self.conn.execute(CREATE_TABLE_MIGRATION_PROGRESS)
+        self.conn.commit()
+        applied = []
+
+        for migration in self.pending():
+            if target is not None and migration.version > target:
+                break
+
+            try:
+                self._apply(migration)
+
+            except sqlite3.Error as err:
+                self.conn.rollback()
+                raise MigrationException(
+                    f"Миграция {migration.version} не применена", err
+                )
+
+            logger.info(f"Миграция {migration.version}: {migration.description}")
+            applied.append(migration.version)
+
+        return applied
+
+
+def migrate(conn: sqlite3.Connection) -> List[int]:
+    return MigrationEngine(conn).migrate()
@@ -1,13 +1,30 @@
 from abc import abstractmethod
+from collections import OrderedDict
+import functools
+import inspect
 import logging
 import json
 import os
-import sqlite3
-from typing import Callable, Dict, List, Protocol, Tuple, Type, IO, Literal, TypeVar
+import threading
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Protocol,
+    Tuple,
+    Type,
+    IO,
+    Literal,
+    TypeVar,
+)
 
+from src.connection_pool import get_pool
 from src.scheme_for_validation import (
     AbstractTable,
     DeviceCompanyTable,
+    DeviceKeyData,
     DeviceTable,
     DeviceTypeTable,
     FabricRowFactory,
@@ -17,6 +34,7 @@ from src.scheme_for_validation import (
     StockBrokenDeviceData,
     StockDeviceData,
     StockDeviceTable,
+    StockRegistrationData,
     TableRow,
     DataForQuery,
 )
@@ -62,6 +80,49 @@ CREATE_TABLE_STOCK_DEVICE = """CREATE TABLE IF NOT EXISTS stock_device
     foreign key(device_id) references device(device_id))
 """
 
+# дата очистки хранится как d-m-yyyy, колонка at_clean_iso вычисляется
+# из нее в формате yyyy-mm-dd и пригодна для индекса и выборки по диапазону
+AT_CLEAN_ISO_EXPRESSION = """printf('%04d-%02d-%02d',
+    substr(substr(at_clean_date, instr(at_clean_date, '-') + 1),
+        instr(substr(at_clean_date, instr(at_clean_date, '-') + 1), '-') + 1),
+    substr(substr(at_clean_date, instr(at_clean_date, '-') + 1), 1,
+        instr(substr(at_clean_date, instr(at_clean_date, '-') + 1), '-') - 1),
+    substr(at_clean_date, 1, instr(at_clean_date, '-') - 1))"""
+
+ALTER_TABLE_STOCK_DEVICE_ADD_ISO_DATE = """ALTER TABLE stock_device
+    ADD COLUMN at_clean_iso text
+    GENERATED ALWAYS AS ({expression}) VIRTUAL
+""".format(expression=AT_CLEAN_ISO_EXPRESSION)
+
+CREATE_INDEX_STOCK_DEVICE_STATUS_DATE = """CREATE INDEX IF NOT EXISTS
+    idx_stock_device_status_date ON stock_device
+    (stock_device_status, at_clean_iso, device_id, stock_device_id, at_clean_date)
+"""
+
+CREATE_INDEX_DEVICE_NAME = """CREATE INDEX IF NOT EXISTS
+    idx_device_name ON device (device_name)
+"""
+
+# номера прибора, которые уже есть на складе, номера передаются json массивом
+SELECT_STOCK_IDS_IN_STOCK = """SELECT stock_device_id FROM stock_device
+    WHERE device_id = ? AND stock_device_id IN (SELECT value FROM json_each(?))
+"""
+
+CREATE_TABLE_SEED_FILE = """CREATE TABLE IF NOT EXISTS seed_file
+    (fp text primary key,
+    sha256 text not null,
+    rows integer not null,
+    loaded_at text not null)
+"""
+
+UPDATE_STOCK_DEVICE_DEFAULTS = """UPDATE stock_device SET
+    max_lamp_hours = coalesce(max_lamp_hours, 0),
+    stock_device_status = coalesce(stock_device_status, 1)
+    WHERE rowid > :start AND rowid <= :end
+    AND (max_lamp_hours IS NULL OR stock_device_status IS NULL)
+"""
+
+
 type Mode = Literal["r", "rb", "w", "wb"]
 
 
@@ -116,7 +177,7 @@ class DBSqlite:
 
     def __enter__(self):
         try:
-            self.conn = sqlite3.connect(self.db_name)
+            self.conn = get_pool(self.db_name).acquire()
             return self.conn
 
         except ConnectionError as err:
@@ -125,7 +186,7 @@ class DBSqlite:
     def __exit__(self, exc_type, exc_val, exc_tb):
         try:
             if self.conn:
-                self.conn.close()
+                get_pool(self.db_name).release(self.conn)
 
         except Exception:
             raise Exception(exc_type, exc_val, exc_tb)
@@ -151,6 +212,71 @@ class QueryException(Exception):
             return "QueryException вызвана для класса запросов"
 
 
+class QueryCache:
+    """Ограниченный кэш собранных запросов
+
+    Хранит готовый текст запроса и фабрику строк по ключу
+    (класс схемы, операция, колонки условия, колонки вставки).
+    При переполнении вытесняется давно не использованный запрос.
+    """
+
+    def __init__(self, max_size: int = 256) -> None:
+        self.max_size = max_size
+        self._data: OrderedDict[Hashable, Tuple[str, Callable]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_build(
+        self, key: Hashable, builder: Callable[[], Tuple[str, Callable]]
+    ) -> Tuple[str, Callable]:
+        with self._lock:
+            compiled = self._data.get(key)
+
+            if compiled is not None:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return compiled
+
+            self.misses += 1
+
+        compiled = builder()
+
+        with self._lock:
+            self._data[key] = compiled
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+        return compiled
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+if os.environ.get("QUERY_CACHE_SIZE"):
+    query_cache = QueryCache(int(os.environ["QUERY_CACHE_SIZE"]))
+else:
+    query_cache = QueryCache()
+
+
 class TableHandler:
     @classmethod
     def table_alias(cls, scheme: Type[AbstractTable]):
@@ -162,13 +288,43 @@ class TableHandler:
     @classmethod
     def transform_where_data(cls, data: DataForQuery | List[DataForQuery]) -> str:
         """метод для преобразования данных
-        в строку условия поиска - row1=value1 and row2=value2"""
+        в строку условия поиска - row1=? and row2=?"""
 
         if isinstance(data, DataForQuery):
             return data.build
 
         return " and ".join([item.build for item in data])
 
+    @classmethod
+    def transform_params(
+        cls, data: DataForQuery | List[DataForQuery] | None
+    ) -> Tuple[str, ...]:
+        """метод собирает значения для плейсхолдеров запроса
+        в порядке их следования в условии"""
+
+        if data is None:
+            return ()
+
+        if isinstance(data, DataForQuery):
+            return (data.row_value,)
+
+        return tuple(item.row_value for item in data)
+
+    @classmethod
+    def transform_shape(
+        cls, data: DataForQuery | List[DataForQuery] | None
+    ) -> Tuple[str, ...]:
+        """метод возвращает набор колонок условия,
+        по которому различаются собранные запросы"""
+
+        if not data:
+            return ()
+
+        if isinstance(data, DataForQuery):
+            return (data.table_row,)
+
+        return tuple(item.table_row for item in data)
+
     @classmethod
     def gen_set_value(cls, scheme: Type[AbstractTable]):
         """метод для генерации строковых значений
@@ -179,7 +335,7 @@ class TableHandler:
     @classmethod
     def transform_set_data(cls, data: DataForQuery | List[DataForQuery]) -> str:
         """метод преобразования данных в строку условия вставки данных типа
-        row1=val1, row2=val2"""
+        row1=?, row2=?"""
         if isinstance(data, DataForQuery):
             return data.build
 
@@ -195,9 +351,47 @@ class TableHandler:
 
     @classmethod
     def request_row_factory(cls, scheme: Type[AbstractTable]):
-        fabric = FabricRowFactory()
-        fabric.choice_row_factory = scheme
-        return fabric.choice_row_factory
+        return FabricRowFactory.for_scheme(scheme)
+
+
+def set_trusted_reads(enabled: bool):
+    """функция включает чтение строк без валидации,
+    собранные ранее запросы сбрасываются вместе с их фабриками строк"""
+
+    FabricRowFactory.trusted_reads = enabled
+    query_cache.clear()
+
+
+def cached_query(method: Callable) -> Callable:
+    """декоратор запоминает текст запроса и фабрику строк по форме условия,
+    значения для плейсхолдеров собираются при каждом вызове"""
+
+    arity = len(inspect.signature(method).parameters) - 1
+
+    @functools.wraps(method)
+    def wrapper(self, where_data: Any = None, set_data: Any = None):
+        args = (where_data, set_data)[:arity]
+        key = (
+            self.__class__.__name__,
+            method.__name__,
+            TableHandler.transform_shape(where_data),
+            TableHandler.transform_shape(set_data),
+        )
+        query, row_factory = query_cache.get_or_build(
+            key, lambda: method(self, *args)[:2]
+        )
+
+        if arity == 0:
+            return query, row_factory
+
+        return (
+            query,
+            row_factory,
+            TableHandler.transform_params(set_data)
+            + TableHandler.transform_params(where_data),
+        )
+
+    return wrapper
 
 
 class AbstractTableQueryScheme(Protocol):
@@ -205,7 +399,7 @@ class AbstractTableQueryScheme(Protocol):
     def query_get(
         self,
         where_data: DataForQuery | List[DataForQuery] | None = None,
-    ) -> Tuple[str, Callable]:
+    ) -> Tuple[str, Callable, Tuple[str, ...]]:
         """строковый запрос для получения данных из таблицы"""
 
     @abstractmethod
@@ -217,7 +411,7 @@ class AbstractTableQueryScheme(Protocol):
         self,
         where_data: DataForQuery | List[DataForQuery],
         set_data: DataForQuery | List[DataForQuery],
-    ) -> Tuple[str, Callable]:
+    ) -> Tuple[str, Callable, Tuple[str, ...]]:
         """строковый запрос для обновления данных в таблице"""
 
 
@@ -227,45 +421,67 @@ TableScheme = TypeVar("TableScheme", bound=AbstractTableQueryScheme, contravaria
 class QuerySchemeForStockDevice:
     """Класс формирования запросов для таблицы приборов на складе"""
 
-    def query_get_search_with_device(self, where_data) -> Tuple[str, Callable]:
+    @cached_query
+    def query_get_search_with_device(
+        self, where_data
+    ) -> Tuple[str, Callable, Tuple[str, ...]]:
         """строковый запрос для получения данных о приборах со статусом"""
         query = """SELECT {rows}
 FROM {table}
 LEFT JOIN device d ON d.device_id = sd.device_id
 WHERE {where_data}"""
-        return query.format(
-            rows=TableHandler.table_alias(StockBrokenDeviceData),
-            table=StockBrokenDeviceData.table_name(),
-            where_data=TableHandler.transform_where_data(where_data),
-        ), TableHandler.request_row_factory(StockBrokenDeviceData)
-
-    def query_get_search_with_device_company(self, where_data) -> Tuple[str, Callable]:
+        return (
+            query.format(
+                rows=TableHandler.table_alias(StockBrokenDeviceData),
+                table=StockBrokenDeviceData.table_name(),
+                where_data=TableHandler.transform_where_data(where_data),
+            ),
+            TableHandler.request_row_factory(StockBrokenDeviceData),
+            TableHandler.transform_params(where_data),
+        )
+
+    @cached_query
+    def query_get_search_with_device_company(
+        self, where_data
+    ) -> Tuple[str, Callable, Tuple[str, ...]]:
         """строковый запрос для получения данных о приборах со статусом"""
         query = """SELECT {rows}
 FROM {table}
 LEFT JOIN device d ON d.device_id = sd.device_id
 LEFT JOIN device_company dc ON dc.company_id = d.company_id
 WHERE {where_data}"""
-        return query.format(
-            rows=TableHandler.table_alias(StockBrokenDeviceData),
-            table=StockBrokenDeviceData.table_name(),
-            where_data=TableHandler.transform_where_data(where_data),
-        ), TableHandler.request_row_factory(StockBrokenDeviceData)
-
-    def query_get_search_with_device_type(self, where_data) -> Tuple[str, Callable]:
+        return (
+            query.format(
+                rows=TableHandler.table_alias(StockBrokenDeviceData),
+                table=StockBrokenDeviceData.table_name(),
+                where_data=TableHandler.transform_where_data(where_data),
+            ),
+            TableHandler.request_row_factory(StockBrokenDeviceData),
+            TableHandler.transform_params(where_data),
+        )
+
+    @cached_query
+    def query_get_search_with_device_type(
+        self, where_data
+    ) -> Tuple[str, Callable, Tuple[str, ...]]:
         """строковый запрос для получения данных о приборах со статусом"""
         query = """SELECT {rows}
 FROM {table}
 LEFT JOIN device d ON d.device_id = sd.device_id
 LEFT JOIN device_type dt ON dt.type_device_id = d.type_device_id
 WHERE {where_data}"""
-        return query.format(
-            rows=TableHandler.table_alias(StockBrokenDeviceData),
-            table=StockBrokenDeviceData.table_name(),
-            where_data=TableHandler.transform_where_data(where_data),
-        ), TableHandler.request_row_factory(StockBrokenDeviceData)
+        return (
+            query.format(
+                rows=TableHandler.table_alias(StockBrokenDeviceData),
+                table=StockBrokenDeviceData.table_name(),
+                where_data=TableHandler.transform_where_data(where_data),
+            ),
+            TableHandler.request_row_factory(StockBrokenDeviceData),
+            TableHandler.transform_params(where_data),
+        )
 
-    def query_get(self, where_data=None) -> Tuple[str, Callable]:
+    @cached_query
+    def query_get(self, where_data=None) -> Tuple[str, Callable, Tuple[str, ...]]:
         if where_data:
             query = """SELECT {rows}
 FROM {table}
@@ -274,11 +490,15 @@ LEFT JOIN device_company dc ON dc.company_id = d.company_id
 LEFT JOIN device_type dt ON dt.type_device_id = d.type_device_id
 WHERE {where_data}
 """
-            return query.format(
-                rows=TableHandler.table_alias(StockDeviceData),
-                table=StockDeviceData.table_name(),
-                where_data=TableHandler.transform_where_data(where_data),
-            ), TableHandler.request_row_factory(StockDeviceData)
+            return (
+                query.format(
+                    rows=TableHandler.table_alias(StockDeviceData),
+                    table=StockDeviceData.table_name(),
+                    where_data=TableHandler.transform_where_data(where_data),
+                ),
+                TableHandler.request_row_factory(StockDeviceData),
+                TableHandler.transform_params(where_data),
+            )
 
         else:
             query = """SELECT {rows}
@@ -287,11 +507,16 @@ LEFT JOIN device d ON d.device_id = sd.device_id
 LEFT JOIN device_company dc ON dc.company_id = d.company_id
 LEFT JOIN device_type dt ON dt.type_device_id = d.type_device_id
 """
-            return query.format(
-                rows=TableHandler.table_alias(StockDeviceData),
-                table=StockDeviceData.table_name(),
-            ), TableHandler.request_row_factory(StockDeviceData)
-
+            return (
+                query.format(
+                    rows=TableHandler.table_alias(StockDeviceData),
+                    table=StockDeviceData.table_name(),
+                ),
+                TableHandler.request_row_factory(StockDeviceData),
+                (),
+            )
+
+    @cached_query
     def query_set(self) -> Tuple[str, Callable]:
         query = "INSERT OR IGNORE INTO {table} ({rows}) VALUES ({set_values})"
         return query.format(
@@ -300,19 +525,57 @@ LEFT JOIN device_type dt ON dt.type_device_id = d.type_device_id
             set_values=TableHandler.gen_set_value(StockDeviceTable),
         ), TableHandler.request_row_factory(StockDeviceTable)
 
-    def query_update(self, where_data, set_data) -> Tuple[str, Callable]:
+    @cached_query
+    def query_update(
+        self, where_data, set_data
+    ) -> Tuple[str, Callable, Tuple[str, ...]]:
         query = "UPDATE {table} SET {set_data} WHERE {where_data}"
+        return (
+            query.format(
+                table=StockDeviceTable.table_name(),
+                set_data=TableHandler.transform_set_data(set_data),
+                where_data=TableHandler.transform_where_data(where_data),
+            ),
+            TableHandler.request_row_factory(StockDeviceTable),
+            TableHandler.transform_params(set_data)
+            + TableHandler.transform_params(where_data),
+        )
+
+    @cached_query
+    def query_stock_registration(self) -> Tuple[str, Callable]:
+        """строковый запрос для получения за один проход id прибора по названию,
+        типа его лампы и признака наличия на складе"""
+        query = """SELECT d.device_id, dt.lamp_type,
+    sd.stock_device_id IS NOT NULL AS in_stock
+FROM {table}
+LEFT JOIN device_type dt ON dt.type_device_id = d.type_device_id
+LEFT JOIN stock_device sd
+    ON sd.device_id = d.device_id AND sd.stock_device_id = ?
+WHERE d.device_name = ?
+ORDER BY in_stock DESC, d.device_id
+LIMIT 1"""
         return query.format(
-            table=StockDeviceTable.table_name(),
-            set_data=TableHandler.transform_set_data(set_data),
-            where_data=TableHandler.transform_where_data(where_data),
+            table=StockRegistrationData.table_name(),
+        ), TableHandler.request_row_factory(StockRegistrationData)
+
+    @cached_query
+    def query_upsert_clean_date(self) -> Tuple[str, Callable]:
+        """строковый запрос вставки прибора на склад, для уже имеющегося
+        прибора обновляется только дата очистки"""
+        query = """INSERT INTO stock_device ({rows}) VALUES ({set_values})
+ON CONFLICT(stock_device_id, device_id)
+DO UPDATE SET at_clean_date = excluded.at_clean_date"""
+        return query.format(
+            rows=TableHandler.table_rows(StockDeviceTable),
+            set_values=TableHandler.gen_set_value(StockDeviceTable),
         ), TableHandler.request_row_factory(StockDeviceTable)
 
 
 class QuerySchemeForDevice:
     """Класс формирования запросов для таблицы приборов"""
 
-    def query_get(self, where_data=None) -> Tuple[str, Callable]:
+    @cached_query
+    def query_get(self, where_data=None) -> Tuple[str, Callable, Tuple[str, ...]]:
         if where_data:
             query = """SELECT {rows}
 FROM {table}
@@ -320,11 +583,15 @@ LEFT JOIN device_company dc ON dc.company_id = d.company_id
 LEFT JOIN device_type dt ON dt.type_device_id = d.type_device_id
 WHERE {where_data}
 """
-            return query.format(
-                rows=TableHandler.table_alias(OutputDeviceTable),
-                table=OutputDeviceTable.table_name(),
-                where_data=TableHandler.transform_where_data(where_data),
-            ), TableHandler.request_row_factory(OutputDeviceTable)
+            return (
+                query.format(
+                    rows=TableHandler.table_alias(OutputDeviceTable),
+                    table=OutputDeviceTable.table_name(),
+                    where_data=TableHandler.transform_where_data(where_data),
+                ),
+                TableHandler.request_row_factory(OutputDeviceTable),
+                TableHandler.transform_params(where_data),
+            )
 
         else:
             query = """SELECT {rows}
@@ -332,11 +599,16 @@ FROM {table}
 LEFT JOIN device_company dc ON dc.company_id = d.company_id
 LEFT JOIN device_type dt ON dt.type_device_id = d.type_device_id
 """
-            return query.format(
-                rows=TableHandler.table_rows(OutputDeviceTable),
-                table=DeviceTable.table_name(),
-            ), TableHandler.request_row_factory(OutputDeviceTable)
-
+            return (
+                query.format(
+                    rows=TableHandler.table_rows(OutputDeviceTable),
+                    table=DeviceTable.table_name(),
+                ),
+                TableHandler.request_row_factory(OutputDeviceTable),
+                (),
+            )
+
+    @cached_query
     def query_set(self) -> Tuple[str, Callable]:
         query = "INSERT INTO {table} ({rows}) VALUES ({set_values})"
         return query.format(
@@ -345,37 +617,84 @@ LEFT JOIN device_type dt ON dt.type_device_id = d.type_device_id
             set_values=TableHandler.gen_set_value(DeviceTable),
         ), TableHandler.request_row_factory(DeviceTable)
 
-    def query_update(self, where_data, set_data) -> Tuple[str, Callable]:
+    @cached_query
+    def query_update(
+        self, where_data, set_data
+    ) -> Tuple[str, Callable, Tuple[str, ...]]:
         query = "UPDATE {table} SET {set_data} WHERE {where_data}"
+        return (
+            query.format(
+                table=DeviceTable.table_name(),
+                set_data=TableHandler.transform_set_data(set_data),
+                where_data=TableHandler.transform_where_data(where_data),
+            ),
+            TableHandler.request_row_factory(DeviceTable),
+            TableHandler.transform_params(set_data)
+            + TableHandler.transform_params(where_data),
+        )
+
+    @cached_query
+    def query_get_page(self) -> Tuple[str, Callable]:
+        """строковый запрос страницы приборов после id курсора,
+        параметры: курсор, тип лампы или NULL дважды, размер страницы"""
+        query = """SELECT {rows}
+FROM {table}
+LEFT JOIN device_type dt ON dt.type_device_id = d.type_device_id
+WHERE d.device_id > ? AND (? IS NULL OR dt.lamp_type = ?)
+ORDER BY d.device_id
+LIMIT ?"""
         return query.format(
-            table=DeviceTable.table_name(),
-            set_data=TableHandler.transform_set_data(set_data),
-            where_data=TableHandler.transform_where_data(where_data),
-        ), TableHandler.request_row_factory(DeviceTable)
+            rows=TableHandler.table_alias(DeviceKeyData),
+            table=DeviceKeyData.table_name(),
+        ), TableHandler.request_row_factory(DeviceKeyData)
+
+    @cached_query
+    def query_get_page_before(self) -> Tuple[str, Callable]:
+        """строковый запрос страницы приборов до id курсора в обратном порядке"""
+        query = """SELECT {rows}
+FROM {table}
+LEFT JOIN device_type dt ON dt.type_device_id = d.type_device_id
+WHERE d.device_id < ? AND (? IS NULL OR dt.lamp_type = ?)
+ORDER BY d.device_id DESC
+LIMIT ?"""
+        return query.format(
+            rows=TableHandler.table_alias(DeviceKeyData),
+            table=DeviceKeyData.table_name(),
+        ), TableHandler.request_row_factory(DeviceKeyData)
 
 
 class QuerySchemeForDeviceCompany:
     """Класс формирования запросов для таблицы компании производителя приборов"""
 
-    def query_get(self, where_data=None) -> Tuple[str, Callable]:
+    @cached_query
+    def query_get(self, where_data=None) -> Tuple[str, Callable, Tuple[str, ...]]:
         if where_data:
             query = """SELECT {rows} 
 FROM {table}
 WHERE {where_data}
 """
-            return query.format(
-                rows=TableHandler.table_rows(OutputDeviceCompanyTable),
-                table=OutputDeviceCompanyTable.table_name(),
-                where_data=TableHandler.transform_where_data(where_data),
-            ), TableHandler.request_row_factory(OutputDeviceCompanyTable)
+            return (
+                query.format(
+                    rows=TableHandler.table_rows(OutputDeviceCompanyTable),
+                    table=OutputDeviceCompanyTable.table_name(),
+                    where_data=TableHandler.transform_where_data(where_data),
+                ),
+                TableHandler.request_row_factory(OutputDeviceCompanyTable),
+                TableHandler.transform_params(where_data),
+            )
 
         else:
             query = "SELECT {rows} FROM {table}"
-            return query.format(
-                rows=TableHandler.table_rows(OutputDeviceCompanyTable),
-                table=OutputDeviceCompanyTable.table_name(),
-            ), TableHandler.request_row_factory(OutputDeviceCompanyTable)
-
+            return (
+                query.format(
+                    rows=TableHandler.table_rows(OutputDeviceCompanyTable),
+                    table=OutputDeviceCompanyTable.table_name(),
+                ),
+                TableHandler.request_row_factory(OutputDeviceCompanyTable),
+                (),
+            )
+
+    @cached_query
     def query_set(self):
         query = "INSERT INTO {table} ({rows}) VALUES ({set_values})"
         return query.format(
@@ -384,37 +703,55 @@ WHERE {where_data}
             set_values=TableHandler.gen_set_value(DeviceCompanyTable),
         ), TableHandler.request_row_factory(DeviceCompanyTable)
 
-    def query_update(self, where_data, set_data) -> Tuple[str, Callable]:
+    @cached_query
+    def query_update(
+        self, where_data, set_data
+    ) -> Tuple[str, Callable, Tuple[str, ...]]:
         query = "UPDATE {table} SET {set_data} WHERE {where_data}"
-        return query.format(
-            table=DeviceCompanyTable.table_name(),
-            set_data=TableHandler.transform_set_data(set_data),
-            where_data=TableHandler.transform_where_data(where_data),
-        ), TableHandler.request_row_factory(DeviceCompanyTable)
+        return (
+            query.format(
+                table=DeviceCompanyTable.table_name(),
+                set_data=TableHandler.transform_set_data(set_data),
+                where_data=TableHandler.transform_where_data(where_data),
+            ),
+            TableHandler.request_row_factory(DeviceCompanyTable),
+            TableHandler.transform_params(set_data)
+            + TableHandler.transform_params(where_data),
+        )
 
 
 class QuerySchemeForDeviceType:
     """Класс формирования запросов для таблицы типов приборов"""
 
-    def query_get(self, where_data=None) -> Tuple[str, Callable]:
+    @cached_query
+    def query_get(self, where_data=None) -> Tuple[str, Callable, Tuple[str, ...]]:
         if where_data:
             query = """SELECT {rows} 
 FROM {table}
 WHERE {where_data}
 """
-            return query.format(
-                rows=TableHandler.table_rows(OutputDeviceTypeTable),
-                table=OutputDeviceTypeTable.table_name(),
-                where_data=TableHandler.transform_where_data(where_data),
-            ), TableHandler.request_row_factory(OutputDeviceTypeTable)
+            return (
+                query.format(
+                    rows=TableHandler.table_rows(OutputDeviceTypeTable),
+                    table=OutputDeviceTypeTable.table_name(),
+                    where_data=TableHandler.transform_where_data(where_data),
+                ),
+                TableHandler.request_row_factory(OutputDeviceTypeTable),
+                TableHandler.transform_params(where_data),
+            )
 
         else:
             query = "SELECT {rows} FROM {table}"
-            return query.format(
-                rows=TableHandler.table_rows(OutputDeviceTypeTable),
-                table=DeviceTypeTable.table_name(),
-            ), TableHandler.request_row_factory(OutputDeviceTypeTable)
-
+            return (
+                query.format(
+                    rows=TableHandler.table_rows(OutputDeviceTypeTable),
+                    table=DeviceTypeTable.table_name(),
+                ),
+                TableHandler.request_row_factory(OutputDeviceTypeTable),
+                (),
+            )
+
+    @cached_query
     def query_set(self) -> Tuple[str, Callable]:
         query = "INSERT INTO {table} ({rows}) VALUES ({set_values})"
         return query.format(
@@ -423,10 +760,18 @@ WHERE {where_data}
             set_values=TableHandler.gen_set_value(DeviceTypeTable),
         ), TableHandler.request_row_factory(DeviceTypeTable)
 
-    def query_update(self, where_data, set_data) -> Tuple[str, Callable]:
+    @cached_query
+    def query_update(
+        self, where_data, set_data
+    ) -> Tuple[str, Callable, Tuple[str, ...]]:
         query = "UPDATE {table} SET {set_data} WHERE {where_data}"
-        return query.format(
-            table=DeviceTypeTable.table_name(),
-            set_data=TableHandler.transform_set_data(set_data),
-            where_data=TableHandler.transform_where_data(where_data),
-        ), TableHandler.request_row_factory(DeviceTypeTable)
+        return (
+            query.format(
+                table=DeviceTypeTable.table_name(),
+                set_data=TableHandler.transform_set_data(set_data),
+                where_data=TableHandler.transform_where_data(where_data),
+            ),
+            TableHandler.request_row_factory(DeviceTypeTable),
+            TableHandler.transform_params(set_data)
+            + TableHandler.transform_params(where_data),
+        )
@@ -0,0 +1,266 @@
+"""
+Модуль кэша справочных данных: приборов, компаний и типов приборов
+"""
+
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Tuple, TypeVar
+
+from src.connection_pool import apply_pragmas, pragma_profile_from_env
+
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.StreamHandler())
+
+
+# таблица: (колонка названия, колонка идентификатора, колонка, от которой
+# зависят клавиатуры бота)
+REFERENCE_TABLES: Dict[str, Tuple[str, str, str]] = {
+    "device": ("device_name", "device_id", "type_device_id"),
+    "device_company": ("company_name", "company_id", "NULL"),
+    "device_type": ("type_title", "type_device_id", "lamp_type"),
+}
+
+
+T = TypeVar("T")
+
+
+class ReferenceCache:
+    """Кэш соответствия названий идентификаторам для одной базы
+
+    Данные загружаются целиком, так как справочные таблицы маленькие.
+    Запись через api бота сбрасывает кэш явно. Запись сторонним процессом
+    обнаруживается по PRAGMA data_version выделенного соединения: при его
+    изменении справочники читаются заново и сравниваются с загруженными
+    строками, version растет только если содержимое действительно
+    изменилось, по нему зависимые кэши понимают, что данные устарели.
+    Производные значения, например клавиатуры бота, хранятся вместе с
+    version и строятся заново только после перезагрузки справочников.
+    Их не больше max_derived, при переполнении вытесняется давно не
+    использованное значение.
+    """
+
+    def __init__(self, db_name: str, max_derived: int = 128) -> None:
+        self.db_name = db_name
+        self.max_derived = max_derived
+        self.version = 0
+        self._names: Dict[str, Dict[str, int]] = {
+            table: {} for table in REFERENCE_TABLES
+        }
+        self._ids: Dict[str, Dict[int, str]] = {table: {} for table in REFERENCE_TABLES}
+        self._conn: sqlite3.Connection | None = None
+        self._data_version: int | None = None
+        self._rows: Dict[str, List[Tuple]] = {}
+        self._derived: OrderedDict[Hashable, Tuple[int, Any]] = OrderedDict()
+        self._stale = True
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.checks = 0
+        self.derived_hits = 0
+        self.derived_builds = 0
+        self.derived_evictions = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_name, check_same_thread=False)
+            apply_pragmas(self._conn, pragma_profile_from_env())
+
+        return self._conn
+
+    def _read(self) -> Dict[str, List[Tuple]]:
+        conn = self._connection()
+
+        # при повторе названия остается наименьший id, как при поиске по базе
+        return {
+            table: conn.execute(
+                f"SELECT {name_col}, {id_col}, {extra} FROM {table} ORDER BY {id_col} DESC"
+            ).fetchall()
+            for table, (name_col, id_col, extra) in REFERENCE_TABLES.items()
+        }
+
+    def _load(self, rows: Dict[str, List[Tuple]]):
+        names: Dict[str, Dict[str, int]] = {}
+        ids: Dict[str, Dict[int, str]] = {}
+
+        for table, table_rows in rows.items():
+            names[table] = {}
+            ids[table] = {}
+
+            for name, item_id, _ in table_rows:
+                names[table][name] = item_id
+                ids[table][item_id] = name
+
+        self._names = names
+        self._ids = ids
+        self._rows = rows
+        self._derived.clear()
+        self.version += 1
+        self.loads += 1
+
+    def _refresh(self):
+        """метод перезагружает кэш, если он сброшен или справочники изменились"""
+
+        try:
+            if not self._stale:
+                self.checks += 1
+
+            data_version = (
+                self._connection().execute("PRAGMA data_version").fetchone()[0]
+            )
+
+            if self._stale or data_version != self._data_version:
+                rows = self._read()
+
+                if self._stale or rows != self._rows:
+                    self._load(rows)
+
+                self._data_version = data_version
+                self._stale = False
+
+        except sqlite3.Error as err:
+            logger.warning(f"Кэш справочников {self.db_name} не загружен: {err}")
+            self._stale = True
+
+    def load(self):
+        """метод загружает справочники при старте"""
+
+        with self._lock:
+            self._stale = True
+            self._refresh()
+
+    def invalidate(self):
+        """метод сбрасывает кэш после записи в справочники"""
+
+        with self._lock:
+            self._stale = True
+
+    def lookup(self, table: str, name: str) -> int | None:
+        with self._lock:
+            self._refresh()
+            item_id = self._names[table].get(name)
+
+            if item_id is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+            return item_id
+
+    def derived(self, key: Hashable, builder: Callable[[], T]) -> T:
+        """метод возвращает значение, построенное для текущей версии справочников"""
+
+        with self._lock:
+            self._refresh()
+            version = self.version
+            item = self._derived.get(key)
+
+            if item is not None and item[0] == version:
+                self.derived_hits += 1
+                self._derived.move_to_end(key)
+                return item[1]
+
+        # построение идет без блокировки, так как builder сам обращается к кэшу
+        value = builder()
+
+        with self._lock:
+            self.derived_builds += 1
+            if self.version == version:
+                self._derived[key] = (version, value)
+                self._derived.move_to_end(key)
+
+                while len(self._derived) > self.max_derived:
+                    self._derived.popitem(last=False)
+                    self.derived_evictions += 1
+
+        return value
+
+    def name(self, table: str, item_id: int) -> str | None:
+        with self._lock:
+            self._refresh()
+            name = self._ids[table].get(item_id)
+
+            if name is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+            return name
+
+    def items(self, table: str) -> Tuple[Tuple[int, str], ...]:
+        """метод возвращает пары id и название в порядке id"""
+
+        with self._lock:
+            self._refresh()
+            return tuple(sorted(self._ids[table].items()))
+
+    def device_id(self, device_name: str) -> int | None:
+        return self.lookup("device", device_name)
+
+    def company_id(self, company_name: str) -> int | None:
+        return self.lookup("device_company", company_name)
+
+    def type_id(self, type_title: str) -> int | None:
+        return self.lookup("device_type", type_title)
+
+    def device_name(self, device_id: int) -> str | None:
+        return self.name("device", device_id)
+
+    def company_name(self, company_id: int) -> str | None:
+        return self.name("device_company", company_id)
+
+    def type_title(self, type_id: int) -> str | None:
+        return self.name("device_type", type_id)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._stale = True
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "checks": self.checks,
+            "derived_hits": self.derived_hits,
+            "derived_builds": self.derived_builds,
+            "derived_evictions": self.derived_evictions,
+        }
+
+
+_caches: Dict[str, ReferenceCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_reference_cache(db_name: str) -> ReferenceCache:
+    """функция возвращает кэш справочников для базы, создавая его при необходимости"""
+
+    cache = _caches.get(db_name)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(db_name)
+            if cache is None:
+                cache = ReferenceCache(db_name)
+                _caches[db_name] = cache
+
+    return cache
+
+
+def close_reference_caches():
+    with _caches_lock:
+        for cache in _caches.values():
+            cache.close()
+        _caches.clear()
@@ -3,6 +3,7 @@
 """
 
 import inspect
+import os
 from typing import Annotated, Callable, Dict, List, Literal, NewType, Tuple, Type
 from pydantic import BaseModel, ConfigDict, Field, computed_field, model_validator
 
@@ -142,6 +143,40 @@ class StockDeviceData(AbstractTable):
         return "stock_device as sd"
 
 
+class DeviceKeyData(AbstractTable):
+    device_id: Annotated[
+        int,
+        Field(gt=0, description="Идентификатор прибора", alias="d.device_id"),
+    ]
+    device_name: Annotated[
+        str,
+        Field(min_length=3, description="Название прибора", alias="d.device_name"),
+    ]
+
+    @staticmethod
+    def table_name() -> str:
+        return "device as d"
+
+
+class StockRegistrationData(AbstractTable):
+    device_id: Annotated[
+        int,
+        Field(gt=0, description="Идентификатор прибора", alias="d.device_id"),
+    ]
+    lamp_type: Annotated[
+        Lamp | None,
+        Field(description="Тип лампы прибора", alias="dt.lamp_type"),
+    ] = None
+    in_stock: Annotated[
+        int,
+        Field(ge=0, le=1, description="Прибор уже есть на складе"),
+    ] = 0
+
+    @staticmethod
+    def table_name() -> str:
+        return "device as d"
+
+
 class OutputDeviceTypeTable(AbstractTable):
     type_device_id: Annotated[
         int,
@@ -330,103 +365,171 @@ class DataForQuery(BaseModel):
     @computed_field
     @property
     def build(self) -> str:
-        return f"{self.table_row}='{self.row_value}'"
+        return f"{self.table_row}=?"
 
 
 # фабрики
-class FabricRowFactory:
-    def __init__(self):
-        self.scheme_validate = None
+def trusted_reads_from_env() -> bool:
+    return os.environ.get("DB_TRUSTED_READS", "").lower() in ("1", "true", "yes")
 
-    @property
-    def choice_row_factory(self) -> Callable:
-        if self.scheme_validate:
-            match self.scheme_validate.class_name():
-                case "StockBrokenDeviceData":
-                    return self.output_broken_device_factory
 
-                case "OutputDeviceTypeTable":
-                    return self.output_device_type_factory
+def column_fields(scheme: Type[AbstractTable]) -> Dict[str, str]:
+    """функция сопоставляет имена колонок курсора полям модели:
+    псевдоним sd.device_id, колонка device_id и само поле device_id"""
 
-                case "DeviceTypeTable":
-                    return self.device_type_factory
+    mapping = {name: name for name in scheme.model_fields}
 
-                case "OutputDeviceCompanyTable":
-                    return self.output_company_factory
+    for name, field in scheme.model_fields.items():
+        if field.alias is not None:
+            mapping[field.alias] = name
+            mapping[field.alias.rsplit(".", 1)[-1]] = name
 
-                case "DeviceCompanyTable":
-                    return self.company_factory
+    return mapping
 
-                case "OutputDeviceTable":
-                    return self.output_device_factory
 
-                case "DeviceTable":
-                    return self.device_factory
+def row_to_dict_builder(
+    scheme: Type[AbstractTable], fields: Dict[str, str], columns: Tuple[str, ...]
+) -> Tuple[Callable, frozenset]:
+    """функция собирает преобразование строки в словарь полей по индексам
+    колонок, поля без колонки получают значения по умолчанию"""
 
-                case "StockDeviceTable":
-                    return self.stock_device_factory
+    names = tuple(fields.get(column, column) for column in columns)
+    defaults = {
+        name: field.get_default(call_default_factory=True)
+        for name, field in scheme.model_fields.items()
+        if name not in names and not field.is_required()
+    }
 
-                case "StockDeviceData":
-                    return self.repr_stock_device_factory
+    def to_dict(row):
+        data = dict(zip(names, row))
+        data.update(defaults)
+        return data
 
-                case "StockDeviceTableStatus":
-                    return self.stock_device_status_factory
+    return to_dict, frozenset(names)
 
-                case _:
-                    raise ValueError(f"{self.scheme_validate} нет соответствий")
-        else:
-            raise SchemeForValidationException("Не передана схема")
 
-    @choice_row_factory.setter
-    def choice_row_factory(self, scheme: Type[AbstractTable]):
-        self.scheme_validate = scheme
+def _description_cache(scheme: Type[AbstractTable]) -> Callable:
+    """функция возвращает поиск преобразования строки по описанию курсора:
+    повторный курсор того же запроса проверяется по идентичности описания,
+    новый запрос один раз собирает преобразование по именам колонок"""
 
-    @staticmethod
-    def output_broken_device_factory(cursor, row):
-        data = {col[0]: row[idx] for idx, col in enumerate(cursor.description)}
-        return StockBrokenDeviceData(**data)
+    fields = column_fields(scheme)
+    builders: Dict[Tuple[str, ...], Tuple[Callable, frozenset]] = {}
+    last: Tuple = (None, None)
 
-    @staticmethod
-    def output_device_type_factory(cursor, row):
-        data = {col[0]: row[idx] for idx, col in enumerate(cursor.description)}
-        return OutputDeviceTypeTable(**data)
+    def lookup(description) -> Tuple[Callable, frozenset]:
+        nonlocal last
 
-    @staticmethod
-    def device_type_factory(cursor, row):
-        data = {col[0]: row[idx] for idx, col in enumerate(cursor.description)}
-        return DeviceTypeTable(**data)
+        # описание и преобразование читаются одной парой, так как другой
+        # поток может заменить last между двумя обращениями
+        last_description, last_builder = last
 
-    @staticmethod
-    def output_company_factory(cursor, row):
-        data = {col[0]: row[idx] for idx, col in enumerate(cursor.description)}
-        return OutputDeviceCompanyTable(**data)
+        if description is last_description:
+            return last_builder
 
-    @staticmethod
-    def company_factory(cursor, row):
-        data = {col[0]: row[idx] for idx, col in enumerate(cursor.description)}
-        return DeviceCompanyTable(**data)
+        columns = tuple(col[0] for col in description)
+        builder = builders.get(columns)
 
-    @staticmethod
-    def output_device_factory(cursor, row):
-        data = {col[0]: row[idx] for idx, col in enumerate(cursor.description)}
-        return OutputDeviceTable(**data)
+        if builder is None:
+            builder = row_to_dict_builder(scheme, fields, columns)
+            builders[columns] = builder
 
-    @staticmethod
-    def device_factory(cursor, row):
-        data = {col[0]: row[idx] for idx, col in enumerate(cursor.description)}
-        return DeviceTable(**data)
+        last = (description, builder)
+        return builder
 
-    @staticmethod
-    def stock_device_factory(cursor, row):
-        data = {col[0]: row[idx] for idx, col in enumerate(cursor.description)}
-        return StockDeviceTable(**data)
+    return lookup
 
-    @staticmethod
-    def repr_stock_device_factory(cursor, row):
-        data = {col[0]: row[idx] for idx, col in enumerate(cursor.description)}
-        return StockDeviceData(**data)
 
-    @staticmethod
-    def stock_device_status_factory(cursor, row):
-        data = {col[0]: row[idx] for idx, col in enumerate(cursor.description)}
-        return StockDeviceTableStatus(**data)
+def validated_row_factory(scheme: Type[AbstractTable]) -> Callable:
+    """фабрика строк со строгой валидацией модели"""
+
+    lookup = _description_cache(scheme)
+
+    def factory(cursor, row):
+        return scheme(**lookup(cursor.description)[0](row))
+
+    factory.__name__ = f"{scheme.class_name()}_factory"
+    return factory
+
+
+def trusted_row_factory(scheme: Type[AbstractTable]) -> Callable:
+    """фабрика строк без валидации для данных, прочитанных из своей базы
+
+    Экземпляр модели заполняется так же, как в model_construct,
+    но без разбора аргументов на каждую строку.
+    """
+
+    lookup = _description_cache(scheme)
+    new = object.__new__
+    setattr_ = object.__setattr__
+
+    def factory(cursor, row):
+        to_dict, fields_set = lookup(cursor.description)
+        obj = new(scheme)
+        setattr_(obj, "__dict__", to_dict(row))
+        setattr_(obj, "__pydantic_fields_set__", set(fields_set))
+        setattr_(obj, "__pydantic_extra__", None)
+        setattr_(obj, "__pydantic_private__", None)
+        return obj
+
+    factory.__name__ = f"{scheme.class_name()}_trusted_factory"
+    return factory
+
+
+ROW_SCHEMES: Tuple[Type[AbstractTable], ...] = (
+    StockBrokenDeviceData,
+    OutputDeviceTypeTable,
+    DeviceTypeTable,
+    OutputDeviceCompanyTable,
+    DeviceCompanyTable,
+    OutputDeviceTable,
+    DeviceTable,
+    StockDeviceTable,
+    StockDeviceData,
+    StockDeviceTableStatus,
+    StockRegistrationData,
+    DeviceKeyData,
+)
+# фабрики строятся один раз при импорте, выбор фабрики - поиск в словаре
+ROW_FACTORIES: Dict[Type[AbstractTable], Callable] = {
+    scheme: validated_row_factory(scheme) for scheme in ROW_SCHEMES
+}
+TRUSTED_ROW_FACTORIES: Dict[Type[AbstractTable], Callable] = {
+    scheme: trusted_row_factory(scheme) for scheme in ROW_SCHEMES
+}
+
+
+class FabricRowFactory:
+    """Выбор фабрики строк по схеме
+
+    По умолчанию каждая строка проходит строгую валидацию модели.
+    При trusted_reads (переменная окружения DB_TRUSTED_READS) строки
+    собираются без валидации, запись данных при этом не меняется.
+    """
+
+    trusted_reads: bool = trusted_reads_from_env()
+
+    def __init__(self):
+        self.scheme_validate = None
+
+    @classmethod
+    def for_scheme(cls, scheme: Type[AbstractTable]) -> Callable:
+        factories = TRUSTED_ROW_FACTORIES if cls.trusted_reads else ROW_FACTORIES
+        factory = factories.get(scheme)
+
+        if factory is None:
+            raise ValueError(f"{scheme} нет соответствий")
+
+        return factory
+
+    @property
+    def choice_row_factory(self) -> Callable:
+        if self.scheme_validate:
+            return self.for_scheme(self.scheme_validate)
+
+        else:
+            raise SchemeForValidationException("Не передана схема")
+
+    @choice_row_factory.setter
+    def choice_row_factory(self, scheme: Type[AbstractTable]):
+        self.scheme_validate = scheme
@@ -0,0 +1,102 @@
+import asyncio
+import time
+from contextlib import aclosing
+
+from pytest import mark
+
+from src.async_bot_api import AsyncAPIBotDb
+from src.bot_api import APIBotDb
+from src.connection_pool import get_pool
+from src.scheme_for_validation import OutputDeviceTable, StockBrokenDeviceData
+
+
+@mark.usefixtures("db_connect")
+@mark.async_api
+class TestAsyncAPIBotDb:
+    """Тест асинхронного фасада api бота"""
+
+    def test_delegate_method(self):
+        """тест: вызов метода api через пул потоков"""
+
+        api = AsyncAPIBotDb(APIBotDb("clean_device_test.db"), max_workers=2)
+        result = asyncio.run(api.bot_device("Laser Beam"))
+        api.shutdown()
+
+        assert isinstance(result, OutputDeviceTable)
+        assert api.stats()["calls"] == 1
+
+    def test_event_loop_not_blocked(self):
+        """тест: цикл событий продолжает работу пока выполняется запрос"""
+
+        api = AsyncAPIBotDb(APIBotDb("clean_device_test.db"), max_workers=1)
+        ticks = []
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        async def main():
+            await asyncio.gather(api.run(time.sleep, 0.1), ticker())
+
+        asyncio.run(main())
+        api.shutdown()
+
+        assert len(ticks) == 5
+        assert ticks[-1] - ticks[0] < 0.1
+
+    def test_queue_depth(self):
+        """тест: подсчет глубины очереди при ограниченном числе потоков"""
+
+        api = AsyncAPIBotDb(APIBotDb("clean_device_test.db"), max_workers=1)
+
+        async def main():
+            await asyncio.gather(*[api.run(time.sleep, 0.01) for _ in range(4)])
+
+        asyncio.run(main())
+        api.shutdown()
+
+        assert api.stats()["max_queue_depth"] == 3
+        assert api.stats()["queued"] == 0
+        assert api.stats()["in_flight"] == 0
+
+    def test_iterate_generator(self):
+        """тест: генератор api перебирается асинхронно пачками"""
+
+        api = AsyncAPIBotDb(APIBotDb("clean_device_test.db"), max_workers=2)
+
+        async def collect():
+            return [
+                batch
+                async for batch in api.bot_iter_devices_at_date(
+                    {"at_clean_date": "30-4-2025"}, status="0", size=1
+                )
+            ]
+
+        batches = asyncio.run(collect())
+        api.shutdown()
+
+        assert [len(batch) for batch in batches] == [1, 1]
+        assert all(isinstance(batch[0], StockBrokenDeviceData) for batch in batches)
+
+    def test_iterate_early_close_releases_connection(self):
+        """тест: досрочное завершение перебора возвращает соединение в пул"""
+
+        api = AsyncAPIBotDb(APIBotDb("clean_device_test.db"), max_workers=2)
+        pool = get_pool("clean_device_test.db")
+        busy = pool.stats()["busy"]
+
+        async def first_batch():
+            async with aclosing(
+                api.bot_iter_devices_at_date(
+                    {"at_clean_date": "30-4-2025"}, status="0", size=1
+                )
+            ) as batches:
+                async for batch in batches:
+                    return batch
+
+        batch = asyncio.run(first_batch())
+        api.shutdown()
+
+        assert len(batch) == 1
+        assert pool.stats()["busy"] == busy
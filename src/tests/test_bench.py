@@ -0,0 +1,33 @@
+from pytest import mark
+
+from benchmarks.bench_api import compare, run
+from benchmarks.data_generator import WarehouseSize
+
+
+@mark.bench
+class TestBenchApi:
+    """Тест замеров api на синтетическом складе"""
+
+    def test_all_scenarios_run(self):
+        """тест: каждый публичный метод api замерен и выполняется без ошибок"""
+
+        report = run(
+            WarehouseSize(companies=5, types=4, devices=20, stock=200, years=1),
+            iterations=2,
+            warmup=0,
+        )
+
+        assert report["meta"]["missing"] == []
+        assert report["meta"]["data"]["stock"] == 200
+        assert all(row["errors"] == 0 for row in report["scenarios"].values())
+        assert all(row["count"] == 2 for row in report["scenarios"].values())
+
+    def test_compare_marks_regression(self):
+        """тест: рост p95 выше порога считается регрессией"""
+
+        baseline = {"scenarios": {"a": {"p95_ms": 1.0}, "b": {"p95_ms": 1.0}}}
+        report = {"scenarios": {"a": {"p95_ms": 1.1}, "b": {"p95_ms": 1.5}}}
+
+        rows = {row["scenario"]: row["regression"] for row in compare(baseline, report)}
+
+        assert rows == {"a": False, "b": True}
@@ -1,6 +1,16 @@
 from pytest import mark
 
-from src.bot_api import APIBotDb
+from src.bot_api import (
+    Action,
+    APIBotDb,
+    DeviceCallback,
+    DeviceCompanyCallback,
+    DeviceTypeCallback,
+    Marker,
+    PageCallback,
+)
+from src.connection_pool import get_pool
+from src.database_interface import add_query_hook, remove_query_hook
 from src.scheme_for_validation import (
     OutputDeviceCompanyTable,
     OutputDeviceTable,
@@ -504,3 +514,169 @@ class TestAPIBotDb:
         res = api.bot_options_to_add_or_update(where_data)
 
         assert res[0] == expect
+
+    def test_bot_options_to_add_or_update_one_connection(self):
+        """тест: добавление прибора на склад берет одно соединение и записывает его"""
+
+        api = APIBotDb("clean_device_test.db")
+        pool = get_pool("clean_device_test.db")
+        queries = []
+
+        def hook(query, _):
+            queries.append(query)
+
+        add_query_hook(hook)
+        before = pool.stats()
+
+        try:
+            res = api.bot_options_to_add_or_update(
+                {"stock_device_id": "8001", "device_name": "Laser Beam"}
+            )
+
+        finally:
+            remove_query_hook(hook)
+
+        after = pool.stats()
+
+        assert res == (
+            "LED",
+            "Прибор с именем Laser Beam с id 8001 добавлен в базу данных",
+        )
+        assert (after["hits"] + after["misses"]) - (
+            before["hits"] + before["misses"]
+        ) == 1
+        assert len(queries) == 2
+        assert api.is_availability_device_from_stockpile(
+            {"stock_device_id": "8001", "device_name": "Laser Beam"}
+        )
+
+    def test_bot_options_to_add_or_update_unknown_device(self):
+        """тест: прибор отсутствующий в базе не добавляется на склад"""
+
+        api = APIBotDb("clean_device_test.db")
+        res = api.bot_options_to_add_or_update(
+            {"stock_device_id": "8002", "device_name": "Unknown"}
+        )
+
+        assert res == "В базе отсутсвуют записи о приборе Unknown"
+
+    def test_bot_register_stock_devices(self):
+        """тест: несколько номеров прибора записываются одной пачкой,
+        уже имеющиеся получают новую дату очистки"""
+
+        api = APIBotDb("clean_device_test.db")
+        res = api.bot_register_stock_devices(
+            {"stock_device_ids": [1, 2, 8100, 8101, 8102], "device_name": "Laser Beam"}
+        )
+
+        assert res == (
+            "bulk",
+            "Прибор Laser Beam, добавлено 3: 8100-8102, обновлена дата очистки 2: 1-2",
+        )
+        assert api.is_availability_device_from_stockpile(
+            {"stock_device_id": "8101", "device_name": "Laser Beam"}
+        )
+
+    def test_bot_register_stock_devices_fil(self):
+        """тест: новые номера прибора с лампой накаливания ждут часы лампы"""
+
+        api = APIBotDb("clean_device_test.db")
+        where_data = {"stock_device_ids": [8200, 8201], "device_name": "K90"}
+
+        assert api.bot_register_stock_devices(where_data)[0] == "FIL"
+        assert not api.is_availability_device_from_stockpile(
+            {"stock_device_id": "8200", "device_name": "K90"}
+        )
+
+        res = api.bot_register_stock_devices({**where_data, "max_lamp_hours": "1000"})
+
+        assert res == ("bulk", "Прибор K90, добавлено 2: 8200-8201")
+        assert (
+            api.bot_device_from_stockpile(
+                {"stock_device_id": "8201", "device_name": "K90"}
+            ).max_lamp_hours
+            == 1000
+        )
+        assert (
+            api.bot_register_stock_devices(
+                {"stock_device_ids": [8300, 8301], "device_name": "Unknown"}
+            )
+            == "В базе отсутсвуют записи о приборе Unknown"
+        )
+
+    def test_bot_device_page(self):
+        """тест: постраничная выборка приборов по курсору id"""
+
+        api = APIBotDb("clean_device_test.db")
+        api.page_size = 3
+
+        first, has_prev, has_next = api.bot_device_page(Marker.DEVICE)
+        assert [item.device_id for item in first] == [1, 2, 3]
+        assert (has_prev, has_next) == (False, True)
+
+        second, has_prev, has_next = api.bot_device_page(Marker.DEVICE, after=3)
+        assert [item.device_id for item in second] == [4, 5, 6]
+        assert (has_prev, has_next) == (True, True)
+
+        last, has_prev, has_next = api.bot_device_page(Marker.DEVICE, after=6)
+        assert [item.device_id for item in last] == [7, 8]
+        assert (has_prev, has_next) == (True, False)
+
+        back, has_prev, has_next = api.bot_device_page(Marker.DEVICE, before=4)
+        assert [item.device_id for item in back] == [1, 2, 3]
+        assert (has_prev, has_next) == (False, True)
+
+    def test_bot_device_page_fil(self):
+        """тест: страница приборов с лампой накаливания"""
+
+        api = APIBotDb("clean_device_test.db")
+        devices, has_prev, has_next = api.bot_device_page(Marker.DEVICE_FIL)
+
+        assert [item.device_name for item in devices] == ["K90"]
+        assert (has_prev, has_next) == (False, False)
+
+    def test_bot_inline_kb_paginated(self):
+        """тест: клавиатура содержит одну страницу и кнопки навигации"""
+
+        api = APIBotDb("clean_device_test.db")
+        api.page_size = 3
+        markup = api.bot_inline_kb(Marker.GET_DEVICE)
+        navigation = markup.inline_keyboard[-1]
+
+        assert sum(len(row) for row in markup.inline_keyboard[:-1]) == 4
+        assert [button.text for button in navigation] == ["»"]
+
+        page = PageCallback.unpack(navigation[0].callback_data)
+        next_markup = api.bot_inline_kb(page.marker, page=page)
+
+        assert [button.text for button in next_markup.inline_keyboard[-1]] == [
+            "«",
+            "»",
+        ]
+
+    def test_compact_callback_data(self):
+        """тест: кнопки приборов несут код действия и id вместо названия"""
+
+        api = APIBotDb("clean_device_test.db")
+        markup = api.bot_inline_kb(Marker.MARKING_DEVICES)
+        button = markup.inline_keyboard[0][1]
+        callback = DeviceCallback.unpack(button.callback_data)
+
+        assert button.callback_data == f"d:m:{callback.device_id}"
+        assert callback.action == Action.MARK
+        assert api.bot_device_name(callback.device_id) == button.text
+
+    def test_compact_callback_company_and_type(self):
+        """тест: названия компании и типа получаются по id из кэша"""
+
+        api = APIBotDb("clean_device_test.db")
+        company = DeviceCompanyCallback.unpack(
+            api.bot_inline_kb(Marker.DCOMPANY).inline_keyboard[0][1].callback_data
+        )
+        device_type = DeviceTypeCallback.unpack(
+            api.bot_inline_kb(Marker.DTYPE).inline_keyboard[0][1].callback_data
+        )
+
+        assert api.bot_company_name(company.company_id) == "Clay Paky"
+        assert api.bot_type_title(device_type.type_id) == "Beam"
+        assert api.bot_device_name(10000) is None
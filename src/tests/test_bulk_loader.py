@@ -0,0 +1,303 @@
+import json
+import sqlite3
+
+from pytest import fixture, mark, raises
+
+from src.bot_api import APIBotDb
+from src.bulk_loader import BulkLoadException, bulk_load, read_sql, seed
+from src.migrations import migrate
+from src.scheme_for_validation import StockDeviceData
+
+
+@fixture
+def memory_conn():
+    conn = sqlite3.connect(":memory:")
+    migrate(conn)
+    yield conn
+    conn.close()
+
+
+def index_names(conn: sqlite3.Connection):
+    return {
+        row[0]
+        for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+        )
+    }
+
+
+@mark.bulk_loader
+class TestReadSql:
+    """Тест разбора sql дампов"""
+
+    def test_values(self, tmp_path):
+        """тест: строки, экранированные кавычки, скобки и NULL в значениях"""
+
+        fp = tmp_path / "device_type.sql"
+        fp.write_text(
+            "INSERT INTO device_type (type_title,type_description,lamp_type) VALUES\n"
+            "\t ('Beam','луч (узкий), it''s',NULL),\n"
+            "\t ('Wash','заливка\nв две строки','LED');\n",
+            encoding="utf-8",
+        )
+
+        rows = list(read_sql(str(fp)))
+
+        assert rows == [
+            (
+                "device_type",
+                ("type_title", "type_description", "lamp_type"),
+                ("Beam", "луч (узкий), it's", None),
+            ),
+            (
+                "device_type",
+                ("type_title", "type_description", "lamp_type"),
+                ("Wash", "заливка\nв две строки", "LED"),
+            ),
+        ]
+
+    def test_statements_across_lines(self, tmp_path):
+        """тест: другие выражения пропускаются, заголовок INSERT может
+        занимать несколько строк"""
+
+        fp = tmp_path / "device_company.sql"
+        fp.write_text(
+            "CREATE TABLE IF NOT EXISTS t (a text);\n"
+            "INSERT INTO device_company\n"
+            "  (company_name,\n   producer_country)\nVALUES ('Robe', 'Чехия');\n"
+            "INSERT INTO device_company (company_name) VALUES ('Martin');\n",
+            encoding="utf-8",
+        )
+
+        assert list(read_sql(str(fp))) == [
+            ("device_company", ("company_name", "producer_country"), ("Robe", "Чехия")),
+            ("device_company", ("company_name",), ("Martin",)),
+        ]
+
+    def test_unclosed_string(self, tmp_path):
+        """тест: незакрытая строка в дампе вызывает ошибку"""
+
+        fp = tmp_path / "device_type.sql"
+        fp.write_text("INSERT INTO device_type (type_title) VALUES ('Beam);\n")
+
+        with raises(BulkLoadException):
+            list(read_sql(str(fp)))
+
+
+@mark.bulk_loader
+class TestBulkLoad:
+    """Тест пакетной загрузки данных"""
+
+    def test_dumps_match_executescript(self, memory_conn):
+        """тест: загрузка дампов дает те же строки, что и executescript"""
+
+        fp_lst = [
+            "data_cache/device_company_test.sql",
+            "data_cache/device_type_test.sql",
+            "data_cache/device_test.sql",
+            "data_cache/stock_device_test.sql",
+        ]
+        expected = sqlite3.connect(":memory:")
+        migrate(expected)
+
+        for fp in fp_lst:
+            with open(fp, "r") as file:
+                expected.executescript(file.read())
+
+        results = bulk_load(memory_conn, fp_lst)
+
+        for table in ["device_company", "device_type", "device", "stock_device"]:
+            query = f"SELECT * FROM {table} ORDER BY 1, 2"
+            assert (
+                memory_conn.execute(query).fetchall()
+                == expected.execute(query).fetchall()
+            )
+
+        assert [result.inserted for result in results][:3] == [2, 5, 8]
+        assert index_names(memory_conn) == index_names(expected)
+
+    def test_reload_is_idempotent(self, memory_conn):
+        """тест: повторная загрузка не создает дубликатов в таблице без ключа"""
+
+        fp_lst = ["data_cache/device_test.sql", "data_cache/stock_device_test.sql"]
+        bulk_load(memory_conn, fp_lst)
+        results = bulk_load(memory_conn, fp_lst)
+
+        assert [result.inserted for result in results] == [0, 0]
+        assert memory_conn.execute("SELECT count(*) FROM device").fetchone()[0] == 8
+
+    def test_csv_and_jsonl(self, memory_conn, tmp_path):
+        """тест: csv и jsonl загружаются в таблицу по имени файла"""
+
+        csv_fp = tmp_path / "stock_device.csv"
+        csv_fp.write_text(
+            "stock_device_id,device_id,at_clean_date,max_lamp_hours\n"
+            "1,1,1-5-2025,\n"
+            "2,1,2-5-2025,1000\n"
+        )
+        jsonl_fp = tmp_path / "history.jsonl"
+        jsonl_fp.write_text(
+            "\n".join(
+                json.dumps(
+                    {
+                        "stock_device_id": idx,
+                        "device_id": 2,
+                        "at_clean_date": "3-5-2025",
+                    }
+                )
+                for idx in range(3, 6)
+            )
+        )
+
+        results = bulk_load(memory_conn, [str(csv_fp)])
+        results += bulk_load(memory_conn, [str(jsonl_fp)], table="stock_device")
+
+        assert [result.rows for result in results] == [2, 3]
+        assert results[0].rows_per_s > 0
+        assert memory_conn.execute(
+            "SELECT max_lamp_hours, at_clean_iso FROM stock_device WHERE stock_device_id = 2"
+        ).fetchone() == (1000, "2025-05-02")
+        assert memory_conn.execute(
+            "SELECT max_lamp_hours FROM stock_device WHERE stock_device_id = 1"
+        ).fetchone() == (0,)
+
+    @mark.usefixtures("db_connect")
+    def test_blank_cells_use_defaults(self, tmp_path):
+        """тест: пустые поля csv получают значения по умолчанию и строка
+        читается через api бота"""
+
+        fp = tmp_path / "stock_device.csv"
+        fp.write_text(
+            "stock_device_id,device_id,at_clean_date,max_lamp_hours,stock_device_status\n"
+            "900,4,1-5-2025,,\n"
+        )
+        conn = sqlite3.connect("clean_device_test.db")
+
+        try:
+            bulk_load(conn, [str(fp)])
+            row = conn.execute(
+                "SELECT max_lamp_hours, stock_device_status FROM stock_device WHERE stock_device_id = 900"
+            ).fetchone()
+
+        finally:
+            conn.close()
+
+        stock_device = APIBotDb("clean_device_test.db").bot_device_from_stockpile(
+            {"stock_device_id": "900", "device_name": "Laser Beam"}
+        )
+
+        assert row == (0, 1)
+        assert isinstance(stock_device, StockDeviceData)
+        assert stock_device.max_lamp_hours == 0
+
+    def test_error_rolls_back(self, memory_conn, tmp_path):
+        """тест: ошибка в любом файле откатывает всю загрузку и индексы"""
+
+        broken = tmp_path / "stock_device.csv"
+        broken.write_text("stock_device_id,unknown_column\n1,2\n")
+        indexes = index_names(memory_conn)
+
+        with raises(BulkLoadException):
+            bulk_load(memory_conn, ["data_cache/stock_device_test.sql", str(broken)])
+
+        assert (
+            memory_conn.execute("SELECT count(*) FROM stock_device").fetchone()[0] == 0
+        )
+        assert index_names(memory_conn) == indexes
+        assert not memory_conn.in_transaction
+
+
+@mark.bulk_loader
+class TestSeed:
+    """Тест загрузки данных при старте по контрольным суммам"""
+
+    def test_unchanged_files_skipped(self, memory_conn, tmp_path):
+        """тест: неизмененный файл пропускается, измененный догружается"""
+
+        fp = tmp_path / "stock_device.csv"
+        fp.write_text("stock_device_id,device_id,at_clean_date\n1,1,1-5-2025\n")
+
+        assert [result.inserted for result in seed(memory_conn, [str(fp)])] == [1]
+        assert seed(memory_conn, [str(fp)]) == []
+
+        fp.write_text(
+            "stock_device_id,device_id,at_clean_date\n1,1,1-5-2025\n2,1,2-5-2025\n"
+        )
+        results = seed(memory_conn, [str(fp)])
+
+        assert [(result.rows, result.inserted) for result in results] == [(2, 1)]
+        assert memory_conn.execute("SELECT fp, rows FROM seed_file").fetchall() == [
+            (str(fp), 2)
+        ]
+
+    def test_changed_row_updated(self, memory_conn, tmp_path):
+        """тест: строка справочника измененного файла с существующим ключом
+        обновляется"""
+
+        fp = tmp_path / "device_type.csv"
+        fp.write_text("type_title,type_description,lamp_type\nBeam,Луч,LED\n")
+        seed(memory_conn, [str(fp)])
+
+        fp.write_text("type_title,type_description,lamp_type\nBeam,Луч,FIL\n")
+        results = seed(memory_conn, [str(fp)])
+
+        assert [(result.rows, result.inserted) for result in results] == [(1, 1)]
+        assert memory_conn.execute(
+            "SELECT type_title, lamp_type FROM device_type"
+        ).fetchall() == [("Beam", "FIL")]
+
+    @mark.usefixtures("db_connect")
+    def test_stock_changes_kept(self, tmp_path):
+        """тест: повторная загрузка измененного файла склада не
+        перезаписывает изменения, сделанные ботом"""
+
+        fp = tmp_path / "stock_device_test.sql"
+        fp.write_text(
+            open("data_cache/stock_device_test.sql", encoding="utf-8").read(),
+            encoding="utf-8",
+        )
+        conn = sqlite3.connect("clean_device_test.db")
+        api = APIBotDb("clean_device_test.db")
+
+        try:
+            seed(conn, [str(fp)])
+            api.bot_change_device_status(
+                {"stock_device_id": "35", "device_name": "K20", "mark": "0"}
+            )
+            changed = conn.execute(
+                "SELECT stock_device_status, at_clean_date FROM stock_device WHERE stock_device_id = 35"
+            ).fetchone()
+
+            with open(fp, "a", encoding="utf-8") as file:
+                file.write(
+                    "\nINSERT INTO stock_device (stock_device_id,device_id,at_clean_date) VALUES (9001,4,'1-5-2025');\n"
+                )
+
+            results = seed(conn, [str(fp)])
+            row = conn.execute(
+                "SELECT stock_device_status, at_clean_date FROM stock_device WHERE stock_device_id = 35"
+            ).fetchone()
+
+        finally:
+            conn.close()
+
+        assert [result.inserted for result in results] == [1]
+        assert row == changed
+        assert api.is_availability_device_from_stockpile(
+            {"stock_device_id": "9001", "device_name": "Laser Beam"}
+        )
+
+    def test_failed_load_not_recorded(self, memory_conn, tmp_path):
+        """тест: при ошибке контрольные суммы не сохраняются и файлы
+        загружаются при следующем запуске"""
+
+        good = tmp_path / "stock_device.csv"
+        good.write_text("stock_device_id,device_id,at_clean_date\n1,1,1-5-2025\n")
+        broken = tmp_path / "unknown_table.csv"
+        broken.write_text("column\n1\n")
+
+        with raises(BulkLoadException):
+            seed(memory_conn, [str(good), str(broken)])
+
+        assert memory_conn.execute("SELECT count(*) FROM seed_file").fetchone()[0] == 0
+        assert len(seed(memory_conn, [str(good)])) == 1
@@ -0,0 +1,206 @@
+import sqlite3
+import threading
+
+from pytest import mark, raises
+
+from src.connection_pool import (
+    PRAGMA_NAMES,
+    PRAGMA_PROFILES,
+    ConnectionPool,
+    ConnectionPoolException,
+    check_pragmas,
+    effective_pragmas,
+    get_pool,
+    pragma_profile_from_env,
+)
+from src.database_interface import DataBaseInterface
+
+
+@mark.connection_pool
+class TestConnectionPool:
+    """Тест пула соединений с базой данных"""
+
+    def test_acquire_reuse(self):
+        """тест: повторная выдача соединения из пула"""
+
+        pool = ConnectionPool("clean_device_test.db", max_size=2)
+        conn = pool.acquire()
+        pool.release(conn)
+
+        assert pool.acquire() is conn
+        assert pool.stats()["hits"] == 1
+        assert pool.stats()["misses"] == 1
+
+    def test_acquire_timeout(self):
+        """тест: ожидание свободного соединения превышает таймаут"""
+
+        pool = ConnectionPool("clean_device_test.db", max_size=1, timeout=0.05)
+        pool.acquire()
+
+        with raises(ConnectionPoolException):
+            pool.acquire()
+
+        assert pool.stats()["waits"] == 1
+
+    def test_wait_for_release(self):
+        """тест: поток дожидается возврата соединения в пул"""
+
+        pool = ConnectionPool("clean_device_test.db", max_size=1, timeout=2)
+        conn = pool.acquire()
+        timer = threading.Timer(0.05, pool.release, args=(conn,))
+        timer.start()
+
+        assert pool.acquire() is conn
+        assert pool.stats()["wait_time"] > 0
+
+    def test_broken_connection_discarded(self):
+        """тест: закрытое соединение не выдается повторно"""
+
+        pool = ConnectionPool("clean_device_test.db", max_size=1)
+        conn = pool.acquire()
+        pool.release(conn)
+        conn.close()
+
+        assert pool.acquire() is not conn
+        assert pool.stats()["discarded"] == 1
+
+    def test_slow_connect_outside_lock(self, monkeypatch):
+        """тест: открытие нового соединения не блокирует выдачу и возврат
+        остальных соединений пула"""
+
+        pool = ConnectionPool("clean_device_test.db", max_size=2)
+        conn = pool.acquire()
+        pool.release(conn)
+        conn = pool.acquire()
+        connecting = threading.Event()
+        proceed = threading.Event()
+        connect = pool._connect
+
+        def slow_connect():
+            connecting.set()
+            proceed.wait(2)
+            return connect()
+
+        monkeypatch.setattr(pool, "_connect", slow_connect)
+        thread = threading.Thread(target=pool.acquire)
+        thread.start()
+        connecting.wait(2)
+
+        pool.release(conn)
+        assert pool.acquire() is conn
+        assert pool.stats()["connecting"] == 1
+
+        proceed.set()
+        thread.join(2)
+        assert pool.stats()["busy"] == 2
+
+    def test_failed_connect_frees_slot(self, monkeypatch):
+        """тест: ошибка открытия соединения освобождает место в пуле"""
+
+        pool = ConnectionPool("clean_device_test.db", max_size=1)
+        connect = pool._connect
+
+        def broken_connect():
+            raise sqlite3.OperationalError("база недоступна")
+
+        monkeypatch.setattr(pool, "_connect", broken_connect)
+
+        with raises(sqlite3.OperationalError):
+            pool.acquire()
+
+        monkeypatch.setattr(pool, "_connect", connect)
+
+        assert pool.acquire() is not None
+        assert pool.stats()["size"] == 1
+
+    def test_release_resets_connection(self):
+        """тест: возвращенное соединение очищается от фабрики строк"""
+
+        pool = ConnectionPool("clean_device_test.db", max_size=1)
+        conn = pool.acquire()
+        conn.row_factory = lambda cursor, row: row
+        pool.release(conn)
+
+        assert pool.acquire().row_factory is None
+
+    def test_database_interface_uses_pool(self):
+        """тест: интерфейс базы данных берет соединение из пула"""
+
+        pool = get_pool("clean_device_test.db")
+
+        with DataBaseInterface("clean_device_test.db") as db:
+            first = db.conn
+
+        with DataBaseInterface("clean_device_test.db") as db:
+            assert db.conn is first
+
+        assert pool.stats()["busy"] == 0
+
+
+@mark.connection_pool
+class TestPragmaProfile:
+    """Тест профиля настроек соединения"""
+
+    def test_profile_from_env(self, monkeypatch):
+        """тест: профиль и переопределения pragma из окружения"""
+
+        monkeypatch.setenv("DB_PROFILE", "safe")
+        monkeypatch.setenv("DB_PRAGMA_SYNCHRONOUS", "NORMAL")
+        pragmas = pragma_profile_from_env()
+
+        assert pragmas["journal_mode"] == "WAL"
+        assert pragmas["synchronous"] == "NORMAL"
+        assert pragmas["busy_timeout"] == "10000"
+
+    def test_unknown_profile(self, monkeypatch):
+        """тест: неизвестный профиль вызывает исключение"""
+
+        monkeypatch.setenv("DB_PROFILE", "fast")
+
+        with raises(ConnectionPoolException):
+            pragma_profile_from_env()
+
+    def test_pooled_connection_profile(self):
+        """тест: соединения пула создаются с профилем производительности"""
+
+        pool = ConnectionPool(
+            "clean_device_test.db", pragmas=PRAGMA_PROFILES["performance"]
+        )
+        conn = pool.acquire()
+        effective = effective_pragmas(conn)
+        pool.release(conn)
+
+        assert effective["journal_mode"] == "wal"
+        assert effective["synchronous"] == "NORMAL"
+        assert effective["cache_size"] == "-16000"
+        assert effective["temp_store"] == "MEMORY"
+        assert effective["busy_timeout"] == "5000"
+
+    def test_invalid_pragma_value(self):
+        """тест: значение pragma с посторонними символами отклоняется"""
+
+        pool = ConnectionPool(
+            "clean_device_test.db", pragmas={"synchronous": "OFF; DROP TABLE device"}
+        )
+
+        with raises(ConnectionPoolException):
+            pool.acquire()
+
+    def test_check_pragmas(self):
+        """тест: стартовая проверка возвращает действующие настройки"""
+
+        effective = check_pragmas("clean_device_test.db")
+
+        assert set(effective) == set(PRAGMA_NAMES)
+
+    def test_check_pragmas_mismatch_warning(self, caplog):
+        """тест: pragma, которую sqlite не применил, выводится предупреждением"""
+
+        with caplog.at_level("WARNING", logger="src.connection_pool"):
+            effective = check_pragmas(":memory:")
+
+        assert effective["journal_mode"] == "memory"
+        assert any(
+            record.levelname == "WARNING" and "journal_mode" in record.getMessage()
+            for record in caplog.records
+        )
@@ -180,7 +180,7 @@ class TestDatabaseInterface:
 
         raw_query = query.query_get(where_data=where_data)
         cursor = db_connect.row_factory_for_connection(raw_query[1])
-        result = db_connect.get(cursor=cursor, query=raw_query[0])
+        result = db_connect.get(cursor=cursor, query=raw_query[0], params=raw_query[2])
 
         assert isinstance(result, expected)
 
@@ -197,9 +197,60 @@ class TestDatabaseInterface:
         db_connect.update(
             cursor=cursor,
             query=raw_query[0],
+            params=raw_query[2],
         )
         cur = db_connect.conn.cursor()
         cur.execute(query_result)
         result = cur.fetchone()
 
         assert isinstance(result, expected)
+
+    def test_transaction_rollback(self, db_connect):
+        """тест: ошибка внутри транзакции откатывает все изменения"""
+
+        try:
+            with db_connect.transaction():
+                db_connect.conn.execute("UPDATE stock_device SET max_lamp_hours = 999")
+                raise ValueError("ошибка")
+
+        except ValueError:
+            pass
+
+        cur = db_connect.conn.execute(
+            "SELECT count(*) FROM stock_device WHERE max_lamp_hours = 999"
+        )
+
+        assert cur.fetchone()[0] == 0
+
+    def test_set_many_in_transaction(self, db_connect):
+        """тест: set_many внутри транзакции откатывается вместе с ней"""
+
+        try:
+            with db_connect.transaction():
+                db_connect.set_many(
+                    query="INSERT INTO stock_device (stock_device_id, device_id, at_clean_date) VALUES (?, ?, ?)",
+                    set_data=[(10001, 4, "1-5-2025"), (10002, 4, "1-5-2025")],
+                    cursor=db_connect.conn.cursor(),
+                )
+                raise ValueError("ошибка")
+
+        except ValueError:
+            pass
+
+        cur = db_connect.conn.execute(
+            "SELECT count(*) FROM stock_device WHERE stock_device_id > 10000"
+        )
+
+        assert cur.fetchone()[0] == 0
+
+    def test_get_many_batch_size(self, db_connect):
+        """тест: результат запроса отдается пачками заданного размера"""
+
+        cursor = db_connect.conn.cursor()
+        batches = list(
+            db_connect.get_many(
+                query="SELECT device_id FROM device", cursor=cursor, size=3
+            )
+        )
+
+        assert [len(batch) for batch in batches] == [3, 3, 2]
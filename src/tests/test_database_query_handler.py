@@ -26,13 +26,13 @@ class TestDatabaseQueryHandler:
                 prefix="sd",
                 table_row="stock_device_id",
                 row_value="99",
-                build="stock_device_id='99'",  # type: ignore
+                build="stock_device_id=?",  # type: ignore
             ),
             DataForQuery(
                 prefix="d",
                 table_row="device_name",
                 row_value="Laser Beam",
-                build="device_name='Laser Beam'",  # type: ignore
+                build="device_name=?",  # type: ignore
             ),
         ]
 
@@ -71,3 +71,13 @@ class TestDatabaseQueryHandler:
                 stock_device_id=1, device_name="Laser Beam", at_clean_date="27-4-2025"
             )
         ]
+
+    def test_database_get_item_quoted_value(self, db_query_handler):
+        """тест: значение с кавычкой передается параметром запроса"""
+
+        data_from_bot = MessageInput(
+            {("sd", "stock_device_id"): "1", ("d", "device_name"): "Laser' Beam"}
+        )
+        result = db_query_handler.database_get_item(data_from_bot)
+
+        assert result is None
@@ -0,0 +1,80 @@
+import asyncio
+import sqlite3
+
+from aiogram import Bot
+from pytest import mark
+
+from benchmarks.load_dispatcher import RecordingSession, run_load
+from src.bot_api import APIBotDb
+
+
+@mark.usefixtures("db_connect")
+@mark.load
+class TestLoadDispatcher:
+    """Тест нагрузочного прогона диспетчера"""
+
+    def test_flows_pass_through_routers(self):
+        """тест: сценарии пользователей проходят через роутеры бота без ошибок"""
+
+        report = asyncio.run(run_load("clean_device_test.db", users=3, flows=2))
+
+        assert report["errors"] == 0
+        assert report["failed_flows"] == 0
+        assert sum(report["flows"].values()) == 6
+        assert report["outgoing"]["AnswerCallbackQuery"] == 6
+        assert report["latency"]["all"]["count"] == report["updates"]
+        assert report["loop"]["samples"] > 0
+        assert set(report["handlers"]) & {"add_stock_device_id", "start_mark_device"}
+
+    def test_bulk_stock_flow(self):
+        """тест: диапазон номеров записывается на склад за один сценарий"""
+
+        report = asyncio.run(
+            run_load(
+                "clean_device_test.db", users=2, flows=1, names=["add_stock_devices"]
+            )
+        )
+        conn = sqlite3.connect("clean_device_test.db")
+        added = conn.execute(
+            "SELECT count(*) FROM stock_device WHERE stock_device_id > 9000"
+        ).fetchone()[0]
+        conn.close()
+
+        assert report["errors"] == 0
+        assert report["flows"] == {"add_stock_devices": 2}
+        assert added == 20
+
+    def test_unknown_device_answer(self, monkeypatch):
+        """тест: строка ошибки api вместо результата записи не ломает
+        обработчик добавления прибора на склад"""
+
+        answers = []
+
+        def not_found(self, where_data):
+            answers.append(where_data["device_name"])
+            return f"В базе отсутсвуют записи о приборе {where_data['device_name']}"
+
+        monkeypatch.setattr(APIBotDb, "bot_options_to_add_or_update", not_found)
+        report = asyncio.run(
+            run_load(
+                "clean_device_test.db", users=1, flows=1, names=["add_stock_device"]
+            )
+        )
+
+        assert report["errors"] == 0
+        assert report["failed_flows"] == 0
+        assert len(answers) == 1
+        assert report["outgoing"]["SendMessage"] == 3
+
+    def test_recording_session(self):
+        """тест: сессия-заглушка считает вызовы и возвращает сообщение"""
+
+        session = RecordingSession()
+        bot = Bot("123456:ABCdefGhIJKlmnoPQRstuvWXyz", session=session)
+
+        message = asyncio.run(bot.send_message(chat_id=7, text="привет"))
+
+        assert message.chat.id == 7
+        assert message.text == "привет"
+        assert session.calls == {"SendMessage": 1}
+        assert session.last_text[7] == "привет"
@@ -0,0 +1,53 @@
+from pytest import mark, raises
+
+from src.message_handler import (
+    BUTTON_DESCRIPTION,
+    RENDERERS,
+    STATIC_MESSAGES,
+    MessageDescription,
+    compile_template,
+)
+
+
+@mark.message_handler
+class TestMessageDescription:
+    """Тест реестра отрисовки сообщений бота"""
+
+    def test_compile_template(self):
+        """тест: разобранный шаблон совпадает с str.format"""
+
+        template = "<b>{name}</b> {hours:.1f} из <code>{total}</code>"
+        render = compile_template(template, ("name", "hours", "total"))
+
+        assert render("K90", 12.345, 300) == template.format(
+            name="K90", hours=12.345, total=300
+        )
+        assert compile_template("<i>{x}</i>", ("x",))(5) == "<i>5</i>"
+        assert compile_template("без полей", ())() == "без полей"
+
+    def test_renderer_with_data(self):
+        """тест: сообщение с данными и сообщение об ошибке без данных"""
+
+        mes_des = MessageDescription("lamp_error")
+        mes_des.message_data = ("lamp", "K90")
+
+        assert mes_des.description() == BUTTON_DESCRIPTION["lamp_error"].format(
+            lamp_error="lamp", stock_device_data="K90"
+        )
+        assert MessageDescription("max_lamp_hours").description() == (
+            "Ошибка передачи данных о максимальном ресурсе лампы"
+        )
+
+    def test_static_messages(self):
+        """тест: сообщения без данных берутся из готовых строк"""
+
+        assert "/start" in STATIC_MESSAGES
+        assert "update" not in STATIC_MESSAGES
+        assert set(STATIC_MESSAGES).isdisjoint(RENDERERS)
+        assert MessageDescription("/get").description() == BUTTON_DESCRIPTION["/get"]
+        assert MessageDescription(None).description() == (
+            "<b>Переданное сообщение не известно</b>"
+        )
+
+        with raises(KeyError):
+            MessageDescription("/unknown").description()
@@ -0,0 +1,147 @@
+import asyncio
+
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Message, Update
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+from pytest import mark
+
+from src.async_bot_api import AsyncAPIBotDb
+from src.bot.handlers.stats_handler import admin_ids_from_env
+from src.bot_api import APIBotDb
+from src.database_interface import remove_query_hook
+from src.message_handler import MessageDescription
+from src.metrics import (
+    Histogram,
+    Metrics,
+    add_metrics_route,
+    record_query,
+    setup_metrics,
+)
+
+
+def make_update(update_id: int, text: str) -> Update:
+    return Update.model_validate(
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": 0,
+                "chat": {"id": 1, "type": "private"},
+                "from": {"id": 1, "is_bot": False, "first_name": "test"},
+                "text": text,
+            },
+        }
+    )
+
+
+def feed_updates(registry: Metrics, texts) -> None:
+    api = AsyncAPIBotDb(APIBotDb("clean_device_test.db"), max_workers=1)
+    router = Router()
+
+    @router.message(F.text == "/get_devices")
+    async def list_devices(message: Message):
+        await api.bot_lst_device()
+        await api.bot_lst_company()
+
+    @router.message(F.text == "/fail")
+    async def failing(message: Message):
+        raise ValueError("сбой обработчика")
+
+    dp = Dispatcher(storage=MemoryStorage())
+    dp.include_router(router)
+    setup_metrics(dp, [router], registry)
+    bot = Bot("123456:ABCdefGhIJKlmnoPQRstuvWXyz")
+
+    async def feed():
+        for update_id, text in enumerate(texts):
+            try:
+                await dp.feed_update(bot, make_update(update_id, text))
+            except ValueError:
+                pass
+
+    try:
+        asyncio.run(feed())
+
+    finally:
+        remove_query_hook(record_query)
+        api.shutdown()
+
+
+@mark.metrics
+class TestHistogram:
+    """Тест гистограммы задержек"""
+
+    def test_quantiles(self):
+        """тест: квантили по верхним границам корзин"""
+
+        histogram = Histogram()
+        for value in [0.002] * 90 + [0.2] * 9 + [20]:
+            histogram.observe(value)
+
+        assert histogram.quantile(0.5) == 0.0025
+        assert histogram.quantile(0.95) == 0.25
+        assert histogram.quantile(1) == 20
+        assert histogram.to_dict()["count"] == 100
+
+
+@mark.usefixtures("db_connect")
+@mark.metrics
+class TestMetricsMiddleware:
+    """Тест сбора метрик обработчиков"""
+
+    def test_handler_latency_and_db_time(self):
+        """тест: задержка, время базы и очередь считаются по обработчику"""
+
+        registry = Metrics()
+        feed_updates(registry, ["/get_devices", "/get_devices", "/fail", "/nothing"])
+        handlers = registry.to_dict()["handlers"]
+
+        assert handlers["list_devices"]["latency"]["count"] == 2
+        assert handlers["list_devices"]["db_queries"] == 4
+        assert handlers["list_devices"]["db_time"]["max"] > 0
+        assert handlers["list_devices"]["errors"] == 0
+        assert handlers["failing"]["errors"] == 1
+        assert handlers["failing"]["db_queries"] == 0
+        assert handlers["unhandled_message"]["latency"]["count"] == 1
+
+    def test_metrics_endpoint(self):
+        """тест: локальный маршрут отдает метрики в json"""
+
+        registry = Metrics()
+        feed_updates(registry, ["/get_devices"])
+        app = web.Application()
+        add_metrics_route(app, lambda: {"extra": 1})
+
+        async def fetch():
+            client = TestClient(TestServer(app))
+            await client.start_server()
+
+            try:
+                response = await client.get("/metrics")
+                return response.status, await response.json()
+
+            finally:
+                await client.close()
+
+        status, data = asyncio.run(fetch())
+
+        assert status == 200
+        assert data["extra"] == 1
+        assert "handlers" in data
+
+    def test_stats_message(self, monkeypatch):
+        """тест: сообщение /stats со списком обработчиков"""
+
+        registry = Metrics()
+        feed_updates(registry, ["/get_devices"])
+        mes_des = MessageDescription("/stats")
+        mes_des.message_data = registry.to_dict(limit=5)
+        monkeypatch.setenv("ADMIN_IDS", "1, 42")
+
+        assert "<code>list_devices</code>: 1 шт" in mes_des.description()
+        assert MessageDescription("/stats").description() == (
+            "<i>Метрики еще не собраны</i>"
+        )
+        assert admin_ids_from_env() == {1, 42}
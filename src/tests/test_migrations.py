@@ -0,0 +1,210 @@
+import sqlite3
+
+from pytest import fixture, mark, raises
+
+from src.bulk_loader import seed
+from src.migrations import (
+    MIGRATIONS,
+    BatchedBackfill,
+    Migration,
+    MigrationEngine,
+    MigrationException,
+    migrate,
+)
+
+
+@fixture
+def memory_conn():
+    conn = sqlite3.connect(":memory:")
+    yield conn
+    conn.close()
+
+
+def backfill_migrations(batch_size: int):
+    return [
+        Migration(
+            version=1,
+            description="таблица для заполнения",
+            statements=("CREATE TABLE item (item_id integer, marker text)",),
+        ),
+        Migration(
+            version=2,
+            description="пакетное заполнение маркера",
+            backfill=BatchedBackfill(
+                table="item",
+                update_query="UPDATE item SET marker = 'done' WHERE rowid > :start AND rowid <= :end",
+                batch_size=batch_size,
+            ),
+        ),
+    ]
+
+
+@mark.migrations
+class TestMigrationEngine:
+    """Тест применения миграций схемы"""
+
+    def test_migrate_fresh_database(self, memory_conn):
+        """тест: применение всех миграций к пустой базе"""
+
+        engine = MigrationEngine(memory_conn)
+        applied = engine.migrate()
+
+        assert applied == [item.version for item in MIGRATIONS]
+        assert engine.current_version() == MIGRATIONS[-1].version
+        assert engine.pending() == []
+
+    def test_migrate_is_idempotent(self, memory_conn):
+        """тест: повторный запуск миграций ничего не применяет"""
+
+        MigrationEngine(memory_conn).migrate()
+
+        assert MigrationEngine(memory_conn).migrate() == []
+
+    def test_migrate_target(self, memory_conn):
+        """тест: применение миграций до заданной версии"""
+
+        engine = MigrationEngine(memory_conn)
+
+        assert engine.migrate(target=1) == [1]
+        assert engine.current_version() == 1
+
+    def test_migrate_existing_tables(self, memory_conn):
+        """тест: миграция базы, созданной до появления версий"""
+
+        for statement in MIGRATIONS[0].statements:
+            memory_conn.execute(statement)
+        memory_conn.commit()
+        engine = MigrationEngine(memory_conn)
+        engine.migrate()
+        columns = [
+            row[1] for row in memory_conn.execute("PRAGMA table_xinfo(stock_device)")
+        ]
+
+        assert "at_clean_iso" in columns
+
+    def test_failed_step_rolls_back(self, memory_conn):
+        """тест: ошибочный шаг не меняет версию и схему"""
+
+        migrations = [
+            Migration(
+                version=1,
+                description="ошибочный шаг",
+                statements=("CREATE TABLE broken (id integer)", "SELECT * FROM nope"),
+            )
+        ]
+        engine = MigrationEngine(memory_conn, migrations)
+
+        with raises(MigrationException):
+            engine.migrate()
+
+        assert engine.current_version() == 0
+        assert not memory_conn.execute(
+            "SELECT name FROM sqlite_master WHERE name = 'broken'"
+        ).fetchone()
+
+    def test_versions_order(self, memory_conn):
+        """тест: версии миграций должны возрастать"""
+
+        migrations = [Migration(2, "вторая"), Migration(1, "первая")]
+
+        with raises(MigrationException):
+            MigrationEngine(memory_conn, migrations)
+
+    def test_batched_backfill(self, memory_conn):
+        """тест: пакетное заполнение всех строк таблицы"""
+
+        engine = MigrationEngine(memory_conn, backfill_migrations(batch_size=3))
+        engine.migrate(target=1)
+        memory_conn.executemany(
+            "INSERT INTO item (item_id) VALUES (?)", [(i,) for i in range(10)]
+        )
+        memory_conn.commit()
+        engine.migrate()
+        marked = memory_conn.execute(
+            "SELECT count(*) FROM item WHERE marker = 'done'"
+        ).fetchone()[0]
+
+        assert marked == 10
+        assert engine.current_version() == 2
+        assert not memory_conn.execute(
+            "SELECT * FROM schema_migration_progress"
+        ).fetchall()
+
+    def test_batched_backfill_new_rows(self, memory_conn):
+        """тест: строки, добавленные во время заполнения, тоже заполняются"""
+
+        engine = MigrationEngine(memory_conn, backfill_migrations(batch_size=2))
+        engine.migrate(target=1)
+        memory_conn.executemany(
+            "INSERT INTO item (item_id) VALUES (?)", [(i,) for i in range(4)]
+        )
+        memory_conn.execute(
+            """CREATE TRIGGER item_grow AFTER UPDATE ON item
+            WHEN new.item_id = 0 AND old.marker IS NULL
+            BEGIN INSERT INTO item (item_id) VALUES (100); END"""
+        )
+        memory_conn.commit()
+        engine.migrate()
+
+        assert memory_conn.execute(
+            "SELECT count(*), count(marker) FROM item"
+        ).fetchone() == (5, 5)
+
+    def test_stock_device_defaults(self, memory_conn):
+        """тест: пустые часы лампы и статус на складе получают значения
+        по умолчанию"""
+
+        engine = MigrationEngine(memory_conn)
+        engine.migrate(target=4)
+        memory_conn.execute(
+            "INSERT INTO stock_device (stock_device_id, device_id, at_clean_date, max_lamp_hours, stock_device_status) VALUES (1, 1, '1-5-2025', NULL, NULL)"
+        )
+        memory_conn.commit()
+        engine.migrate()
+
+        assert memory_conn.execute(
+            "SELECT max_lamp_hours, stock_device_status FROM stock_device"
+        ).fetchone() == (0, 1)
+
+    def test_fresh_database_seed_without_nulls(self, memory_conn, tmp_path):
+        """тест: на новой базе миграции идут до загрузки данных, пустые
+        значения загруженного склада все равно получают значения по умолчанию"""
+
+        fp = tmp_path / "stock_device.csv"
+        fp.write_text(
+            "stock_device_id,device_id,at_clean_date,max_lamp_hours,stock_device_status\n"
+            "900,1,1-5-2025,,\n"
+        )
+        migrate(memory_conn)
+        seed(memory_conn, ["data_cache/stock_device_test.sql", str(fp)])
+
+        assert memory_conn.execute("PRAGMA user_version").fetchone()[0] == (
+            MIGRATIONS[-1].version
+        )
+        assert (
+            memory_conn.execute(
+                "SELECT count(*) FROM stock_device WHERE max_lamp_hours IS NULL OR stock_device_status IS NULL"
+            ).fetchone()[0]
+            == 0
+        )
+
+    def test_batched_backfill_resume(self, memory_conn):
+        """тест: продолжение прерванного заполнения с сохраненного места"""
+
+        migrations = backfill_migrations(batch_size=4)
+        engine = MigrationEngine(memory_conn, migrations)
+        engine.migrate(target=1)
+        memory_conn.executemany(
+            "INSERT INTO item (item_id) VALUES (?)", [(i,) for i in range(10)]
+        )
+        memory_conn.execute(
+            "INSERT INTO schema_migration_progress (version, last_rowid) VALUES (2, 4)"
+        )
+        memory_conn.commit()
+        engine.migrate()
+        untouched = memory_conn.execute(
+            "SELECT count(*) FROM item WHERE marker IS NULL"
+        ).fetchone()[0]
+
+        assert untouched == 4
+        assert engine.current_version() == 2
@@ -5,6 +5,8 @@ from src.query_scheme import (
     QuerySchemeForDeviceCompany,
     QuerySchemeForDeviceType,
     QuerySchemeForStockDevice,
+    QueryCache,
+    query_cache,
 )
 from src.scheme_for_validation import DataForQuery, RowValue, TableRow
 
@@ -20,7 +22,7 @@ data_for_table_stock_device = [
             table_row=TableRow("at_clean_date"),
             row_value=RowValue("30-4-2025"),
         ),
-        "SELECT sd.stock_device_id, d.device_name, dc.company_name, dt.type_title, sd.max_lamp_hours, sd.at_clean_date\nFROM stock_device as sd\nLEFT JOIN device d ON d.device_id = sd.device_id\nLEFT JOIN device_company dc ON dc.company_id = d.company_id\nLEFT JOIN device_type dt ON dt.type_device_id = d.type_device_id\nWHERE sd.at_clean_date='30-4-2025'\n",
+        "SELECT sd.stock_device_id, d.device_name, dc.company_name, dt.type_title, sd.max_lamp_hours, sd.at_clean_date\nFROM stock_device as sd\nLEFT JOIN device d ON d.device_id = sd.device_id\nLEFT JOIN device_company dc ON dc.company_id = d.company_id\nLEFT JOIN device_type dt ON dt.type_device_id = d.type_device_id\nWHERE sd.at_clean_date=?\n",
     ),
     (
         None,
@@ -39,7 +41,7 @@ data_for_table_device = [
             table_row=TableRow("company_name"),
             row_value=RowValue("Clay Paky"),
         ),
-        "SELECT d.device_id, d.device_name, dc.company_name, dt.type_title\nFROM device as d\nLEFT JOIN device_company dc ON dc.company_id = d.company_id\nLEFT JOIN device_type dt ON dt.type_device_id = d.type_device_id\nWHERE dc.company_name='Clay Paky'\n",
+        "SELECT d.device_id, d.device_name, dc.company_name, dt.type_title\nFROM device as d\nLEFT JOIN device_company dc ON dc.company_id = d.company_id\nLEFT JOIN device_type dt ON dt.type_device_id = d.type_device_id\nWHERE dc.company_name=?\n",
     ),
     (
         None,
@@ -54,7 +56,7 @@ data_for_table_device_company = [
             table_row=TableRow("company_name"),
             row_value=RowValue("Clay Paky"),
         ),
-        "SELECT company_id, company_name, producer_country, description_company \nFROM device_company as dc\nWHERE dc.company_name='Clay Paky'\n",
+        "SELECT company_id, company_name, producer_country, description_company \nFROM device_company as dc\nWHERE dc.company_name=?\n",
     ),
     (
         None,
@@ -67,7 +69,7 @@ data_for_table_type_device = [
         DataForQuery(
             prefix="dt", table_row=TableRow("type_title"), row_value=RowValue("Beam")
         ),
-        "SELECT type_device_id, type_title, type_description, lamp_type \nFROM device_type as dt\nWHERE dt.type_title='Beam'\n",
+        "SELECT type_device_id, type_title, type_description, lamp_type \nFROM device_type as dt\nWHERE dt.type_title=?\n",
     ),
     (
         None,
@@ -89,7 +91,7 @@ data_device_by_status = [
                 row_value=RowValue("1"),
             ),
         ],
-        "SELECT sd.stock_device_id, d.device_name, sd.at_clean_date\nFROM stock_device as sd\nLEFT JOIN device d ON d.device_id = sd.device_id\nWHERE sd.stock_device_status='1' and sd.at_clean_date='30-4-2025'",
+        "SELECT sd.stock_device_id, d.device_name, sd.at_clean_date\nFROM stock_device as sd\nLEFT JOIN device d ON d.device_id = sd.device_id\nWHERE sd.stock_device_status=? and sd.at_clean_date=?",
     ),
     (
         [
@@ -104,7 +106,7 @@ data_device_by_status = [
                 row_value=RowValue("0"),
             ),
         ],
-        "SELECT sd.stock_device_id, d.device_name, sd.at_clean_date\nFROM stock_device as sd\nLEFT JOIN device d ON d.device_id = sd.device_id\nWHERE sd.stock_device_status='0' and sd.at_clean_date='30-4-2025'",
+        "SELECT sd.stock_device_id, d.device_name, sd.at_clean_date\nFROM stock_device as sd\nLEFT JOIN device d ON d.device_id = sd.device_id\nWHERE sd.stock_device_status=? and sd.at_clean_date=?",
     ),
 ]
 
@@ -130,8 +132,9 @@ class TestQuerySchemeForStockDevice:
 
         assert (
             result[0]
-            == "SELECT sd.stock_device_id, d.device_name, sd.at_clean_date\nFROM stock_device as sd\nLEFT JOIN device d ON d.device_id = sd.device_id\nLEFT JOIN device_type dt ON dt.type_device_id = d.type_device_id\nWHERE d.device_name='K20' and dt.type_title='Beam'"
+            == "SELECT sd.stock_device_id, d.device_name, sd.at_clean_date\nFROM stock_device as sd\nLEFT JOIN device d ON d.device_id = sd.device_id\nLEFT JOIN device_type dt ON dt.type_device_id = d.type_device_id\nWHERE d.device_name=? and dt.type_title=?"
         )
+        assert result[2] == ("K20", "Beam")
 
     def test_query_get_search_with_device_company(self):
         """тест: запроса прибора на складе по компании"""
@@ -151,8 +154,9 @@ class TestQuerySchemeForStockDevice:
 
         assert (
             result[0]
-            == "SELECT sd.stock_device_id, d.device_name, sd.at_clean_date\nFROM stock_device as sd\nLEFT JOIN device d ON d.device_id = sd.device_id\nLEFT JOIN device_company dc ON dc.company_id = d.company_id\nWHERE d.device_name='K20' and dc.company_name='Clay Paky'"
+            == "SELECT sd.stock_device_id, d.device_name, sd.at_clean_date\nFROM stock_device as sd\nLEFT JOIN device d ON d.device_id = sd.device_id\nLEFT JOIN device_company dc ON dc.company_id = d.company_id\nWHERE d.device_name=? and dc.company_name=?"
         )
+        assert result[2] == ("K20", "Clay Paky")
 
     @mark.parametrize("where_data, expected", data_for_table_stock_device)
     def test_query_get(self, where_data, expected):
@@ -198,8 +202,9 @@ class TestQuerySchemeForStockDevice:
 
         assert (
             result[0]
-            == "UPDATE stock_device as sd SET sd.at_clean_date='30-4-2025' WHERE sd.stock_device_id='1' and d.device_name='K20'"
+            == "UPDATE stock_device as sd SET sd.at_clean_date=? WHERE sd.stock_device_id=? and d.device_name=?"
         )
+        assert result[2] == ("30-4-2025", "1", "K20")
 
     @mark.parametrize("where_data, expected", data_device_by_status)
     def query_get_search_with_device(self, where_data, expected):
@@ -248,9 +253,9 @@ class TestQuerySchemeForDevice:
         result = query.query_update(where_data=where_data, set_data=set_data)
 
         assert (
-            result[0]
-            == "UPDATE device as d SET d.device_name='K30' WHERE d.device_name='K20'"
+            result[0] == "UPDATE device as d SET d.device_name=? WHERE d.device_name=?"
         )
+        assert result[2] == ("K30", "K20")
 
 
 @mark.query_table
@@ -295,7 +300,7 @@ class TestQuerySchemeForDeviceCompany:
 
         assert (
             result[0]
-            == "UPDATE device_company as dc SET dc.company_name='Light Craft' WHERE dc.company_name='Clay Paky'"
+            == "UPDATE device_company as dc SET dc.company_name=? WHERE dc.company_name=?"
         )
 
 
@@ -337,5 +342,55 @@ class TestQuerySchemeForTypeDevice:
 
         assert (
             result[0]
-            == "UPDATE device_type as dt SET dt.type_title='Beams' WHERE dt.type_title='Beam'"
+            == "UPDATE device_type as dt SET dt.type_title=? WHERE dt.type_title=?"
+        )
+
+
+@mark.query_table
+class TestQueryCache:
+    """Класс тест для кэша собранных запросов"""
+
+    def test_same_shape_hits_cache(self):
+        """тест: запрос той же формы берется из кэша с новыми параметрами"""
+
+        query_cache.clear()
+        query = QuerySchemeForDevice()
+        first = query.query_get(
+            where_data=DataForQuery(
+                prefix="d", table_row=TableRow("device_name"), row_value=RowValue("K20")
+            )
+        )
+        second = query.query_get(
+            where_data=DataForQuery(
+                prefix="d", table_row=TableRow("device_name"), row_value=RowValue("K90")
+            )
         )
+
+        assert first[0] is second[0]
+        assert first[2] == ("K20",)
+        assert second[2] == ("K90",)
+        assert query_cache.stats()["hits"] == 1
+
+    def test_different_shape_misses_cache(self):
+        """тест: запросы с разными колонками условия собираются отдельно"""
+
+        query_cache.clear()
+        query = QuerySchemeForDevice()
+        query.query_get()
+        query.query_get(
+            where_data=DataForQuery(
+                prefix="d", table_row=TableRow("device_name"), row_value=RowValue("K20")
+            )
+        )
+
+        assert query_cache.stats()["size"] == 2
+
+    def test_eviction(self):
+        """тест: вытеснение давно не использованного запроса"""
+
+        cache = QueryCache(max_size=1)
+        cache.get_or_build("first", lambda: ("SELECT 1", print))
+        cache.get_or_build("second", lambda: ("SELECT 2", print))
+
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["size"] == 1
@@ -0,0 +1,147 @@
+import sqlite3
+
+from pytest import mark
+
+from src.bot_api import APIBotDb, Marker
+from src.reference_cache import ReferenceCache, get_reference_cache
+
+
+@mark.usefixtures("db_connect")
+@mark.reference_cache
+class TestReferenceCache:
+    """Тест кэша справочников"""
+
+    def test_lookup(self):
+        """тест: поиск id по названию без обращения к базе после загрузки"""
+
+        cache = ReferenceCache("clean_device_test.db")
+        cache.load()
+
+        assert cache.device_id("Laser Beam") == 4
+        assert cache.company_id("Clay Paky") == 1
+        assert cache.type_id("Beam") == 1
+        assert cache.device_id("Unknown") is None
+        assert cache.stats()["loads"] == 1
+        assert cache.stats()["hits"] == 3
+        assert cache.stats()["misses"] == 1
+
+    def test_invalidate(self):
+        """тест: запись через api бота сбрасывает кэш"""
+
+        api = APIBotDb("clean_device_test.db")
+        cache = get_reference_cache("clean_device_test.db")
+        cache.load()
+        version = cache.version
+
+        api.bot_set_device_type(
+            {
+                "type_title": "Strobe",
+                "type_description": "Стробоскоп",
+                "lamp_type": "LED",
+            }
+        )
+
+        assert cache.type_id("Strobe") is not None
+        assert cache.version == version + 1
+
+    def test_external_writer(self):
+        """тест: запись сторонним соединением обнаруживается по data_version"""
+
+        cache = ReferenceCache("clean_device_test.db")
+        cache.load()
+
+        conn = sqlite3.connect("clean_device_test.db")
+        conn.execute(
+            "INSERT INTO device_company (company_name, producer_country, description_company) VALUES (?, ?, ?)",
+            ("Robe", "Чехия", "Производитель"),
+        )
+        conn.commit()
+        conn.close()
+
+        assert cache.company_id("Robe") is not None
+        assert cache.stats()["loads"] == 2
+
+    def test_external_rename_same_length(self):
+        """тест: переименование без изменения длины названия обновляет кэш"""
+
+        cache = ReferenceCache("clean_device_test.db")
+        cache.load()
+
+        conn = sqlite3.connect("clean_device_test.db")
+        conn.execute("UPDATE device SET device_name = 'K91' WHERE device_name = 'K90'")
+        conn.commit()
+        conn.close()
+
+        assert cache.device_id("K90") is None
+        assert cache.device_id("K91") == 8
+        assert cache.device_name(8) == "K91"
+
+    def test_unrelated_write_keeps_cache(self):
+        """тест: запись в таблицу склада не перезагружает справочники"""
+
+        cache = ReferenceCache("clean_device_test.db")
+        cache.load()
+
+        conn = sqlite3.connect("clean_device_test.db")
+        conn.execute("UPDATE stock_device SET max_lamp_hours = 10")
+        conn.commit()
+        conn.close()
+
+        assert cache.device_id("Laser Beam") == 4
+        assert cache.stats()["loads"] == 1
+
+    def test_inline_kb_cached_by_version(self):
+        """тест: клавиатура строится один раз на версию справочников"""
+
+        api = APIBotDb("clean_device_test.db")
+        cache = get_reference_cache("clean_device_test.db")
+        cache.invalidate()
+
+        first = api.bot_inline_kb(Marker.DEVICE)
+        second = api.bot_inline_kb(Marker.DEVICE)
+
+        assert first is second
+
+        api.bot_set_device(
+            {
+                "device_name": "Sharpy Plus",
+                "company_name": "Clay Paky",
+                "type_title": "Beam",
+            }
+        )
+        third = api.bot_inline_kb(Marker.DEVICE)
+        buttons = [button.text for row in third.inline_keyboard for button in row]
+
+        assert third is not first
+        assert "Sharpy Plus" in buttons
+
+    def test_derived_bounded(self):
+        """тест: производных значений хранится не больше max_derived"""
+
+        cache = ReferenceCache("clean_device_test.db", max_derived=2)
+
+        for after in range(10):
+            cache.derived(("kb", after), lambda: object())
+
+        cache.derived(("kb", 9), lambda: object())
+
+        assert cache.stats()["derived_builds"] == 10
+        assert cache.stats()["derived_hits"] == 1
+        assert cache.stats()["derived_evictions"] == 8
+
+    def test_fil_kb_follows_lamp_type(self):
+        """тест: смена типа лампы сторонним соединением обновляет клавиатуру"""
+
+        api = APIBotDb("clean_device_test.db")
+        first = api.bot_inline_kb(Marker.DEVICE_FIL)
+
+        conn = sqlite3.connect("clean_device_test.db")
+        conn.execute("UPDATE device_type SET lamp_type = 'FIL'")
+        conn.commit()
+        conn.close()
+
+        second = api.bot_inline_kb(Marker.DEVICE_FIL)
+        buttons = [button.text for row in second.inline_keyboard for button in row]
+
+        assert second is not first
+        assert "Laser Beam" in buttons
@@ -0,0 +1,167 @@
+import asyncio
+
+from pytest import mark
+
+from src.async_bot_api import AsyncAPIBotDb
+from src.bot.report import html_to_text, send_report
+from src.bot_api import APIBotDb
+from src.message_handler import MessageChunks, MessageDescription
+
+
+class FakeMessage:
+    """сообщение, которое запоминает ответы бота вместо отправки"""
+
+    def __init__(self) -> None:
+        self.texts = []
+        self.documents = []
+
+    async def answer(self, text, reply_markup=None):
+        self.texts.append(text)
+
+    async def answer_document(self, document, caption=None, reply_markup=None):
+        self.documents.append(
+            (document.filename, document.data.decode("utf-8"), caption)
+        )
+
+
+def run_report(func, args, **kwargs):
+    api = AsyncAPIBotDb(APIBotDb("clean_device_test.db"), max_workers=2)
+    message = FakeMessage()
+
+    async def report():
+        return await send_report(
+            message,
+            MessageDescription(func),
+            getattr(api, args[0])(*args[1:]),
+            **kwargs,
+        )
+
+    rows = asyncio.run(report())
+    api.shutdown()
+    return rows, message
+
+
+@mark.report
+class TestMessageChunks:
+    """Тест сборки отчета в сообщения ограниченной длины"""
+
+    def test_chunks_within_limit(self):
+        """тест: сообщения не длиннее лимита и содержат все строки"""
+
+        chunker = MessageChunks(limit=25, separator="\n\n")
+        lines = [f"строка {i:02}" for i in range(10)]
+        chunks = [chunk for line in lines for chunk in chunker.add(line)]
+        chunks.append(chunker.flush())
+
+        assert all(len(chunk) <= 25 for chunk in chunks)
+        assert "\n\n".join(chunks) == "\n\n".join(lines)
+
+    def test_long_line_split(self):
+        """тест: строка длиннее лимита режется на части"""
+
+        chunker = MessageChunks(limit=4)
+
+        assert chunker.add("abcdefghij") == ["abcd", "efgh"]
+        assert chunker.flush() == "ij"
+        assert chunker.flush() is None
+
+    @mark.usefixtures("db_connect")
+    def test_description_matches_chunks(self):
+        """тест: отчет одним сообщением совпадает с отчетом частями"""
+
+        mes_des = MessageDescription("/get_devices")
+        mes_des.message_data = APIBotDb("clean_device_test.db").bot_lst_device()
+
+        assert list(mes_des.chunks([mes_des.message_data])) == [mes_des.description()]
+
+    def test_html_to_text(self):
+        """тест: разметка убирается из текста для файла"""
+
+        assert html_to_text("<i>Id</i>: <code>1 &lt; 2</code>") == "Id: 1 < 2"
+
+
+@mark.usefixtures("db_connect")
+@mark.report
+class TestSendReport:
+    """Тест потоковой отправки отчетов"""
+
+    def test_report_in_messages(self):
+        """тест: отчет уходит несколькими сообщениями по мере чтения"""
+
+        rows, message = run_report(
+            "/get_devices", ("bot_iter_devices", 3), limit=300, max_messages=10
+        )
+
+        assert rows == 8
+        assert len(message.texts) > 1
+        assert all(len(text) <= 300 for text in message.texts)
+        assert not message.documents
+
+    def test_report_to_document(self):
+        """тест: остаток отчета после лимита сообщений уходит файлом"""
+
+        rows, message = run_report(
+            "/get_devices", ("bot_iter_devices", 3), limit=300, max_messages=1
+        )
+
+        assert rows == 8
+        assert len(message.texts) == 1
+        filename, content, caption = message.documents[0]
+        assert filename == "get_devices.txt"
+        assert "<code>" not in content
+        assert "8" in caption
+
+    def test_broken_devices_report(self):
+        """тест: отчет о приборах в ремонте за дату"""
+
+        rows, message = run_report(
+            "get_broken_device",
+            ("bot_iter_devices_at_date", {"at_clean_date": "30-4-2025"}, "0"),
+        )
+
+        assert rows == 2
+        assert len(message.texts) == 1
+        assert message.texts[0].count("Prima Mythos") == 2
+
+    def test_concurrent_reports_limited(self, monkeypatch):
+        """тест: отчеты сверх REPORT_CONCURRENCY ждут своей очереди"""
+
+        monkeypatch.setenv("REPORT_CONCURRENCY", "1")
+        api = AsyncAPIBotDb(APIBotDb("clean_device_test.db"), max_workers=4)
+        active = []
+
+        async def batches():
+            active.append(1)
+            assert len(active) == 1
+
+            try:
+                async for batch in api.bot_iter_devices(3):
+                    yield batch
+                    await asyncio.sleep(0)
+
+            finally:
+                active.pop()
+
+        async def reports():
+            return await asyncio.gather(
+                *(
+                    send_report(
+                        FakeMessage(), MessageDescription("/get_devices"), batches()
+                    )
+                    for _ in range(3)
+                )
+            )
+
+        assert asyncio.run(reports()) == [8, 8, 8]
+        api.shutdown()
+
+    def test_empty_report(self):
+        """тест: пустой результат ничего не отправляет"""
+
+        rows, message = run_report(
+            "get_stock_device_at_date",
+            ("bot_iter_devices_at_date", {"at_clean_date": "1-1-1990"}, "1"),
+        )
+
+        assert rows == 0
+        assert not message.texts
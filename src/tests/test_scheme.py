@@ -1,10 +1,20 @@
-from src.query_scheme import QuerySchemeForStockDevice
+from pytest import raises
+
+from src.bot_api import APIBotDb
+from src.query_scheme import (
+    QuerySchemeForStockDevice,
+    TableHandler,
+    set_trusted_reads,
+)
 from src.scheme_for_validation import (
+    ROW_FACTORIES,
     DeviceTypeTable,
     RowValue,
     StockBrokenDeviceData,
     TableRow,
     DataForQuery,
+    column_fields,
+    trusted_row_factory,
 )
 
 
@@ -30,7 +40,7 @@ def test_entry_struct_in_lst(db_connect):
     )
 
     cursor = db_connect.row_factory_for_connection(query[1])
-    stock_devices = db_connect.get_all(query=query[0], cursor=cursor)
+    stock_devices = db_connect.get_all(query=query[0], cursor=cursor, params=query[2])
 
     assert all(isinstance(item, StockBrokenDeviceData) for item in stock_devices)
 
@@ -49,4 +59,69 @@ def test_where_data_for_query():
     where_data = [data, data_two]
     res = " and ".join([item.build for item in where_data])
 
-    assert res == "sd.at_clean_date='30-4-2025' and d.device_name='k20'"
+    assert res == "sd.at_clean_date=? and d.device_name=?"
+
+
+def test_at_clean_iso_column(db_connect):
+    cur = db_connect.conn.cursor()
+    cur.execute(
+        "SELECT at_clean_iso FROM stock_device WHERE at_clean_date='30-4-2025' LIMIT 1"
+    )
+
+    assert cur.fetchone()[0] == "2025-04-30"
+
+
+def test_stock_device_date_index(db_connect):
+    cur = db_connect.conn.cursor()
+    cur.execute(
+        "EXPLAIN QUERY PLAN SELECT stock_device_id FROM stock_device "
+        "WHERE stock_device_status=? AND at_clean_iso=?",
+        ("1", "2025-04-30"),
+    )
+
+    assert "idx_stock_device_status_date" in cur.fetchone()[3]
+
+
+def test_trusted_row_factory(db_connect):
+    api = APIBotDb("clean_device_test.db")
+    where_data = {"at_clean_date": "30-4-2025"}
+    validated = api.bot_lst_broken_device_from_stockpile(where_data)
+
+    set_trusted_reads(True)
+    try:
+        trusted = api.bot_lst_broken_device_from_stockpile(where_data)
+    finally:
+        set_trusted_reads(False)
+
+    assert trusted == validated
+    assert all(isinstance(item, StockBrokenDeviceData) for item in trusted)
+
+
+def test_trusted_row_factory_skips_validation(db_connect):
+    factory = trusted_row_factory(StockBrokenDeviceData)
+    cursor = db_connect.conn.execute(
+        "SELECT 0 AS stock_device_id, 'K' AS device_name, '1-1-2025' AS at_clean_date"
+    )
+    row = factory(cursor, cursor.fetchone())
+
+    assert row.stock_device_id == 0
+    assert row.device_name == "K"
+
+
+def test_row_factory_dispatch_precomputed():
+    first = TableHandler.request_row_factory(StockBrokenDeviceData)
+    second = TableHandler.request_row_factory(StockBrokenDeviceData)
+
+    assert first is second
+    assert first is ROW_FACTORIES[StockBrokenDeviceData]
+
+    with raises(ValueError):
+        TableHandler.request_row_factory(DataForQuery)
+
+
+def test_column_fields_from_aliases():
+    fields = column_fields(StockBrokenDeviceData)
+
+    assert fields["sd.stock_device_id"] == "stock_device_id"
+    assert fields["stock_device_id"] == "stock_device_id"
+    assert fields["d.device_name"] == "device_name"
@@ -0,0 +1,128 @@
+import asyncio
+import sqlite3
+import time
+
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from pytest import mark, raises
+
+from src.bot.states import CleanDevices
+from src.bot.storage import SQLiteStorage, StorageException, fsm_storage_from_env
+
+
+KEY = StorageKey(bot_id=1, chat_id=10, user_id=100)
+
+
+def stored_rows(db_name: str) -> int:
+    conn = sqlite3.connect(db_name)
+    count = conn.execute("SELECT count(*) FROM fsm_state").fetchone()[0]
+    conn.close()
+    return count
+
+
+@mark.storage
+class TestSQLiteStorage:
+    """Тест хранилища состояний fsm в sqlite"""
+
+    def test_state_survives_restart(self, tmp_path):
+        """тест: состояние и данные читаются новым экземпляром хранилища"""
+
+        db_name = str(tmp_path / "fsm.db")
+
+        async def write():
+            storage = SQLiteStorage(db_name)
+            await storage.set_state(KEY, CleanDevices.clean_date)
+            await storage.update_data(KEY, {"at_clean_date": "30-4-2025"})
+            await storage.close()
+
+        async def read():
+            storage = SQLiteStorage(db_name)
+            result = await storage.get_state(KEY), await storage.get_data(KEY)
+            await storage.close()
+            return result
+
+        asyncio.run(write())
+
+        assert asyncio.run(read()) == (
+            CleanDevices.clean_date.state,
+            {"at_clean_date": "30-4-2025"},
+        )
+
+    def test_write_through(self, tmp_path):
+        """тест: изменение сразу видно другому экземпляру хранилища,
+        как другому процессу с той же базой"""
+
+        db_name = str(tmp_path / "fsm.db")
+
+        async def scenario():
+            writer = SQLiteStorage(db_name)
+            reader = SQLiteStorage(db_name)
+            await writer.set_state(KEY, "a")
+            await writer.set_data(KEY, {"x": 1})
+            result = await reader.get_state(KEY), await reader.get_data(KEY)
+            stats = writer.stats()
+            await writer.close()
+            await reader.close()
+            return result, stats
+
+        result, stats = asyncio.run(scenario())
+
+        assert result == ("a", {"x": 1})
+        assert stats["written"] == 2
+        assert stored_rows(db_name) == 1
+
+    def test_clear_deletes_row(self, tmp_path):
+        """тест: очистка состояния удаляет строку из таблицы"""
+
+        db_name = str(tmp_path / "fsm.db")
+
+        async def scenario():
+            storage = SQLiteStorage(db_name)
+            await storage.set_state(KEY, "a")
+            await storage.set_state(KEY, None)
+            await storage.set_data(KEY, {})
+            await storage.close()
+
+        asyncio.run(scenario())
+
+        assert stored_rows(db_name) == 0
+
+    def test_ttl_expiry(self, tmp_path):
+        """тест: устаревшее состояние не читается и удаляется"""
+
+        db_name = str(tmp_path / "fsm.db")
+
+        async def scenario():
+            storage = SQLiteStorage(db_name, ttl=0.05)
+            await storage.set_state(KEY, "a")
+            time.sleep(0.1)
+            state = await storage.get_state(KEY)
+            await storage.set_state(StorageKey(bot_id=1, chat_id=11, user_id=1), "b")
+            await storage.close()
+            return state, storage.stats()
+
+        state, stats = asyncio.run(scenario())
+
+        assert state is None
+        assert stats["expired"] == 1
+        assert stored_rows(db_name) == 1
+
+    def test_storage_from_env(self, monkeypatch, tmp_path):
+        """тест: выбор хранилища по окружению"""
+
+        monkeypatch.delenv("FSM_STORAGE", raising=False)
+        assert isinstance(fsm_storage_from_env(), MemoryStorage)
+
+        monkeypatch.setenv("FSM_STORAGE", "memory")
+        assert isinstance(fsm_storage_from_env(), MemoryStorage)
+
+        monkeypatch.setenv("FSM_STORAGE", "sqlite")
+        monkeypatch.setenv("FSM_DB", str(tmp_path / "fsm.db"))
+        monkeypatch.setenv("FSM_TTL", "60")
+        storage = fsm_storage_from_env()
+        assert isinstance(storage, SQLiteStorage)
+        assert storage.ttl == 60
+
+        monkeypatch.setenv("FSM_STORAGE", "redis")
+        with raises(StorageException):
+            fsm_storage_from_env()
@@ -0,0 +1,34 @@
+from pytest import mark
+
+from src.utils import format_stock_ids, parse_stock_ids
+
+
+data_parse_stock_ids = [
+    ("52", [52]),
+    ("11-14, 52, 58", [11, 12, 13, 14, 52, 58]),
+    ("11 - 13; 12 52", [11, 12, 13, 52]),
+    ("7–8", [7, 8]),
+    ("", None),
+    ("abc", None),
+    ("0", None),
+    ("40-11", None),
+    ("1-501", None),
+    ("1-400, 1000-1200", None),
+]
+
+
+@mark.utils
+class TestStockIds:
+    """Тест разбора номеров склада"""
+
+    @mark.parametrize("text, expect", data_parse_stock_ids)
+    def test_parse_stock_ids(self, text, expect):
+        """тест: списки и диапазоны номеров без повторов"""
+
+        assert parse_stock_ids(text) == expect
+
+    def test_format_stock_ids(self):
+        """тест: номера собираются обратно в диапазоны"""
+
+        assert format_stock_ids([58, 11, 12, 13, 52, 14]) == "11-14, 52, 58"
+        assert format_stock_ids(parse_stock_ids("11-40, 52")) == "11-40, 52"
@@ -0,0 +1,159 @@
+import asyncio
+
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Message
+from aiohttp.test_utils import TestClient, TestServer
+from pytest import mark, raises
+
+from src.webhook import (
+    WebhookConfig,
+    WebhookException,
+    bot_mode_from_env,
+    create_app,
+    webhook_config_from_env,
+)
+
+
+TOKEN = "123456:ABCdefGhIJKlmnoPQRstuvWXyz"
+
+
+def make_update(update_id: int, text: str) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "test"},
+            "text": text,
+        },
+    }
+
+
+def make_dispatcher(received: list, delay: float = 0) -> Dispatcher:
+    router = Router()
+
+    @router.message(F.text)
+    async def record(message: Message):
+        await asyncio.sleep(delay)
+        received.append(message.text)
+
+    dp = Dispatcher(storage=MemoryStorage())
+    dp.include_router(router)
+    return dp
+
+
+async def post_updates(config: WebhookConfig, dp: Dispatcher, updates, headers=None):
+    client = TestClient(TestServer(create_app(dp, Bot(TOKEN), config)))
+    await client.start_server()
+    statuses = []
+
+    try:
+        for update in updates:
+            response = await client.post(config.path, json=update, headers=headers)
+            statuses.append(response.status)
+
+    finally:
+        await client.close()
+
+    return statuses
+
+
+@mark.webhook
+class TestWebhook:
+    """Тест режима webhook на локальном сервере"""
+
+    def test_secret_token(self):
+        """тест: обновление без верного секрета отклоняется"""
+
+        received = []
+        config = WebhookConfig(secret="s3cret", background=False)
+        dp = make_dispatcher(received)
+
+        statuses = asyncio.run(
+            post_updates(
+                config,
+                dp,
+                [make_update(1, "/get")],
+                {"X-Telegram-Bot-Api-Secret-Token": "bad"},
+            )
+        )
+        assert statuses == [401]
+        assert received == []
+
+        statuses = asyncio.run(
+            post_updates(
+                config,
+                dp,
+                [make_update(2, "/get")],
+                {"X-Telegram-Bot-Api-Secret-Token": "s3cret"},
+            )
+        )
+        assert statuses == [200]
+        assert received == ["/get"]
+
+    def test_background_updates_finished_on_shutdown(self):
+        """тест: фоновые обновления обрабатываются до закрытия сервера"""
+
+        received = []
+        config = WebhookConfig(path="/hook", background=True)
+        dp = make_dispatcher(received, delay=0.05)
+        updates = [make_update(i, f"/text_{i}") for i in range(5)]
+
+        statuses = asyncio.run(post_updates(config, dp, updates))
+
+        assert statuses == [200] * 5
+        assert sorted(received) == sorted(f"/text_{i}" for i in range(5))
+
+    def test_metrics_route(self):
+        """тест: сервер webhook отдает метрики вместе с дополнительными данными"""
+
+        async def get_metrics(config: WebhookConfig):
+            app = create_app(
+                make_dispatcher([]), Bot(TOKEN), config, lambda: {"db": {"size": 1}}
+            )
+            client = TestClient(TestServer(app))
+            await client.start_server()
+
+            try:
+                response = await client.get("/metrics")
+                return response.status, (
+                    await response.json() if response.status == 200 else None
+                )
+
+            finally:
+                await client.close()
+
+        status, _ = asyncio.run(get_metrics(WebhookConfig()))
+
+        assert status == 404
+
+        status, data = asyncio.run(get_metrics(WebhookConfig(metrics=True)))
+
+        assert status == 200
+        assert data["db"] == {"size": 1}
+
+        with raises(WebhookException):
+            WebhookConfig(path="/metrics", metrics=True)
+
+    def test_config_from_env(self, monkeypatch):
+        """тест: настройки webhook и режим запуска из окружения"""
+
+        monkeypatch.setenv("BOT_MODE", "webhook")
+        monkeypatch.setenv("WEBHOOK_PORT", "9000")
+        monkeypatch.setenv("WEBHOOK_PATH", "/bot")
+        monkeypatch.setenv("WEBHOOK_BACKGROUND", "0")
+        config = webhook_config_from_env()
+
+        assert bot_mode_from_env() == "webhook"
+        assert (config.port, config.path, config.background) == (9000, "/bot", False)
+        assert config.url is None
+        assert not config.metrics
+
+        monkeypatch.setenv("BOT_MODE", "long_polling")
+        with raises(WebhookException):
+            bot_mode_from_env()
+
+        with raises(WebhookException):
+            WebhookConfig(path="bot")
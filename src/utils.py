@@ -1,5 +1,10 @@
 import re
 from datetime import datetime
+from typing import Dict, List
+
+
+# больше номеров за одно сообщение не записывается
+MAX_STOCK_IDS = 500
 
 
 def modificate_date_to_str() -> str:
@@ -16,3 +21,57 @@ def validate_date(date: str) -> bool:
         return True
     else:
         return False
+
+
+def date_to_iso(date: str) -> str:
+    """преобразует дату d-m-yyyy в yyyy-mm-dd"""
+
+    day, month, year = date.split("-")
+    return "{year:0>4}-{month:0>2}-{day:0>2}".format(day=day, month=month, year=year)
+
+
+def parse_stock_ids(text: str, limit: int = MAX_STOCK_IDS) -> List[int] | None:
+    """разбирает номера склада вида 11-40, 52, 58 в список без повторов,
+    для неверной записи или больше limit номеров возвращает None"""
+
+    ids: Dict[int, None] = {}
+    text = re.sub(r"\s*[-–]\s*", "-", text.strip())
+
+    for part in re.split(r"[,;\s]+", text):
+        if not part:
+            continue
+
+        match = re.fullmatch(r"(\d+)(?:-(\d+))?", part)
+
+        if not match:
+            return None
+
+        start = int(match[1])
+        end = int(match[2] or match[1])
+
+        if start < 1 or end < start or end - start >= limit:
+            return None
+
+        ids.update(dict.fromkeys(range(start, end + 1)))
+
+        if len(ids) > limit:
+            return None
+
+    return list(ids) or None
+
+
+def format_stock_ids(ids: List[int]) -> str:
+    """собирает номера склада обратно в диапазоны: 11-40, 52, 58"""
+
+    parts = []
+    ordered = sorted(set(ids))
+
+    for index, value in enumerate(ordered):
+        if index and value == ordered[index - 1] + 1:
+            parts[-1][1] = value
+        else:
+            parts.append([value, value])
+
+    return ", ".join(
+        str(start) if start == end else f"{start}-{end}" for start, end in parts
+    )
@@ -0,0 +1,204 @@
+"""
+Модуль запуска бота в режиме webhook на локальном сервере aiohttp
+"""
+
+import asyncio
+import logging
+import os
+import signal
+from typing import Any, Callable, Dict
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from src.metrics import add_metrics_route
+
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.StreamHandler())
+
+
+class WebhookException(Exception):
+    def __init__(self, *args):
+        if args:
+            self.message = args[0]
+            self.value = args[1] if len(args) > 1 else None
+        else:
+            self.message = None
+            self.value = None
+
+    def __str__(self):
+        logger.warning(WebhookException)
+
+        if self.message:
+            return "WebhookException, {0} {1}".format(self.message, self.value)
+
+        else:
+            return "WebhookException вызвана для режима webhook"
+
+
+class WebhookConfig:
+    """Настройки сервера webhook
+
+    url - внешний адрес, по которому telegram доступен сервер. Если он не
+    задан, webhook не регистрируется, это нужно для нескольких процессов за
+    одним балансировщиком, где адрес регистрирует только один из них.
+    metrics - отдавать /metrics тем же сервером. По умолчанию выключено,
+    так как к серверу webhook обращается telegram, а маршрут метрик не
+    проверяет секрет; метрики тогда отдает локальный сервер METRICS_PORT.
+    """
+
+    def __init__(
+        self,
+        host: str = "0.0.0.0",
+        port: int = 8080,
+        path: str = "/webhook",
+        url: str | None = None,
+        secret: str | None = None,
+        background: bool = True,
+        shutdown_timeout: float = 10,
+        metrics: bool = False,
+    ) -> None:
+        if not path.startswith("/"):
+            raise WebhookException("Путь webhook должен начинаться с /", path)
+
+        if metrics and path == "/metrics":
+            raise WebhookException("Путь webhook занят метриками", path)
+
+        self.host = host
+        self.port = port
+        self.path = path
+        self.url = url
+        self.secret = secret
+        self.background = background
+        self.shutdown_timeout = shutdown_timeout
+        self.metrics = metrics
+
+
+def bot_mode_from_env() -> str:
+    mode = os.environ.get("BOT_MODE", "polling")
+
+    if mode not in ("polling", "webhook"):
+        raise WebhookException("Неизвестный режим запуска бота", mode)
+
+    return mode
+
+
+def webhook_config_from_env() -> WebhookConfig:
+    return WebhookConfig(
+        host=os.environ.get("WEBHOOK_HOST", "0.0.0.0"),
+        port=int(os.environ.get("WEBHOOK_PORT", 8080)),
+        path=os.environ.get("WEBHOOK_PATH", "/webhook"),
+        url=os.environ.get("WEBHOOK_URL") or None,
+        secret=os.environ.get("WEBHOOK_SECRET") or None,
+        background=os.environ.get("WEBHOOK_BACKGROUND", "1") != "0",
+        shutdown_timeout=float(os.environ.get("WEBHOOK_SHUTDOWN_TIMEOUT", 10)),
+        metrics=os.environ.get("WEBHOOK_METRICS", "0") == "1",
+    )
+
+
+class WebhookRequestHandler(SimpleRequestHandler):
+    """Обработчик запросов webhook, который при остановке дожидается
+    обновлений, принятых в фоне, и только потом закрывает сессию бота"""
+
+    def __init__(self, *args, shutdown_timeout: float = 10, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.shutdown_timeout = shutdown_timeout
+
+    async def close(self) -> None:
+        tasks = set(self._background_feed_update_tasks)
+
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=self.shutdown_timeout)
+
+            if pending:
+                logger.warning(f"Не дождались обработки {len(pending)} обновлений")
+
+                for task in pending:
+                    task.cancel()
+
+        await super().close()
+
+
+def create_app(
+    dp: Dispatcher,
+    bot: Bot,
+    config: WebhookConfig,
+    metrics_extra: Callable[[], Dict[str, Any]] | None = None,
+) -> web.Application:
+    """функция собирает приложение aiohttp с маршрутом webhook и, если
+    включено, маршрутом /metrics"""
+
+    app = web.Application()
+    WebhookRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        handle_in_background=config.background,
+        secret_token=config.secret,
+        shutdown_timeout=config.shutdown_timeout,
+    ).register(app, path=config.path)
+    setup_application(app, dp, bot=bot)
+
+    if config.metrics:
+        add_metrics_route(app, metrics_extra)
+
+    if config.url:
+
+        async def set_webhook(app: web.Application):
+            await bot.set_webhook(
+                url=config.url.rstrip("/") + config.path,
+                secret_token=config.secret,
+                allowed_updates=dp.resolve_used_update_types(),
+                drop_pending_updates=True,
+            )
+
+        app.on_startup.append(set_webhook)
+
+    return app
+
+
+async def run_webhook(
+    dp: Dispatcher,
+    bot: Bot,
+    config: WebhookConfig,
+    stop: asyncio.Event | None = None,
+    metrics_extra: Callable[[], Dict[str, Any]] | None = None,
+):
+    """функция запускает сервер webhook и работает до сигнала остановки"""
+
+    stop = stop or asyncio.Event()
+    loop = asyncio.get_running_loop()
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    runner = web.AppRunner(create_app(dp, bot, config, metrics_extra))
+    await runner.setup()
+
+    try:
+        site = web.TCPSite(runner, host=config.host, port=config.port)
+        await site.start()
+        logger.info(f"Webhook слушает {config.host}:{config.port}{config.path}")
+        await stop.wait()
+
+    finally:
+        # остановка сервера вызывает завершение диспетчера и ожидание
+        # фоновых обновлений, после чего закрывается сессия бота
+        await runner.cleanup()
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.remove_signal_handler(sig)
+
+            except (NotImplementedError, RuntimeError):
+                pass